@@ -78,6 +78,47 @@ def cmd_dump(args):
     print(Fore.BLUE + Style.BRIGHT + f"{os.getcwd()}\\screen_{archive_name}.zip")
 
 
+def cmd_archive(args):
+    from datetime import timedelta
+    from types import SimpleNamespace
+
+    import yaml
+
+    from GramAddict.core.storage import (
+        ACCOUNTS,
+        STORAGE_BACKEND_JSON,
+        STORAGE_BACKEND_SQLITE,
+        _open_storage,
+    )
+
+    for username in args.account_name:
+        if not path.exists(path.join(ACCOUNTS, username)):
+            print(f"'{ACCOUNTS}/{username}' folder doesn't exist, skip.")
+            continue
+        # the storage backend the account runs with
+        config = {}
+        config_path = path.join(ACCOUNTS, username, "config.yml")
+        if path.exists(config_path):
+            with open(config_path, encoding="utf-8") as f:
+                config = yaml.safe_load(f) or {}
+        storage_args = SimpleNamespace(
+            storage_backend=config.get("storage-backend", STORAGE_BACKEND_JSON),
+            journal_compact_every=config.get("journal-compact-every", 500),
+            filter_history_flush_every=1,
+            filter_history_flush_interval=30,
+        )
+        if storage_args.storage_backend == STORAGE_BACKEND_SQLITE:
+            print(
+                f"{username}: the {STORAGE_BACKEND_SQLITE} storage has no archive, old users cost nothing to keep in the database. Skip."
+            )
+            continue
+        # the journal backends also apply what's left in their journal
+        storage = _open_storage(username, storage_args)
+        archived = storage.archive_inactive_users(timedelta(days=args.older_than))
+        storage.close()
+        print(f"{username}: {archived} user(s) archived.")
+
+
 _commands = [
     dict(
         action=cmd_init,
@@ -99,6 +140,24 @@ _commands = [
             dict(args=["--config"], nargs="?", help="provide the config.yml path"),
         ],
     ),
+    dict(
+        action=cmd_archive,
+        command="archive",
+        help="moves old interacted users who aren't followed to the archive, with the storage backend of the account config (sqlite has no archive)",
+        flags=[
+            dict(
+                args=["account_name"],
+                nargs="+",
+                help="instagram account name to compact",
+            ),
+            dict(
+                args=["--older-than"],
+                type=float,
+                default=30,
+                help="days since the last interaction",
+            ),
+        ],
+    ),
     dict(
         action=cmd_dump,
         command="dump",
@@ -0,0 +1,187 @@
+import atexit
+import logging
+import queue
+import subprocess
+import threading
+import time
+import uuid
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# a probe taking longer means the shell is stuck, it's started again
+COMMAND_TIMEOUT = 15
+PROBE_CACHE_TTL = 2.0
+
+_shells = {}
+_shells_lock = threading.Lock()
+
+
+def adb_shell(serial: Optional[str]) -> "AdbShell":
+    """the shell of that device, opened on first use"""
+    with _shells_lock:
+        shell = _shells.get(serial)
+        if shell is None:
+            # no serial and the serial of the only device: the same shell
+            resolved = _resolve_serial(serial)
+            shell = _shells.get(resolved)
+            if shell is None:
+                shell = _shells[resolved] = AdbShell(resolved)
+            _shells[serial] = shell
+        return shell
+
+
+def set_adb_shell(serial: Optional[str], shell):
+    """answers adb_shell(serial) with that shell, like the one of a replay"""
+    with _shells_lock:
+        _shells[serial] = shell
+
+
+def _resolve_serial(serial: Optional[str], adb="adb") -> Optional[str]:
+    """the serial adb picks without -s, None if there isn't only one device"""
+    if serial is not None:
+        return serial
+    try:
+        result = subprocess.run(
+            [adb, "get-serialno"],
+            capture_output=True,
+            encoding="utf-8",
+            timeout=COMMAND_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.debug(f"Can't get the serial of the device: {e}")
+        return None
+    resolved = result.stdout.strip()
+    if result.returncode != 0 or not resolved or resolved == "unknown":
+        return None
+    return resolved
+
+
+@atexit.register
+def close_adb_shells():
+    with _shells_lock:
+        for shell in set(_shells.values()):
+            shell.close()
+        _shells.clear()
+
+
+class NullShell:
+    """a shell without device behind, for the replays: every output is empty"""
+
+    def run(self, command: str, cache: bool = False) -> str:
+        return ""
+
+    def forget(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class AdbShell:
+    """
+    One `adb shell` kept open for a device: commands are written to its
+    stdin, each one followed by an echo of a marker to know where its output
+    ends. That saves starting adb and connecting to the server for every
+    probe. Outputs of the probes can be kept for `cache_ttl` seconds.
+    """
+
+    def __init__(self, serial=None, adb="adb", cache_ttl=PROBE_CACHE_TTL):
+        self.command = [adb] + ([] if serial is None else ["-s", serial]) + ["shell"]
+        self.cache_ttl = cache_ttl
+        self.cache = {}
+        self.marker = f"--end-of-command-{uuid.uuid4().hex}--"
+        self.process = None
+        self.lines = None
+        self.lock = threading.Lock()
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            encoding="utf-8",
+            errors="replace",
+        )
+        self.lines = queue.Queue()
+        threading.Thread(
+            target=self._read, args=(self.process, self.lines), daemon=True
+        ).start()
+
+    @staticmethod
+    def _read(process, lines):
+        for line in process.stdout:
+            lines.put(line)
+        # closed
+        lines.put(None)
+
+    def _stop(self):
+        if self.process is not None:
+            self.process.kill()
+            self.process.wait()
+            self.process = None
+
+    def _send(self, command):
+        if self.process is None or self.process.poll() is not None:
+            self._start()
+        self.process.stdin.write(f"{command} 2>&1; echo {self.marker}\n")
+        self.process.stdin.flush()
+
+    def _execute(self, command) -> Optional[str]:
+        try:
+            self._send(command)
+        except OSError:
+            # the shell died since the last command, the device reconnected
+            self._stop()
+            self._send(command)
+        output = []
+        deadline = time.monotonic() + COMMAND_TIMEOUT
+        while True:
+            line = self.lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            if line is None:
+                return None
+            if line.rstrip("\r\n").endswith(self.marker):
+                # the output may not end with a new line
+                output.append(line.rstrip("\r\n")[: -len(self.marker)])
+                return "".join(output)
+            output.append(line)
+
+    def run(self, command: str, cache: bool = False) -> str:
+        """
+        output of the command (stdout and stderr), "" if the shell is broken;
+        set cache for read-only probes
+        """
+        with self.lock:
+            if cache:
+                cached = self.cache.get(command)
+                if cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+                    return cached[1]
+            else:
+                # something may have changed on the device
+                self.cache.clear()
+            try:
+                output = self._execute(command)
+            except (OSError, queue.Empty) as e:
+                logger.debug(f"adb shell failed on '{command}': {e}")
+                output = None
+            if output is None:
+                # the device was disconnected or the shell got stuck
+                self._stop()
+                return ""
+            if cache:
+                self.cache[command] = (time.monotonic(), output)
+            return output
+
+    def forget(self):
+        """drop the cached outputs, the device state changed"""
+        self.cache.clear()
+
+    def close(self):
+        with self.lock:
+            if self.process is not None:
+                try:
+                    self.process.stdin.close()
+                except OSError:
+                    pass
+            self._stop()
@@ -1,18 +1,22 @@
 import logging
+import os
 import random
-from datetime import datetime, timedelta
-from time import sleep
+from datetime import timedelta
 
 from colorama import Fore, Style
 
 from GramAddict import __tested_ig_version__
+from GramAddict.core import clock
+from GramAddict.core.clock import VirtualClock, sleep, use_clock
 from GramAddict.core.config import Config
 from GramAddict.core.device_facade import create_device, get_device_info
+from GramAddict.core.device_metrics import metrics
 from GramAddict.core.filter import Filter
 from GramAddict.core.filter import load_config as load_filter
 from GramAddict.core.interaction import load_config as load_interaction
 from GramAddict.core.log import (
     configure_logger,
+    get_log_file_config,
     is_log_file_updated,
     update_log_file_name,
 )
@@ -20,7 +24,7 @@ from GramAddict.core.navigation import check_if_english
 from GramAddict.core.persistent_list import PersistentList
 from GramAddict.core.report import print_full_report
 from GramAddict.core.session_state import SessionState, SessionStateEncoder
-from GramAddict.core.storage import Storage
+from GramAddict.core.storage import create_storage
 from GramAddict.core.utils import (
     ask_for_a_donation,
     can_repeat,
@@ -90,8 +94,18 @@ def start_bot(**kwargs):
     load_interaction(configs)
     load_utils(configs)
     load_views(configs)
+    if configs.args.virtual_clock:
+        if configs.args.device_replay is None:
+            # the waits are what keep a real device looking human
+            logger.error(
+                "virtual-clock only works with device-replay, it's ignored on a real device."
+            )
+        else:
+            use_clock(VirtualClock())
 
-    if not configs.args or not check_adb_connection():
+    if not configs.args or (
+        configs.args.device_replay is None and not check_adb_connection()
+    ):
         return
 
     if len(configs.enabled) < 1:
@@ -99,7 +113,14 @@ def start_bot(**kwargs):
             "You have to specify one of these actions: " + ", ".join(configs.actions)
         )
         return
-    device = create_device(configs.device_id, configs.app_id)
+    device = create_device(
+        configs.device_id,
+        configs.app_id,
+        configs.args.ui_snapshot,
+        configs.args.device_record,
+        configs.args.device_replay,
+    )
+    metrics.enable(configs.args.device_metrics)
     session_state = None
     if str(configs.args.total_sessions) != "-1":
         total_sessions = get_value(configs.args.total_sessions, None, -1)
@@ -125,7 +146,13 @@ def start_bot(**kwargs):
         get_device_info(device)
         session_state = SessionState(configs)
         session_state.set_limits_session()
+        metrics.reset()
         sessions.append(session_state)
+        session_state.start_checkpoints(
+            sessions,
+            int(configs.args.session_checkpoint_every),
+            float(configs.args.session_checkpoint_interval),
+        )
         check_screen_timeout()
         device.wake_up()
         head_up_notifications(enabled=False)
@@ -251,7 +278,7 @@ def start_bot(**kwargs):
         logger.info(
             f"There is/are {len(jobs_list)-len(unfollow_jobs)} active-job(s) and {len(unfollow_jobs)} unfollow-job(s) scheduled for this session."
         )
-        storage = Storage(session_state.my_username)
+        storage = create_storage(session_state.my_username, configs.args)
         filters = Filter(storage)
         show_ending_conditions()
         if not configs.args.debug:
@@ -331,8 +358,21 @@ def start_bot(**kwargs):
                 )
                 print_limits = True
 
+        storage.close()
+        logger.debug(
+            f"UI query cache: {device.query_cache.hits} hit(s), {device.query_cache.misses} miss(es)."
+        )
+        if metrics.enabled:
+            metrics.report()
+            # without a username there's no account folder
+            metrics_dir = getattr(storage, "account_path", None)
+            if metrics_dir is None:
+                _, metrics_dir, _, _ = get_log_file_config()
+            metrics.save(os.path.join(metrics_dir, "device_metrics.json"))
+
         # save the session in sessions.json
-        session_state.finishTime = datetime.now()
+        session_state.stop_checkpoints()
+        session_state.finishTime = clock.now()
         sessions.persist(directory=session_state.my_username)
 
         # print reports
@@ -388,7 +428,7 @@ def start_bot(**kwargs):
                     time_left,
                 )
                 logger.info(
-                    f'Next session will start at: {(datetime.now() + timedelta(seconds=time_left)).strftime("%H:%M:%S (%Y/%m/%d)")}.'
+                    f'Next session will start at: {(clock.now() + timedelta(seconds=time_left)).strftime("%H:%M:%S (%Y/%m/%d)")}.'
                 )
                 try:
                     sleep(time_left)
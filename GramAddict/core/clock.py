@@ -0,0 +1,60 @@
+import logging
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class SystemClock:
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+
+class VirtualClock:
+    """
+    Time only goes by when the bot sleeps, and at once: with a fake or a
+    replayed device, sessions and the pauses between them take seconds.
+    """
+
+    def __init__(self, start: datetime = None):
+        self.start = start or datetime.now()
+        self.elapsed = 0.0
+
+    def sleep(self, seconds: float):
+        self.elapsed += max(0.0, seconds)
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self.elapsed)
+
+
+_clock = SystemClock()
+
+
+def use_clock(clock):
+    """the clock of the bot from now on, returns the previous one"""
+    global _clock
+    previous, _clock = _clock, clock
+    if isinstance(clock, VirtualClock):
+        logger.info(f"Virtual time, starting at {clock.now():%H:%M:%S (%Y/%m/%d)}.")
+    return previous
+
+
+def sleep(seconds: float):
+    _clock.sleep(seconds)
+
+
+def monotonic() -> float:
+    return _clock.monotonic()
+
+
+def now() -> datetime:
+    return _clock.now()
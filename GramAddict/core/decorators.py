@@ -10,6 +10,7 @@ from uiautomator2.exceptions import UiObjectNotFoundError
 
 from GramAddict.core.device_facade import DeviceFacade
 from GramAddict.core.report import print_full_report
+from GramAddict.core.storage import flush_storages
 from GramAddict.core.utils import (
     check_if_crash_popup_is_there,
     close_instagram,
@@ -93,6 +94,8 @@ def run_safely(device, device_id, sessions, session_state, screen_record, config
                 logger.info(
                     f"List of running apps: {', '.join(device.deviceV2.app_list_running())}"
                 )
+                flush_storages()
+                session_state.stop_checkpoints()
                 save_crash(device)
                 close_instagram(device)
                 print_full_report(sessions, configs.args.scrape_to_file)
@@ -112,6 +115,7 @@ def restart(
     normal_crash: bool = True,
     print_traceback: bool = True,
 ):
+    flush_storages()
     if print_traceback:
         logger.error(traceback.format_exc())
         save_crash(device)
@@ -1,25 +1,42 @@
 import logging
 import string
+from contextlib import contextmanager
 from datetime import datetime
 from enum import Enum, auto
-from inspect import stack
 from os import getcwd, listdir
-from random import randint, uniform
+from random import randint, seed, uniform
 from re import search
-from subprocess import PIPE, run
-from time import sleep
-from typing import Optional
+from typing import List, Optional
 
 import uiautomator2
 
+from GramAddict.core.adb_shell import NullShell, adb_shell, set_adb_shell
+from GramAddict.core.clock import monotonic, sleep
+from GramAddict.core.device_metrics import timed
+from GramAddict.core.device_replay import record_device, replay_device
+from GramAddict.core.ui_snapshot import (
+    QueryCache,
+    SnapshotObject,
+    UiSnapshot,
+    selector_key,
+)
 from GramAddict.core.utils import random_sleep
 
 logger = logging.getLogger(__name__)
 
+# even without actions, the app keeps loading things: dumps and cached
+# query results are trusted that long
+SNAPSHOT_MAX_AGE = 1.0
+# without any action, a crash is noticed after that many seconds at most
+APP_CHECK_MAX_AGE = 5.0
+WAIT_ANY_INTERVAL = 0.5
 
-def create_device(device_id, app_id):
+
+def create_device(
+    device_id, app_id, ui_snapshot=False, record=None, replay=None, backend=None
+):
     try:
-        return DeviceFacade(device_id, app_id)
+        return DeviceFacade(device_id, app_id, ui_snapshot, record, replay, backend)
     except ImportError as e:
         logger.error(str(e))
         return None
@@ -81,9 +98,41 @@ class Mode(Enum):
 
 
 class DeviceFacade:
-    def __init__(self, device_id, app_id):
+    def __init__(
+        self,
+        device_id,
+        app_id,
+        ui_snapshot=False,
+        record=None,
+        replay=None,
+        backend=None,
+    ):
         self.device_id = device_id
         self.app_id = app_id
+        # answer lookups from one dump of the screen
+        self.ui_snapshots = ui_snapshot
+        self.epoch = 0
+        self.snapshot = None
+        self.query_cache = QueryCache(self, SNAPSHOT_MAX_AGE)
+        # (epoch, time) of the last time IG was seen in the foreground
+        self.app_checked = None
+        self.app_check_suspended = 0
+        if replay is not None:
+            self.deviceV2 = replay_device(replay)
+            # replays take the same random decisions each time
+            seed(replay)
+            # no device to run the probes on, the helpers of utils included
+            self.shell = NullShell()
+            set_adb_shell(device_id, self.shell)
+            return
+        if backend is not None:
+            # a stand-in for the device, like FakeInstagram
+            self.deviceV2 = backend
+            self.shell = backend.shell
+            set_adb_shell(device_id, self.shell)
+            if record is not None:
+                self.deviceV2 = record_device(self.deviceV2, record)
+            return
         try:
             if device_id is None or "." not in device_id:
                 self.deviceV2 = uiautomator2.connect(
@@ -93,6 +142,10 @@ class DeviceFacade:
                 self.deviceV2 = uiautomator2.connect_adb_wifi(f"{device_id}")
         except ImportError:
             raise ImportError("Please install uiautomator2: pip3 install uiautomator2")
+        if record is not None:
+            self.deviceV2 = record_device(self.deviceV2, record)
+        # probes go through one adb shell instead of a process each
+        self.shell = adb_shell(self.deviceV2.serial)
 
     def _get_current_app(self):
         try:
@@ -101,18 +154,33 @@ class DeviceFacade:
             raise DeviceFacade.JsonRpcError(e)
 
     def _ig_is_opened(self) -> bool:
-        return self._get_current_app() == self.app_id
+        # asked again after each action, the app rarely dies on its own
+        if self.app_checked is not None:
+            epoch, checked_at = self.app_checked
+            if epoch == self.epoch and monotonic() - checked_at < APP_CHECK_MAX_AGE:
+                return True
+        opened = self._get_current_app() == self.app_id
+        self.app_checked = (self.epoch, monotonic()) if opened else None
+        return opened
+
+    @contextmanager
+    def other_app_allowed(self):
+        """for the finds made while IG may be in the background"""
+        self.app_check_suspended += 1
+        try:
+            yield
+        finally:
+            self.app_check_suspended -= 1
 
     def check_if_ig_is_opened(func):
-        def wrapper(self, **kwargs):
-            avoid_lst = ["choose_cloned_app", "check_if_crash_popup_is_there"]
-            caller = stack()[1].function
-            if not self._ig_is_opened() and caller not in avoid_lst:
+        def wrapper(self, *args, **kwargs):
+            if not self.app_check_suspended and not self._ig_is_opened():
                 raise DeviceFacade.AppHasCrashed("App has crashed / has been closed!")
-            return func(self, **kwargs)
+            return func(self, *args, **kwargs)
 
         return wrapper
 
+    @timed
     @check_if_ig_is_opened
     def find(
         self,
@@ -120,16 +188,72 @@ class DeviceFacade:
         **kwargs,
     ):
         try:
-            view = self.deviceV2(**kwargs)
+            if self.ui_snapshots:
+                view = SnapshotObject(self, [(None, kwargs)])
+            else:
+                view = self.deviceV2(**kwargs)
             if index is not None and view.count > 1:
-                view = self.deviceV2(**kwargs)[index]
+                view = view[index]
         except uiautomator2.JSONRPCError as e:
             raise DeviceFacade.JsonRpcError(e)
-        return DeviceFacade.View(view=view, device=self.deviceV2)
+        return DeviceFacade.View(
+            view=view, device=self.deviceV2, cache=self.query_cache
+        )
+
+    @timed
+    @check_if_ig_is_opened
+    def find_many(self, *selectors: dict) -> List[bool]:
+        """
+        which of the selectors (the keywords of find) match something, all
+        evaluated on one dump of the screen
+        """
+        snapshot = self.ui_snapshot()
+        found = []
+        for selector in selectors:
+            selector = dict(selector)
+            if "index" in selector:
+                selector["instance"] = selector.pop("index")
+            found.append(bool(snapshot.select([(None, selector)])))
+        return found
+
+    @timed
+    def wait_any(self, *selectors: dict, ui_timeout=None) -> Optional[int]:
+        """position of the first selector to match something, None on timeout"""
+        deadline = monotonic() + DeviceFacade.View.get_ui_timeout(ui_timeout)
+        while True:
+            found = self.find_many(*selectors)
+            if any(found):
+                return found.index(True)
+            if monotonic() >= deadline:
+                return None
+            sleep(WAIT_ANY_INTERVAL)
+            self.screen_changed()
+
+    def screen_changed(self):
+        """the next lookup will dump the screen again"""
+        self.epoch += 1
+        if self.shell is not None:
+            self.shell.forget()
+
+    def ui_snapshot(self) -> UiSnapshot:
+        snapshot = self.snapshot
+        if (
+            snapshot is None
+            or snapshot.epoch != self.epoch
+            or snapshot.age() > SNAPSHOT_MAX_AGE
+        ):
+            try:
+                xml_dump = self.get_hierarchy()
+            except uiautomator2.JSONRPCError as e:
+                raise DeviceFacade.JsonRpcError(e)
+            snapshot = self.snapshot = UiSnapshot(xml_dump, self.epoch)
+        return snapshot
 
+    @timed
     def back(self, modulable: bool = True):
         logger.debug("Press back button.")
         self.deviceV2.press("back")
+        self.screen_changed()
         random_sleep(modulable=modulable)
 
     def start_screenrecord(self, output="debug_0000.mp4", fps=20):
@@ -185,31 +309,31 @@ class DeviceFacade:
         if self.deviceV2.screenrecord.stop(crash=crash):
             logger.warning("Screen recorder has been stopped successfully!")
 
+    @timed
     def screenshot(self, path=None):
         if path is None:
             return self.deviceV2.screenshot()
         else:
             self.deviceV2.screenshot(path)
 
+    @timed
+    def get_hierarchy(self) -> str:
+        return self.deviceV2.dump_hierarchy()
+
     def dump_hierarchy(self, path):
-        xml_dump = self.deviceV2.dump_hierarchy()
+        xml_dump = self.get_hierarchy()
         with open(path, "w", encoding="utf-8") as outfile:
             outfile.write(xml_dump)
 
     def press_power(self):
         self.deviceV2.press("power")
+        self.screen_changed()
         sleep(2)
 
     def is_screen_locked(self):
-        data = run(
-            f"adb -s {self.deviceV2.serial} shell dumpsys window",
-            encoding="utf-8",
-            stdout=PIPE,
-            stderr=PIPE,
-            shell=True,
-        )
+        data = self.shell.run("dumpsys window", cache=True)
         if data != "":
-            flag = search("mDreamingLockscreen=(true|false)", data.stdout)
+            flag = search("mDreamingLockscreen=(true|false)", data)
             return flag is not None and flag.group(1) == "true"
         else:
             logger.debug(
@@ -218,16 +342,10 @@ class DeviceFacade:
             return None
 
     def _is_keyboard_show(self):
-        data = run(
-            f"adb -s {self.deviceV2.serial} shell dumpsys input_method",
-            encoding="utf-8",
-            stdout=PIPE,
-            stderr=PIPE,
-            shell=True,
-        )
+        data = self.shell.run("dumpsys input_method", cache=True)
         if data != "":
-            flag = search("mInputShown=(true|false)", data.stdout)
-            return flag.group(1) == "true"
+            flag = search("mInputShown=(true|false)", data)
+            return flag is not None and flag.group(1) == "true"
         else:
             logger.debug(
                 f"'adb -s {self.deviceV2.serial} shell dumpsys input_method' returns nothing!"
@@ -259,6 +377,7 @@ class DeviceFacade:
 
     def screen_off(self):
         self.deviceV2.screen_off()
+        self.screen_changed()
 
     def get_orientation(self):
         try:
@@ -273,6 +392,7 @@ class DeviceFacade:
         except uiautomator2.JSONRPCError as e:
             raise DeviceFacade.JsonRpcError(e)
 
+    @timed
     def swipe(self, direction: Direction, scale=0.5):
         """Swipe finger in the `direction`.
         Scale is the sliding distance. Default to 50% of the screen width
@@ -291,10 +411,12 @@ class DeviceFacade:
 
         try:
             self.deviceV2.swipe_ext(swipe_dir, scale=scale)
+            self.screen_changed()
             DeviceFacade.sleep_mode(SleepTime.TINY)
         except uiautomator2.JSONRPCError as e:
             raise DeviceFacade.JsonRpcError(e)
 
+    @timed
     def swipe_points(self, sx, sy, ex, ey, random_x=True, random_y=True):
         if random_x:
             sx = int(sx * uniform(0.85, 1.15))
@@ -305,6 +427,7 @@ class DeviceFacade:
         try:
             logger.debug(f"Swipe from: ({sx},{sy}) to ({ex},{ey}).")
             self.deviceV2.swipe_points([[sx, sy], [ex, ey]], uniform(0.2, 0.5))
+            self.screen_changed()
             DeviceFacade.sleep_mode(SleepTime.TINY)
         except uiautomator2.JSONRPCError as e:
             raise DeviceFacade.JsonRpcError(e)
@@ -334,30 +457,58 @@ class DeviceFacade:
         deviceV2 = None  # uiautomator2
         viewV2 = None  # uiautomator2
 
-        def __init__(self, view, device):
+        def __init__(self, view, device, cache=None):
             self.viewV2 = view
             self.deviceV2 = device
+            self.cache = cache
+
+        def _screen_changed(self):
+            if self.cache is not None:
+                self.cache.facade.screen_changed()
+
+        def _query(self, query, compute, usable=None):
+            """the result of the same query since the last action, if any"""
+            key = None if self.cache is None else selector_key(self.viewV2)
+            if key is None:
+                return compute()
+            return self.cache.get((key, query), compute, usable)
+
+        def _info(self) -> dict:
+            return self._query("info", lambda: self.viewV2.info)
+
+        def _exists(self, timeout) -> bool:
+            # a miss doesn't answer a call willing to wait
+            return self._query(
+                "exists",
+                lambda: self.viewV2.exists(timeout),
+                lambda found: found or not timeout,
+            )
+
+        def _count(self) -> int:
+            return self._query("count", lambda: self.viewV2.count)
 
         def __iter__(self):
             children = []
             try:
                 children.extend(
-                    DeviceFacade.View(view=item, device=self.deviceV2)
+                    DeviceFacade.View(view=item, device=self.deviceV2, cache=self.cache)
                     for item in self.viewV2
                 )
                 return iter(children)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
+        @timed
         def ui_info(self):
             try:
-                return self.viewV2.info
+                return self._info()
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
+        @timed
         def get_desc(self):
             try:
-                return self.viewV2.info["contentDescription"]
+                return self._info()["contentDescription"]
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
@@ -366,49 +517,51 @@ class DeviceFacade:
                 view = self.viewV2.child(*args, **kwargs)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
-            return DeviceFacade.View(view=view, device=self.deviceV2)
+            return DeviceFacade.View(view=view, device=self.deviceV2, cache=self.cache)
 
         def sibling(self, *args, **kwargs):
             try:
                 view = self.viewV2.sibling(*args, **kwargs)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
-            return DeviceFacade.View(view=view, device=self.deviceV2)
+            return DeviceFacade.View(view=view, device=self.deviceV2, cache=self.cache)
 
         def left(self, *args, **kwargs):
             try:
                 view = self.viewV2.left(*args, **kwargs)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
-            return DeviceFacade.View(view=view, device=self.deviceV2)
+            return DeviceFacade.View(view=view, device=self.deviceV2, cache=self.cache)
 
         def right(self, *args, **kwargs):
             try:
                 view = self.viewV2.right(*args, **kwargs)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
-            return DeviceFacade.View(view=view, device=self.deviceV2)
+            return DeviceFacade.View(view=view, device=self.deviceV2, cache=self.cache)
 
         def up(self, *args, **kwargs):
             try:
                 view = self.viewV2.up(*args, **kwargs)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
-            return DeviceFacade.View(view=view, device=self.deviceV2)
+            return DeviceFacade.View(view=view, device=self.deviceV2, cache=self.cache)
 
         def down(self, *args, **kwargs):
             try:
                 view = self.viewV2.down(*args, **kwargs)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
-            return DeviceFacade.View(view=view, device=self.deviceV2)
+            return DeviceFacade.View(view=view, device=self.deviceV2, cache=self.cache)
 
         def click_gone(self, maxretry=3, interval=1.0):
             try:
                 self.viewV2.click_gone(maxretry, interval)
+                self._screen_changed()
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
+        @timed
         def click(self, mode=None, sleep=None, coord=None, crash_report_if_fails=True):
             if coord is None:
                 coord = []
@@ -448,6 +601,7 @@ class DeviceFacade:
                 try:
                     logger.debug(f"Single click ({coord[0]},{coord[1]})")
                     self.deviceV2.click(coord[0], coord[1])
+                    self._screen_changed()
                     DeviceFacade.sleep_mode(sleep)
                     return
                 except uiautomator2.JSONRPCError as e:
@@ -478,6 +632,7 @@ class DeviceFacade:
                     self.get_ui_timeout(Timeout.LONG),
                     offset=(x_offset, y_offset),
                 )
+                self._screen_changed()
                 DeviceFacade.sleep_mode(sleep)
 
             except uiautomator2.JSONRPCError as e:
@@ -505,6 +660,7 @@ class DeviceFacade:
             logger.warning("Failed to open the UI element!")
             return False
 
+        @timed
         def double_click(self, padding=0.3, obj_over=0):
             """Double click randomly in the selected view using padding
             padding: % of how far from the borders we want the double
@@ -539,28 +695,34 @@ class DeviceFacade:
                 self.deviceV2.double_click(
                     random_x, random_y, duration=time_between_clicks
                 )
+                self._screen_changed()
                 DeviceFacade.sleep_mode(SleepTime.DEFAULT)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
+        @timed
         def scroll(self, direction):
             try:
                 if direction == Direction.UP:
                     self.viewV2.scroll.toBeginning(max_swipes=1)
                 else:
                     self.viewV2.scroll.toEnd(max_swipes=1)
+                self._screen_changed()
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
+        @timed
         def fling(self, direction):
             try:
                 if direction == Direction.UP:
                     self.viewV2.fling.toBeginning(max_swipes=5)
                 else:
                     self.viewV2.fling.toEnd(max_swipes=5)
+                self._screen_changed()
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
+        @timed
         def exists(self, ui_timeout=None, ignore_bug: bool = False) -> bool:
             try:
                 # Currently, the methods left, right, up and down from
@@ -569,14 +731,10 @@ class DeviceFacade:
                 # We will open a ticket to uiautomator2 to fix this inconsistency.
                 if self.viewV2 is None:
                     return False
-                exists: bool = self.viewV2.exists(self.get_ui_timeout(ui_timeout))
-                if (
-                    hasattr(self.viewV2, "count")
-                    and not exists
-                    and self.viewV2.count >= 1
-                ):
+                exists: bool = self._exists(self.get_ui_timeout(ui_timeout))
+                if hasattr(self.viewV2, "count") and not exists and self._count() >= 1:
                     logger.debug(
-                        f"UIA2 BUG: exists return False, but there is/are {self.viewV2.count} element(s)!"
+                        f"UIA2 BUG: exists return False, but there is/are {self._count()} element(s)!"
                     )
                     if ignore_bug:
                         return "BUG!"
@@ -586,21 +744,30 @@ class DeviceFacade:
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
+        @timed
         def count_items(self) -> int:
             try:
-                return self.viewV2.count
+                return self._count()
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
+        @timed
         def wait(self, ui_timeout=Timeout.MEDIUM):
             try:
-                return self.viewV2.wait(timeout=self.get_ui_timeout(ui_timeout))
+                found = self.viewV2.wait(timeout=self.get_ui_timeout(ui_timeout))
+                if found and self.cache is not None:
+                    self.cache.put((selector_key(self.viewV2), "exists"), True)
+                return found
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
+        @timed
         def wait_gone(self, ui_timeout=None):
             try:
-                return self.viewV2.wait_gone(timeout=self.get_ui_timeout(ui_timeout))
+                gone = self.viewV2.wait_gone(timeout=self.get_ui_timeout(ui_timeout))
+                if gone and self.cache is not None:
+                    self.cache.put((selector_key(self.viewV2), "exists"), False)
+                return gone
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
@@ -615,9 +782,10 @@ class DeviceFacade:
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
+        @timed
         def get_bounds(self) -> dict:
             try:
-                return self.viewV2.info["bounds"]
+                return self._info()["bounds"]
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
@@ -631,14 +799,14 @@ class DeviceFacade:
 
         def get_property(self, prop: str):
             try:
-                return self.viewV2.info[prop]
+                return self._info()[prop]
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
         def is_scrollable(self):
             try:
-                if self.viewV2.exists():
-                    return self.viewV2.info["scrollable"]
+                if self._exists(0):
+                    return self._info()["scrollable"]
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
@@ -657,10 +825,11 @@ class DeviceFacade:
                 ui_timeout = 8
             return ui_timeout
 
+        @timed
         def get_text(self, error=True, index=None):
             try:
                 text = (
-                    self.viewV2.info["text"]
+                    self._info()["text"]
                     if index is None
                     else self.viewV2[index].info["text"]
                 )
@@ -676,8 +845,8 @@ class DeviceFacade:
 
         def get_selected(self) -> bool:
             try:
-                if self.viewV2.exists():
-                    return self.viewV2.info["selected"]
+                if self._exists(0):
+                    return self._info()["selected"]
                 logger.debug(
                     "Object has disappeared! Probably too short video which has been liked!"
                 )
@@ -685,6 +854,7 @@ class DeviceFacade:
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
 
+        @timed
         def set_text(self, text: str, mode: Mode = Mode.TYPE) -> None:
             punct_list = string.punctuation
             try:
@@ -732,6 +902,7 @@ class DeviceFacade:
                         logger.debug(
                             f"Text typed in: {(datetime.now()-start).total_seconds():.2f}s"
                         )
+                self._screen_changed()
                 DeviceFacade.sleep_mode(SleepTime.SHORT)
             except uiautomator2.JSONRPCError as e:
                 raise DeviceFacade.JsonRpcError(e)
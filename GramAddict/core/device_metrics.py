@@ -0,0 +1,189 @@
+import json
+import logging
+import sys
+import threading
+from bisect import bisect_left
+from functools import wraps
+from time import perf_counter
+
+from atomicwrites import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# upper bounds of the latency buckets, in milliseconds, the last one is open
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# the frames of these modules are skipped to find who asked for an operation
+INTERNAL_MODULES = {
+    "GramAddict.core.device_facade",
+    "GramAddict.core.device_metrics",
+    "GramAddict.core.ui_snapshot",
+}
+
+
+class _Stat:
+    __slots__ = ("count", "total", "own", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        # without the time spent in the timed operations it called
+        self.own = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, seconds, own):
+        self.count += 1
+        self.total += seconds
+        self.own += own
+        self.max = max(self.max, seconds)
+        self.buckets[bisect_left(BUCKETS_MS, seconds * 1000)] += 1
+
+    def add_stat(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.own += other.own
+        self.max = max(self.max, other.max)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def percentile(self, rank) -> float:
+        """upper bound of the bucket holding that rank, in milliseconds"""
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank * self.count:
+                return float(bound)
+        return round(self.max * 1000, 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 3),
+            "own_s": round(self.own, 3),
+            "avg_ms": round(self.total * 1000 / self.count, 1),
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "max_ms": round(self.max * 1000, 1),
+            "buckets_ms": dict(
+                zip([str(bound) for bound in BUCKETS_MS] + ["inf"], self.buckets)
+            ),
+        }
+
+
+def _caller() -> str:
+    """the function that asked for the operation, as module.qualname"""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_globals.get("__name__") in INTERNAL_MODULES:
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    code = frame.f_code
+    name = getattr(code, "co_qualname", None)
+    if name is None:
+        owner = frame.f_locals.get("self")
+        name = (
+            code.co_name if owner is None else f"{type(owner).__name__}.{code.co_name}"
+        )
+    return f"{frame.f_globals.get('__name__', '').rsplit('.', 1)[-1]}.{name}"
+
+
+class DeviceMetrics:
+    """
+    Counters and latency histograms of the device operations, by operation
+    and by the function which called them. Disabled, the timed methods cost
+    one attribute check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stats = {}
+        self.local = threading.local()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def reset(self):
+        self.stats = {}
+
+    def record(self, operation, caller, seconds, own=None):
+        key = (operation, caller)
+        stat = self.stats.get(key)
+        if stat is None:
+            stat = self.stats[key] = _Stat()
+        stat.add(seconds, seconds if own is None else own)
+
+    def timed(self, operation, func, args, kwargs):
+        # time of the timed operations running inside this one
+        nested = getattr(self.local, "nested", None)
+        if nested is None:
+            nested = self.local.nested = []
+        caller = _caller()
+        nested.append(0.0)
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = perf_counter() - start
+            inner = nested.pop()
+            if nested:
+                nested[-1] += elapsed
+            self.record(operation, caller, elapsed, elapsed - inner)
+
+    def by_operation(self) -> dict:
+        operations = {}
+        for (operation, _), stat in self.stats.items():
+            operations.setdefault(operation, _Stat()).add_stat(stat)
+        return operations
+
+    def to_dict(self) -> dict:
+        callers = {}
+        for (operation, caller), stat in sorted(self.stats.items()):
+            callers.setdefault(operation, {})[caller] = stat.to_dict()
+        return {
+            "buckets_ms": list(BUCKETS_MS),
+            "operations": {
+                operation: stat.to_dict()
+                for operation, stat in sorted(self.by_operation().items())
+            },
+            "callers": callers,
+        }
+
+    def report(self, top=15):
+        operations = sorted(
+            self.by_operation().items(), key=lambda item: item[1].own, reverse=True
+        )
+        if not operations:
+            return
+        logger.info("Device operations (by own time):")
+        for operation, stat in operations[:top]:
+            logger.info(
+                f"{operation}: {stat.count} call(s), {stat.own:.1f}s own, {stat.total:.1f}s total, "
+                f"p50 {stat.percentile(0.5):.0f}ms, p90 {stat.percentile(0.9):.0f}ms, max {stat.max * 1000:.0f}ms"
+            )
+        slowest = sorted(self.stats.items(), key=lambda item: item[1].own, reverse=True)
+        for (operation, caller), stat in slowest[:top]:
+            logger.debug(
+                f"{caller} -> {operation}: {stat.own:.1f}s in {stat.count} call(s)"
+            )
+
+    def save(self, path):
+        try:
+            with atomic_write(path, overwrite=True, encoding="utf-8") as outfile:
+                json.dump(self.to_dict(), outfile, indent=4)
+        except OSError as e:
+            logger.warning(f"Can't save the device metrics in {path}: {e}")
+
+
+metrics = DeviceMetrics()
+
+
+def timed(func):
+    """times the calls of a device operation when the metrics are enabled"""
+    operation = func.__qualname__.replace("DeviceFacade.", "")
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if not metrics.enabled:
+            return func(*args, **kwargs)
+        return metrics.timed(operation, func, args, kwargs)
+
+    return wrapper
@@ -0,0 +1,210 @@
+import json
+import logging
+import threading
+from collections import defaultdict
+
+import uiautomator2.exceptions
+
+logger = logging.getLogger(__name__)
+
+# a call returned something which isn't data (UiObject, helpers...)
+OBJECT = "object"
+
+
+class ReplayMissError(LookupError):
+    """the replayed session didn't make that call"""
+
+
+def _key(path) -> str:
+    return json.dumps(path, default=repr, sort_keys=True)
+
+
+def _loose_key(path) -> str:
+    # actions are made at random coordinates, they're matched by name
+    return _key(path[:-1] + [["call"]])
+
+
+def _is_data(value) -> bool:
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+class _Recorder:
+    """appends the calls made on the device and what they returned to a file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, path, **entry):
+        entry["key"] = _key(path)
+        if path[-1][0] == "call":
+            entry["loose"] = _loose_key(path)
+        with self.lock:
+            self.file.write(json.dumps(entry, default=repr) + "\n")
+            # kept on disk for save_crash
+            self.file.flush()
+
+    def run(self, path, compute):
+        try:
+            value = compute()
+        except uiautomator2.exceptions.JSONRPCError as e:
+            self.write(
+                path,
+                error=type(e).__name__,
+                rpc={"code": e.code, "message": e.message, "data": e.data},
+                method=e.method,
+            )
+            raise
+        except Exception as e:
+            self.write(path, error=type(e).__name__, message=str(e))
+            raise
+        if _is_data(value):
+            self.write(path, value=value)
+            return value
+        if path[-1][0] == "call":
+            self.write(path, value=OBJECT)
+        return _RecordingProxy(value, path, self)
+
+
+class _RecordingProxy:
+    """forwards everything to the uiautomator2 object and records it"""
+
+    def __init__(self, target, path, recorder):
+        self._target = target
+        self._path = path
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name in ("_target", "_path", "_recorder"):
+            raise AttributeError(name)
+        return self._recorder.run(
+            self._path + [["attr", name]], lambda: getattr(self._target, name)
+        )
+
+    def __call__(self, *args, **kwargs):
+        return self._recorder.run(
+            self._path + [["call", list(args), kwargs]],
+            lambda: self._target(*args, **kwargs),
+        )
+
+    def __getitem__(self, index):
+        return self._recorder.run(
+            self._path + [["item", index]], lambda: self._target[index]
+        )
+
+    def __iter__(self):
+        items = list(self._target)
+        self._recorder.write(self._path + [["len"]], value=len(items))
+        return iter(
+            [
+                _RecordingProxy(item, self._path + [["item", index]], self._recorder)
+                for index, item in enumerate(items)
+            ]
+        )
+
+
+class _Replay:
+    """the recorded answers, in the order of the session for each call"""
+
+    def __init__(self, path):
+        self.answers = defaultdict(list)
+        self.positions = defaultdict(int)
+        with open(path, encoding="utf-8") as recording:
+            for line in recording:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self.answers[entry["key"]].append(entry)
+                if "loose" in entry:
+                    self.answers[entry["loose"]].append(entry)
+
+    def next(self, key):
+        answers = self.answers.get(key)
+        if not answers:
+            return None
+        position = self.positions[key]
+        # once over, the last answer is given again: polling keeps working
+        self.positions[key] = min(position + 1, len(answers) - 1)
+        return answers[position]
+
+    def answer(self, path):
+        entry = self.next(_key(path))
+        if entry is None and path[-1][0] == "call":
+            loose = self.next(_loose_key(path))
+            # only the actions, which answer nothing, match other arguments
+            if loose is not None and loose.get("value", OBJECT) is None:
+                entry = loose
+        if entry is None:
+            if path[-1][0] == "call":
+                raise ReplayMissError(f"Not in the recording: {_key(path)}")
+            return _ReplayProxy(path, self)
+        if "error" in entry:
+            raise _error(entry)
+        if entry["value"] == OBJECT:
+            return _ReplayProxy(path, self)
+        return entry["value"]
+
+
+def _error(entry) -> Exception:
+    error = getattr(uiautomator2.exceptions, entry["error"], None)
+    if isinstance(error, type) and issubclass(
+        error, uiautomator2.exceptions.JSONRPCError
+    ):
+        return error(entry["rpc"], entry.get("method"))
+    if isinstance(error, type) and issubclass(error, Exception):
+        return error(entry.get("message"))
+    return RuntimeError(f"{entry['error']}: {entry.get('message')}")
+
+
+class _ReplayProxy:
+    """stands for a uiautomator2 object, answers with the recording"""
+
+    def __init__(self, path, replay):
+        self._path = path
+        self._replay = replay
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name in ("_path", "_replay"):
+            raise AttributeError(name)
+        return self._replay.answer(self._path + [["attr", name]])
+
+    def __call__(self, *args, **kwargs):
+        return self._replay.answer(self._path + [["call", list(args), kwargs]])
+
+    def __getitem__(self, index):
+        return self._replay.answer(self._path + [["item", index]])
+
+    def __iter__(self):
+        count = self._replay.answer(self._path + [["len"]])
+        if not isinstance(count, int):
+            raise ReplayMissError(f"Not in the recording: {_key(self._path)}")
+        return iter(
+            [
+                _ReplayProxy(self._path + [["item", index]], self._replay)
+                for index in range(count)
+            ]
+        )
+
+
+def record_device(device, path):
+    """the uiautomator2 device, with all its calls and answers saved in path"""
+    logger.info(f"Recording the device session in {path}.")
+    return _RecordingProxy(device, [], _Recorder(path))
+
+
+def replay_device(path):
+    """a device answering like the recorded one, without any device"""
+    logger.info(f"Replaying the device session recorded in {path}.")
+    return _ReplayProxy([], _Replay(path))
+
+
+def recording_path(device):
+    """where the calls of that device are being recorded, if they are"""
+    if isinstance(device, _RecordingProxy):
+        return device._recorder.path
+    return None
@@ -0,0 +1,1441 @@
+import logging
+import random
+from bisect import bisect_right
+from collections import defaultdict
+from itertools import accumulate
+from typing import Dict, List, Optional
+from xml.sax.saxutils import quoteattr
+
+from uiautomator2.exceptions import UiObjectNotFoundError
+
+from GramAddict.core.resources import ClassName, ResourceID
+from GramAddict.core.ui_snapshot import SnapshotObject, UiSnapshot
+
+logger = logging.getLogger(__name__)
+
+WIDTH = 1080
+HEIGHT = 2340
+ACTION_BAR_TOP = 60
+ACTION_BAR_BOTTOM = 210
+TAB_BAR_TOP = 2200
+# rows showing fewer pixels than that aren't in the dumps
+MIN_VISIBLE = 10
+# share of its height a list is moved by a swipe of UiScrollable, and by a fling
+SCROLL_PAGE = 0.8
+FLING_PAGE = 3.0
+RECENT_SEARCHES = 10
+SEARCH_RESULTS = 20
+LAUNCHER = "com.android.launcher3"
+HOME = "Home"
+SEARCH = "Search and Explore"
+PROFILE = "Profile"
+TABS = (HOME, SEARCH, "Reels", "Activity", PROFILE)
+
+# heights of the rows
+USER_ROW = 200
+SEARCH_ROW = 130
+SEARCH_RESULT = 160
+TABS_ROW = 130
+PROFILE_HEADER = 760
+PROFILE_TABS = 150
+PRIVATE_NOTICE = 500
+GRID_DIVIDER = 20
+GRID_ROW = 360
+POST_PARTS = {
+    "header": 150,
+    "media": 1080,
+    "buttons": 140,
+    "likes": 70,
+    "caption": 130,
+    "gap": 60,
+}
+COORDINATOR_LAYOUT = "androidx.coordinatorlayout.widget.CoordinatorLayout"
+
+
+class FakeUser:
+    def __init__(self, username, full_name="", biography="", private=False):
+        self.username = username
+        self.full_name = full_name
+        self.biography = biography
+        self.private = private
+        self.followers: List[str] = []
+        self.following: List[str] = []
+        # oldest first
+        self.posts: List["FakePost"] = []
+
+
+class FakePost:
+    def __init__(self, number, owner, caption, hashtags, likers):
+        self.number = number
+        self.owner = owner
+        self.caption = caption
+        self.hashtags = hashtags
+        self.likers = likers
+
+
+class SocialGraph:
+    """the users and posts the fake Instagram is made of"""
+
+    def __init__(self):
+        self.users: Dict[str, FakeUser] = {}
+        self.posts: List[FakePost] = []
+        self.hashtags = defaultdict(list)
+
+    def add_user(self, username, **kwargs) -> FakeUser:
+        user = self.users.get(username)
+        if user is None:
+            user = self.users[username] = FakeUser(username, **kwargs)
+        return user
+
+    def follow(self, follower, followed):
+        if followed not in self.users[follower].following:
+            self.users[followed].followers.append(follower)
+            self.users[follower].following.append(followed)
+
+    def unfollow(self, follower, followed):
+        if followed in self.users[follower].following:
+            self.users[followed].followers.remove(follower)
+            self.users[follower].following.remove(followed)
+
+    def add_post(self, owner, caption="", hashtags=(), likers=()) -> FakePost:
+        post = FakePost(len(self.posts), owner, caption, list(hashtags), list(likers))
+        self.posts.append(post)
+        self.users[owner].posts.append(post)
+        for hashtag in post.hashtags:
+            self.hashtags[hashtag].append(post)
+        return post
+
+    @classmethod
+    def generate(
+        cls, users=1000, bloggers=3, hashtags=("travel", "food", "cats"), seed=0
+    ) -> "SocialGraph":
+        """
+        users with a few followers and posts each, and bloggers followed by
+        half of them or more; the same seed gives the same graph
+        """
+        rnd = random.Random(seed)
+        graph = cls()
+        names = [f"user{number:05d}" for number in range(users)]
+        for name in names:
+            graph.add_user(
+                name, full_name=f"User {name[4:]}", private=rnd.random() < 0.1
+            )
+        stars = [f"blogger{number}" for number in range(bloggers)]
+        for name in stars:
+            graph.add_user(name, full_name=f"Blogger {name[7:]}", biography="Hi!")
+            for follower in rnd.sample(names, rnd.randint(users // 2, users)):
+                graph.follow(follower, name)
+        for name in names:
+            for followed in rnd.sample(names, min(users, rnd.randint(0, 20))):
+                if followed != name:
+                    graph.follow(name, followed)
+        for name in stars + names:
+            is_star = name in stars
+            for _ in range(rnd.randint(3, 9) if is_star else rnd.randint(0, 4)):
+                tags = rnd.sample(hashtags, rnd.randint(1, min(2, len(hashtags))))
+                likers = rnd.sample(
+                    names, rnd.randint(0, min(users, 300 if is_star else 30))
+                )
+                graph.add_post(
+                    name,
+                    caption=" ".join(f"#{tag}" for tag in tags),
+                    hashtags=tags,
+                    likers=likers,
+                )
+        return graph
+
+
+def _counter(value: int) -> str:
+    """like the counters of the profiles: 1,234 then 12.3K and 1.2M"""
+    if value < 10_000:
+        return f"{value:,}"
+    if value < 1_000_000:
+        return f"{value / 1_000:.1f}".rstrip("0").rstrip(".") + "K"
+    return f"{value / 1_000_000:.1f}".rstrip("0").rstrip(".") + "M"
+
+
+def _first(resource_id: str) -> str:
+    """one of the ids of a regex of ResourceID"""
+    return resource_id.split("|")[0]
+
+
+def _nothing():
+    pass
+
+
+class _Field:
+    """the text of an EditText"""
+
+    def __init__(self, on_change=None):
+        self.text = ""
+        self.on_change = on_change
+
+    def set(self, text):
+        self.text = text
+        if self.on_change is not None:
+            self.on_change()
+
+
+class _Node:
+    """a view of a screen, before it's dumped"""
+
+    __slots__ = (
+        "cls",
+        "bounds",
+        "resource_id",
+        "text",
+        "desc",
+        "children",
+        "on_click",
+        "on_double_click",
+        "field",
+        "selected",
+        "scrollable",
+        "visible",
+    )
+
+    def __init__(
+        self,
+        cls,
+        bounds,
+        resource_id="",
+        text="",
+        desc="",
+        children=(),
+        on_click=None,
+        on_double_click=None,
+        field=None,
+        selected=False,
+        scrollable=False,
+    ):
+        self.cls = cls
+        self.bounds = bounds
+        self.resource_id = resource_id
+        self.text = text
+        self.desc = desc
+        self.children = children
+        self.on_click = on_click
+        self.on_double_click = on_double_click
+        self.field = field
+        self.selected = selected
+        self.scrollable = scrollable
+        # the bounds once clipped by the list it's in
+        self.visible = bounds
+
+    def actionable(self) -> bool:
+        return (
+            self.on_click is not None
+            or self.on_double_click is not None
+            or self.field is not None
+        )
+
+
+class _Screen:
+    """
+    A screen is a fixed part under the action bar and a list of rows
+    scrolled in the rest of the space, above the tab bar. Only the rows
+    in view are drawn.
+    """
+
+    fixed_height = 0
+    container_class = ClassName.LIST_VIEW
+
+    def __init__(self, app):
+        self.app = app
+        self.ids = app.ids
+        self.offset = 0
+        self._tops = None
+
+    @property
+    def title(self) -> str:
+        return ""
+
+    def bar(self) -> List[_Node]:
+        return [
+            _Node(
+                ClassName.TEXT_VIEW,
+                (180, ACTION_BAR_TOP + 30, 900, ACTION_BAR_BOTTOM - 30),
+                self.ids.ACTION_BAR_TITLE,
+                text=self.title,
+            )
+        ]
+
+    def fixed(self) -> List[_Node]:
+        return []
+
+    def heights(self) -> List[int]:
+        return []
+
+    def row(self, index, top) -> _Node:
+        raise NotImplementedError
+
+    def container_id(self) -> str:
+        return self.ids.LIST
+
+    def relayout(self):
+        """the rows have changed"""
+        self._tops = None
+        self.offset = min(self.offset, self.max_offset())
+
+    def reset(self):
+        self.offset = 0
+
+    def viewport(self):
+        return ACTION_BAR_BOTTOM + self.fixed_height, TAB_BAR_TOP
+
+    def _layout(self) -> List[int]:
+        if self._tops is None:
+            self._tops = [0] + list(accumulate(self.heights()))
+        return self._tops
+
+    def max_offset(self) -> int:
+        top, bottom = self.viewport()
+        return max(0, self._layout()[-1] - (bottom - top))
+
+    def scroll(self, dy) -> bool:
+        offset = min(max(0, self.offset + int(dy)), self.max_offset())
+        moved = offset != self.offset
+        self.offset = offset
+        return moved
+
+    def visible_rows(self):
+        """(index, top on the screen) of the rows in view"""
+        tops = self._layout()
+        top, bottom = self.viewport()
+        rows = []
+        for index in range(max(0, bisect_right(tops, self.offset) - 1), len(tops) - 1):
+            row_top = top + tops[index] - self.offset
+            if row_top >= bottom:
+                break
+            rows.append((index, row_top))
+        return rows
+
+    def content(self) -> List[_Node]:
+        top, bottom = self.viewport()
+        return [
+            _Node(
+                self.container_class,
+                (0, top, WIDTH, bottom),
+                self.container_id(),
+                children=[
+                    self.row(index, row_top) for index, row_top in self.visible_rows()
+                ],
+                scrollable=True,
+            )
+        ]
+
+
+class _Search(_Screen):
+    def __init__(self, app):
+        super().__init__(app)
+        self.query = _Field(self._new_query)
+        self.results = []
+
+    def _new_query(self):
+        self.offset = 0
+        self.relayout()
+
+    def bar(self) -> List[_Node]:
+        return [
+            _Node(
+                ClassName.EDIT_TEXT,
+                (40, ACTION_BAR_TOP + 20, WIDTH - 40, ACTION_BAR_BOTTOM - 20),
+                self.ids.ACTION_BAR_SEARCH_EDIT_TEXT,
+                text=self.query.text,
+                field=self.query,
+            )
+        ]
+
+    def reset(self):
+        super().reset()
+        self.query.set("")
+
+    def _search(self) -> List[str]:
+        text = self.query.text.strip().lower()
+        if not text:
+            return list(self.app.recent)
+        graph = self.app.graph
+        hashtags = [
+            f"#{hashtag}"
+            for hashtag in sorted(graph.hashtags)
+            if hashtag.startswith(text.lstrip("#"))
+        ]
+        if text.startswith("#"):
+            return hashtags[:SEARCH_RESULTS]
+        # the exact match comes first
+        users = sorted(
+            (name for name in graph.users if name.startswith(text)),
+            key=lambda name: (name != text, name),
+        )
+        return users[:SEARCH_RESULTS] + hashtags[:SEARCH_RESULTS]
+
+    def heights(self) -> List[int]:
+        self.results = self._search()
+        return [SEARCH_RESULT] * len(self.results)
+
+    def _open(self, target):
+        if target in self.app.recent:
+            self.app.recent.remove(target)
+        self.app.recent.insert(0, target)
+        del self.app.recent[RECENT_SEARCHES:]
+        if target.startswith("#"):
+            self.app.open(_Hashtag(self.app, target[1:]))
+        else:
+            self.app.open(_Profile(self.app, self.app.graph.users[target]))
+
+    def row(self, index, top) -> _Node:
+        target = self.results[index]
+        bottom = top + SEARCH_RESULT
+
+        def open_target():
+            self._open(target)
+
+        if target.startswith("#"):
+            name = _Node(
+                ClassName.TEXT_VIEW,
+                (200, top + 20, 900, top + 90),
+                self.ids.ROW_HASHTAG_TEXTVIEW_TAG_NAME,
+                text=target,
+            )
+            posts = len(self.app.graph.hashtags[target[1:]])
+            details = f"{_counter(posts)} posts"
+        else:
+            name = _Node(
+                ClassName.TEXT_VIEW,
+                (200, top + 20, 900, top + 90),
+                self.ids.ROW_SEARCH_USER_USERNAME,
+                text=target,
+            )
+            details = self.app.graph.users[target].full_name
+        return _Node(
+            ClassName.LINEAR_LAYOUT,
+            (0, top, WIDTH, bottom),
+            on_click=open_target,
+            children=[
+                name,
+                _Node(
+                    ClassName.TEXT_VIEW, (200, top + 90, 900, bottom - 10), text=details
+                ),
+            ],
+        )
+
+
+class _Profile(_Screen):
+    container_class = COORDINATOR_LAYOUT
+
+    def __init__(self, app, user: FakeUser):
+        super().__init__(app)
+        self.user = user
+
+    @property
+    def title(self) -> str:
+        return self.user.username
+
+    def container_id(self) -> str:
+        return self.ids.COORDINATOR_ROOT_LAYOUT
+
+    def locked(self) -> bool:
+        return (
+            self.user.private
+            and self.user is not self.app.me
+            and self.user.username not in self.app.me.following
+        )
+
+    def heights(self) -> List[int]:
+        if self.locked():
+            return [PROFILE_HEADER, PRIVATE_NOTICE]
+        rows = -(-len(self.user.posts) // 3)
+        return [PROFILE_HEADER, PROFILE_TABS, GRID_DIVIDER] + [GRID_ROW] * rows
+
+    def content(self) -> List[_Node]:
+        top, bottom = self.viewport()
+        children = []
+        grid = []
+        for index, row_top in self.visible_rows():
+            if index == 0:
+                children.append(self._header(row_top))
+            elif self.locked():
+                children.append(self._private_notice(row_top))
+            elif index == 1:
+                children.append(self._tabs(row_top))
+            elif index == 2:
+                grid.append(
+                    _Node(ClassName.VIEW, (0, row_top, WIDTH, row_top + GRID_DIVIDER))
+                )
+            else:
+                grid.append(self._grid_row(index - 3, row_top))
+        if grid:
+            # the grid is a list in the scrolled layout, like in the app
+            tops = self._layout()
+            children.append(
+                _Node(
+                    ClassName.RECYCLER_VIEW,
+                    (0, top + tops[2] - self.offset, WIDTH, bottom),
+                    self.ids.LIST,
+                    children=grid,
+                )
+            )
+        return [
+            _Node(
+                self.container_class,
+                (0, top, WIDTH, bottom),
+                self.container_id(),
+                children=children,
+                scrollable=True,
+            )
+        ]
+
+    def _counter(self, left, top, container_id, count_id, value, label, on_click):
+        return _Node(
+            ClassName.LINEAR_LAYOUT,
+            (left, top + 60, left + 220, top + 240),
+            container_id,
+            on_click=on_click,
+            children=[
+                _Node(
+                    ClassName.TEXT_VIEW,
+                    (left, top + 60, left + 220, top + 160),
+                    count_id,
+                    text=_counter(value),
+                ),
+                _Node(
+                    ClassName.TEXT_VIEW,
+                    (left, top + 160, left + 220, top + 240),
+                    text=label,
+                ),
+            ],
+        )
+
+    def _open_list(self, kind):
+        if not self.locked():
+            self.app.open(_FollowList(self.app, self.user, kind))
+
+    def _header(self, top) -> _Node:
+        ids = self.ids
+        user = self.user
+        children = [
+            _Node(
+                ClassName.FRAME_LAYOUT,
+                (40, top + 40, 260, top + 260),
+                ids.PROFILE_HEADER_AVATAR_CONTAINER_TOP_LEFT_STUB,
+                children=[
+                    _Node(
+                        ClassName.IMAGE_VIEW,
+                        (40, top + 40, 260, top + 260),
+                        ids.ROW_PROFILE_HEADER_IMAGEVIEW,
+                        desc=f"{user.username}'s profile picture",
+                    )
+                ],
+            ),
+            self._counter(
+                300,
+                top,
+                ids.ROW_PROFILE_HEADER_TEXTVIEW_POST_CONTAINER,
+                ids.ROW_PROFILE_HEADER_TEXTVIEW_POST_COUNT,
+                len(user.posts),
+                "posts",
+                None,
+            ),
+            self._counter(
+                540,
+                top,
+                _first(ids.ROW_PROFILE_HEADER_FOLLOWERS_CONTAINER),
+                ids.ROW_PROFILE_HEADER_TEXTVIEW_FOLLOWERS_COUNT,
+                len(user.followers),
+                "followers",
+                lambda: self._open_list("followers"),
+            ),
+            self._counter(
+                780,
+                top,
+                _first(ids.ROW_PROFILE_HEADER_FOLLOWING_CONTAINER),
+                ids.ROW_PROFILE_HEADER_TEXTVIEW_FOLLOWING_COUNT,
+                len(user.following),
+                "following",
+                lambda: self._open_list("following"),
+            ),
+            _Node(
+                ClassName.TEXT_VIEW,
+                (40, top + 290, WIDTH - 40, top + 350),
+                ids.PROFILE_HEADER_FULL_NAME,
+                text=user.full_name,
+            ),
+        ]
+        if user.biography:
+            children.append(
+                _Node(
+                    ClassName.TEXT_VIEW,
+                    (40, top + 350, WIDTH - 40, top + 470),
+                    ids.PROFILE_HEADER_BIO_TEXT,
+                    text=user.biography,
+                )
+            )
+        if user is self.app.me:
+            button, on_click = "Edit profile", _nothing
+        else:
+            following = user.username in self.app.me.following
+            button = "Following" if following else "Follow"
+
+            def on_click():
+                self.app.toggle_follow(user)
+
+        children.append(
+            _Node(
+                ClassName.BUTTON,
+                (40, top + 520, WIDTH - 40, top + 620),
+                text=button,
+                on_click=on_click,
+            )
+        )
+        return _Node(
+            ClassName.LINEAR_LAYOUT,
+            (0, top, WIDTH, top + PROFILE_HEADER),
+            children=children,
+        )
+
+    def _private_notice(self, top) -> _Node:
+        return _Node(
+            ClassName.LINEAR_LAYOUT,
+            (0, top, WIDTH, top + PRIVATE_NOTICE),
+            self.ids.PRIVATE_PROFILE_EMPTY_STATE,
+            children=[
+                _Node(
+                    ClassName.TEXT_VIEW,
+                    (40, top + 100, WIDTH - 40, top + 200),
+                    text="This account is private",
+                )
+            ],
+        )
+
+    def _tabs(self, top) -> _Node:
+        icons = [
+            _Node(
+                ClassName.IMAGE_VIEW,
+                (column * 360, top, column * 360 + 360, top + PROFILE_TABS),
+                self.ids.PROFILE_TAB_ICON_VIEW,
+                desc=desc,
+                on_click=_nothing,
+                selected=column == 0,
+            )
+            for column, desc in enumerate(["Grid View", "Reels", "Photos of You"])
+        ]
+        return _Node(
+            ClassName.LINEAR_LAYOUT,
+            (0, top, WIDTH, top + PROFILE_TABS),
+            self.ids.PROFILE_TABS_CONTAINER,
+            children=[
+                _Node(
+                    ClassName.HORIZONTAL_SCROLL_VIEW,
+                    (0, top, WIDTH, top + PROFILE_TABS),
+                    self.ids.PROFILE_TAB_LAYOUT,
+                    children=icons,
+                )
+            ],
+        )
+
+    def _grid_row(self, row, top) -> _Node:
+        posts = self.user.posts[::-1]
+        return self.app.grid_row(posts, row, top, "Posts")
+
+
+class _FollowList(_Screen):
+    fixed_height = TABS_ROW
+
+    def __init__(self, app, user: FakeUser, kind):
+        super().__init__(app)
+        self.user = user
+        self.kind = kind
+        self.search = _Field(self._new_search)
+        self.usernames = []
+
+    @property
+    def title(self) -> str:
+        return self.user.username
+
+    def _new_search(self):
+        self.offset = 0
+        self.relayout()
+
+    def _switch(self, kind):
+        self.kind = kind
+        self.search.set("")
+
+    def fixed(self) -> List[_Node]:
+        top = ACTION_BAR_BOTTOM
+        tabs = []
+        for column, kind in enumerate(["followers", "following"]):
+            count = len(getattr(self.user, kind))
+            tabs.append(
+                _Node(
+                    ClassName.TEXT_VIEW,
+                    (column * 540, top, column * 540 + 540, top + TABS_ROW),
+                    text=f"{_counter(count)} {kind.capitalize()}",
+                    on_click=lambda kind=kind: self._switch(kind),
+                    selected=kind == self.kind,
+                )
+            )
+        return [
+            _Node(
+                ClassName.LINEAR_LAYOUT,
+                (0, top, WIDTH, top + TABS_ROW),
+                self.ids.UNIFIED_FOLLOW_LIST_TAB_LAYOUT,
+                children=tabs,
+            )
+        ]
+
+    def heights(self) -> List[int]:
+        usernames = getattr(self.user, self.kind)
+        if self.search.text:
+            usernames = [name for name in usernames if self.search.text in name]
+        self.usernames = usernames
+        return [SEARCH_ROW] + [USER_ROW] * len(usernames)
+
+    def row(self, index, top) -> _Node:
+        if index == 0:
+            return _Node(
+                ClassName.LINEAR_LAYOUT,
+                (0, top, WIDTH, top + SEARCH_ROW),
+                children=[
+                    _Node(
+                        ClassName.EDIT_TEXT,
+                        (40, top + 20, WIDTH - 40, top + SEARCH_ROW - 20),
+                        self.ids.ROW_SEARCH_EDIT_TEXT,
+                        text=self.search.text,
+                        field=self.search,
+                    )
+                ],
+            )
+        return self.app.user_row(
+            self.usernames[index - 1],
+            top,
+            self.ids.FOLLOW_LIST_CONTAINER,
+            self.ids.FOLLOW_LIST_USERNAME,
+        )
+
+
+class _Likers(_Screen):
+    def __init__(self, app, post: FakePost):
+        super().__init__(app)
+        self.post = post
+
+    @property
+    def title(self) -> str:
+        return "Likes"
+
+    def heights(self) -> List[int]:
+        return [USER_ROW] * len(self.post.likers)
+
+    def row(self, index, top) -> _Node:
+        return self.app.user_row(
+            self.post.likers[index],
+            top,
+            self.ids.ROW_USER_CONTAINER_BASE,
+            self.ids.ROW_USER_PRIMARY_NAME,
+        )
+
+
+class _Hashtag(_Screen):
+    fixed_height = TABS_ROW
+    container_class = ClassName.RECYCLER_VIEW
+
+    def __init__(self, app, hashtag):
+        super().__init__(app)
+        self.hashtag = hashtag
+        self.recent = False
+        self.posts = []
+
+    @property
+    def title(self) -> str:
+        return f"#{self.hashtag}"
+
+    def container_id(self) -> str:
+        return self.ids.RECYCLER_VIEW
+
+    def _switch(self, recent):
+        self.recent = recent
+        self.offset = 0
+        self.relayout()
+
+    def fixed(self) -> List[_Node]:
+        top = ACTION_BAR_BOTTOM
+        return [
+            _Node(
+                ClassName.LINEAR_LAYOUT,
+                (0, top, WIDTH, top + TABS_ROW),
+                children=[
+                    _Node(
+                        ClassName.TEXT_VIEW,
+                        (column * 540, top, column * 540 + 540, top + TABS_ROW),
+                        text=text,
+                        on_click=lambda recent=recent: self._switch(recent),
+                        selected=recent == self.recent,
+                    )
+                    for column, (text, recent) in enumerate(
+                        [("Top", False), ("Recent", True)]
+                    )
+                ],
+            )
+        ]
+
+    def heights(self) -> List[int]:
+        posts = self.app.graph.hashtags.get(self.hashtag, [])
+        if self.recent:
+            self.posts = posts[::-1]
+        else:
+            self.posts = sorted(posts, key=lambda post: -len(post.likers))
+        if not self.posts:
+            return [GRID_ROW]
+        return [GRID_ROW] * -(-len(self.posts) // 3)
+
+    def row(self, index, top) -> _Node:
+        if not self.posts:
+            return _Node(
+                ClassName.TEXT_VIEW,
+                (0, top, WIDTH, top + GRID_ROW),
+                self.ids.IGDS_HEADLINE_EMPHASIZED_HEADLINE,
+                text="No posts yet",
+            )
+        return self.app.grid_row(self.posts, index, top, self.title)
+
+
+class _Posts(_Screen):
+    """posts one under the other, opened from a grid"""
+
+    container_class = ClassName.RECYCLER_VIEW
+
+    def __init__(self, app, posts: List[FakePost], title="Posts"):
+        super().__init__(app)
+        self.posts = posts
+        self._title = title
+        self.parts = []
+
+    @property
+    def title(self) -> str:
+        return self._title
+
+    def heights(self) -> List[int]:
+        self.parts = []
+        for post in self.posts:
+            for part in POST_PARTS:
+                if part != "likes" or post.likers:
+                    self.parts.append((post, part))
+        return [POST_PARTS[part] for _, part in self.parts]
+
+    def row(self, index, top) -> _Node:
+        ids = self.ids
+        post, part = self.parts[index]
+        bottom = top + POST_PARTS[part]
+        owner = self.app.graph.users[post.owner]
+
+        def open_owner():
+            self.app.open(_Profile(self.app, owner))
+
+        if part == "header":
+            return _Node(
+                ClassName.LINEAR_LAYOUT,
+                (0, top, WIDTH, bottom),
+                ids.ROW_FEED_PROFILE_HEADER,
+                children=[
+                    _Node(
+                        ClassName.IMAGE_VIEW,
+                        (20, top + 20, 130, bottom - 20),
+                        desc=f"Profile picture of {owner.username}",
+                        on_click=open_owner,
+                    ),
+                    _Node(
+                        ClassName.TEXT_VIEW,
+                        (160, top + 40, 800, bottom - 40),
+                        ids.ROW_FEED_PHOTO_PROFILE_NAME,
+                        text=owner.username,
+                        on_click=open_owner,
+                    ),
+                ],
+            )
+        if part == "media":
+            return _Node(
+                ClassName.FRAME_LAYOUT,
+                (0, top, WIDTH, bottom),
+                ids.ZOOMABLE_VIEW_CONTAINER,
+                children=[
+                    _Node(
+                        ClassName.FRAME_LAYOUT,
+                        (0, top, WIDTH, bottom),
+                        ids.MEDIA_GROUP,
+                        desc=f"Photo by {owner.full_name or owner.username}",
+                        on_double_click=lambda: self.app.toggle_like(post, True),
+                    )
+                ],
+            )
+        if part == "buttons":
+            liked = self.app.me.username in post.likers
+            return _Node(
+                ClassName.LINEAR_LAYOUT,
+                (0, top, WIDTH, bottom),
+                ids.ROW_FEED_VIEW_GROUP_BUTTONS,
+                children=[
+                    _Node(
+                        ClassName.IMAGE_VIEW,
+                        (20, top + 20, 120, bottom - 20),
+                        ids.ROW_FEED_BUTTON_LIKE,
+                        desc="Liked" if liked else "Like",
+                        on_click=lambda: self.app.toggle_like(post),
+                        selected=liked,
+                    ),
+                    _Node(
+                        ClassName.IMAGE_VIEW,
+                        (140, top + 20, 240, bottom - 20),
+                        ids.ROW_FEED_BUTTON_COMMENT,
+                        desc="Comment",
+                    ),
+                ],
+            )
+        if part == "likes":
+            likes = len(post.likers)
+            return _Node(
+                ClassName.TEXT_VIEW,
+                (40, top, WIDTH - 40, bottom),
+                ids.ROW_FEED_TEXTVIEW_LIKES,
+                text="1 like" if likes == 1 else f"{likes:,} likes",
+                on_click=lambda: self.app.open(_Likers(self.app, post)),
+            )
+        if part == "caption":
+            return _Node(
+                ClassName.TEXT_VIEW,
+                (40, top, WIDTH - 40, bottom),
+                ids.ROW_FEED_COMMENT_TEXTVIEW_LAYOUT,
+                text=f"{owner.username} {post.caption}".strip(),
+            )
+        return _Node(ClassName.VIEW, (0, top, WIDTH, bottom), ids.GAP_VIEW)
+
+
+class _Feed(_Posts):
+    def __init__(self, app):
+        super().__init__(app, [], title="Instagram")
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        graph = self.app.graph
+        self.posts = sorted(
+            (
+                post
+                for username in self.app.me.following
+                for post in graph.users[username].posts
+            ),
+            key=lambda post: -post.number,
+        )
+        self.relayout()
+
+
+class _Shell:
+    """answers the probes DeviceFacade makes through adb shell"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def run(self, command, cache=False) -> str:
+        if command == "dumpsys input_method":
+            shown = "true" if self.app.focused is not None else "false"
+            return f"mInputShown={shown}"
+        if command == "dumpsys window":
+            return "mDreamingLockscreen=false"
+        return ""
+
+    def forget(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Toast:
+    def get_message(self, wait_timeout=10, cache_timeout=10, default=None):
+        return default
+
+
+class _Scroll:
+    """scroll and fling of a UiObject"""
+
+    def __init__(self, view, page):
+        self.view = view
+        self.page = page
+
+    def _swipes(self, direction, max_swipes) -> bool:
+        bounds = self.view.info["bounds"]
+        distance = (bounds["bottom"] - bounds["top"]) * self.page * direction
+        moved = False
+        for _ in range(max_swipes):
+            if not self.view.facade.scroll_screen(distance):
+                break
+            moved = True
+        return moved
+
+    def forward(self, **kwargs) -> bool:
+        return self._swipes(1, 1)
+
+    def backward(self, **kwargs) -> bool:
+        return self._swipes(-1, 1)
+
+    def toEnd(self, max_swipes=500, **kwargs) -> bool:
+        self._swipes(1, max_swipes)
+        return True
+
+    def toBeginning(self, max_swipes=500, **kwargs) -> bool:
+        self._swipes(-1, max_swipes)
+        return True
+
+
+class _FakeUiObject(SnapshotObject):
+    """a UiObject of the fake device, answered from its current screen"""
+
+    def wait(self, exists=True, timeout=None) -> bool:
+        # nothing loads late: no need to wait
+        return bool(self._nodes()) == exists
+
+    def _found(self, method):
+        nodes = self._nodes()
+        if not nodes:
+            raise UiObjectNotFoundError(
+                {"code": -32002, "message": "UiObjectNotFoundException"}, method
+            )
+        return nodes[0]
+
+    def click(self, timeout=None, offset=None):
+        self._found("click")
+        super().click(timeout, offset)
+
+    def click_exists(self, timeout=0) -> bool:
+        if not self.exists():
+            return False
+        self.click()
+        return True
+
+    def click_gone(self, maxretry=10, interval=1.0) -> bool:
+        while maxretry > 0 and self.exists():
+            self.click()
+            maxretry -= 1
+        return not self.exists()
+
+    def get_text(self, timeout=None) -> str:
+        return self.info["text"]
+
+    def set_text(self, text, timeout=None):
+        self.facade.type_in(self._found("setText"), text)
+
+    def clear_text(self, timeout=None):
+        self.set_text("")
+
+    @property
+    def scroll(self) -> _Scroll:
+        return _Scroll(self, SCROLL_PAGE)
+
+    @property
+    def fling(self) -> _Scroll:
+        return _Scroll(self, FLING_PAGE)
+
+    def __getattr__(self, name):
+        raise AttributeError(name)
+
+
+class FakeInstagram:
+    """
+    Stands for a uiautomator2 device running Instagram, to load test the
+    jobs without a phone. The screens the bot goes through (profiles,
+    followers, likers, search, hashtags, posts and feed) are drawn from a
+    SocialGraph with the resource ids the views look for; taps, swipes,
+    typing and back act on them. Pass it as the backend of DeviceFacade.
+    """
+
+    serial = "fake-instagram"
+
+    def __init__(
+        self, graph: SocialGraph, username="me", app_id="com.instagram.android"
+    ):
+        self.graph = graph
+        self.me = graph.add_user(username, full_name="Me")
+        self.app_id = app_id
+        self.ids = ResourceID(app_id)
+        self.info = {
+            "currentPackageName": app_id,
+            "displayHeight": HEIGHT,
+            "displayRotation": 0,
+            "displaySizeDpX": 411,
+            "displaySizeDpY": 891,
+            "displayWidth": WIDTH,
+            "productName": "FakeInstagram",
+            "screenOn": True,
+            "sdkInt": 30,
+            "naturalOrientation": True,
+        }
+        self.shell = _Shell(self)
+        self.toast = _Toast()
+        self.recent: List[str] = []
+        self.focused: Optional[_Field] = None
+        self.in_app = True
+        self.version = 0
+        self._snapshot = None
+        self._drawn: List[_Node] = []
+        self._start()
+
+    def _start(self):
+        # like the bot expects it: on the own profile
+        self.stacks = {
+            HOME: [_Feed(self)],
+            SEARCH: [_Search(self)],
+            PROFILE: [_Profile(self, self.me)],
+        }
+        self.tab = PROFILE
+        self.focused = None
+
+    @property
+    def stack(self) -> list:
+        return self.stacks[self.tab]
+
+    @property
+    def screen(self) -> _Screen:
+        return self.stack[-1]
+
+    # what the screens do
+
+    def _changed(self):
+        self.version += 1
+
+    def open(self, screen: _Screen):
+        self.focused = None
+        self.stack.append(screen)
+
+    def select_tab(self, tab):
+        if tab not in self.stacks:
+            return
+        if tab == self.tab:
+            # a second tap goes back to the top of the tab
+            del self.stack[1:]
+            self.stack[0].reset()
+        self.tab = tab
+        self.focused = None
+
+    def toggle_follow(self, user: FakeUser):
+        if user.username in self.me.following:
+            self.graph.unfollow(self.me.username, user.username)
+        else:
+            self.graph.follow(self.me.username, user.username)
+        self.screen.relayout()
+
+    def toggle_like(self, post: FakePost, like=None):
+        liked = self.me.username in post.likers
+        if like is None:
+            like = not liked
+        if like and not liked:
+            post.likers.append(self.me.username)
+        elif not like and liked:
+            post.likers.remove(self.me.username)
+        self.screen.relayout()
+
+    def user_row(self, username, top, container_id, username_id) -> _Node:
+        user = self.graph.users[username]
+
+        def open_profile():
+            self.open(_Profile(self, user))
+
+        following = username in self.me.following
+        return _Node(
+            ClassName.LINEAR_LAYOUT,
+            (0, top, WIDTH, top + USER_ROW),
+            container_id,
+            on_click=open_profile,
+            children=[
+                _Node(
+                    ClassName.IMAGE_VIEW,
+                    (40, top + 30, 180, top + 170),
+                    desc=f"{username}'s profile picture",
+                    on_click=open_profile,
+                ),
+                _Node(
+                    ClassName.LINEAR_LAYOUT,
+                    (210, top + 30, 760, top + 170),
+                    children=[
+                        _Node(
+                            ClassName.LINEAR_LAYOUT,
+                            (210, top + 30, 760, top + 100),
+                            children=[
+                                _Node(
+                                    ClassName.TEXT_VIEW,
+                                    (210, top + 30, 760, top + 100),
+                                    username_id,
+                                    text=username,
+                                    on_click=open_profile,
+                                )
+                            ],
+                        ),
+                        _Node(
+                            ClassName.TEXT_VIEW,
+                            (210, top + 100, 760, top + 170),
+                            text=user.full_name,
+                        ),
+                    ],
+                ),
+                _Node(
+                    ClassName.BUTTON,
+                    (790, top + 55, WIDTH - 40, top + 145),
+                    self.ids.BUTTON,
+                    text="Following" if following else "Follow",
+                    on_click=lambda: self.toggle_follow(user),
+                ),
+            ],
+        )
+
+    def grid_row(self, posts: List[FakePost], row, top, title) -> _Node:
+        cells = []
+        for column in range(3):
+            number = row * 3 + column
+            if number >= len(posts):
+                break
+            owner = self.graph.users[posts[number].owner]
+            cells.append(
+                _Node(
+                    ClassName.IMAGE_VIEW,
+                    (column * 361, top, column * 361 + 358, top + GRID_ROW - 2),
+                    self.ids.IMAGE_BUTTON,
+                    desc=f"Photo by {owner.full_name or owner.username} at row {row + 1}, column {column + 1}",
+                    on_click=lambda number=number: self.open(
+                        _Posts(self, posts[number:], title)
+                    ),
+                )
+            )
+        return _Node(
+            ClassName.LINEAR_LAYOUT, (0, top, WIDTH, top + GRID_ROW), children=cells
+        )
+
+    def type_in(self, node, text):
+        """node: a node of the current UiSnapshot"""
+        drawn = self._drawn[node.position]
+        if drawn.field is not None:
+            drawn.field.set(text)
+            self._changed()
+
+    def scroll_screen(self, dy) -> bool:
+        moved = self.in_app and self.screen.scroll(dy)
+        if moved:
+            self._changed()
+        return moved
+
+    # the dumps
+
+    def _tab_bar(self) -> _Node:
+        width = WIDTH // len(TABS)
+        return _Node(
+            ClassName.LINEAR_LAYOUT,
+            (0, TAB_BAR_TOP, WIDTH, HEIGHT),
+            self.ids.TAB_BAR,
+            children=[
+                _Node(
+                    ClassName.FRAME_LAYOUT,
+                    (column * width, TAB_BAR_TOP, column * width + width, HEIGHT),
+                    desc=tab,
+                    on_click=lambda tab=tab: self.select_tab(tab),
+                    selected=tab == self.tab,
+                )
+                for column, tab in enumerate(TABS)
+            ],
+        )
+
+    def _action_bar(self, screen: _Screen) -> _Node:
+        children = []
+        if len(self.stack) > 1:
+            children.append(
+                _Node(
+                    ClassName.IMAGE_VIEW,
+                    (0, ACTION_BAR_TOP, 150, ACTION_BAR_BOTTOM),
+                    self.ids.ACTION_BAR_BUTTON_BACK,
+                    desc="Back",
+                    on_click=self._back,
+                )
+            )
+        return _Node(
+            ClassName.FRAME_LAYOUT,
+            (0, ACTION_BAR_TOP, WIDTH, ACTION_BAR_BOTTOM),
+            self.ids.ACTION_BAR_CONTAINER,
+            children=children + screen.bar(),
+        )
+
+    def _tag(self, node: _Node, index, package) -> str:
+        def flag(value) -> str:
+            return "true" if value else "false"
+
+        left, top, right, bottom = node.visible
+        return (
+            f'<node index="{index}" text={quoteattr(node.text)} '
+            f'resource-id="{node.resource_id}" class="{node.cls}" '
+            f'package="{package}" content-desc={quoteattr(node.desc)} '
+            f'checkable="false" checked="false" '
+            f'clickable="{flag(node.actionable())}" enabled="true" '
+            f'focusable="{flag(node.field is not None)}" '
+            f'focused="{flag(node.field is not None and node.field is self.focused)}" '
+            f'scrollable="{flag(node.scrollable)}" long-clickable="false" '
+            f'password="false" selected="{flag(node.selected)}" '
+            f'bounds="[{left},{top}][{right},{bottom}]">'
+        )
+
+    def _emit(self, node: _Node, clip, index, out) -> bool:
+        left, top, right, bottom = node.bounds
+        if clip is not None:
+            top, bottom = max(top, clip[0]), min(bottom, clip[1])
+        if bottom - top < MIN_VISIBLE:
+            return False
+        node.visible = (left, top, right, bottom)
+        self._drawn.append(node)
+        out.append(self._tag(node, index, self.app_id))
+        position = 0
+        for child in node.children:
+            if self._emit(child, clip, position, out):
+                position += 1
+        out.append("</node>")
+        return True
+
+    def dump_hierarchy(self, compressed=False, pretty=False, max_depth=None) -> str:
+        self._drawn = []
+        out = [
+            "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>",
+            '<hierarchy rotation="0">',
+        ]
+        root = _Node(ClassName.FRAME_LAYOUT, (0, 0, WIDTH, HEIGHT))
+        if not self.in_app:
+            out.append(self._tag(root, 0, LAUNCHER) + "</node>")
+        else:
+            # in the order of the dump, like the nodes of UiSnapshot
+            self._drawn.append(root)
+            out.append(self._tag(root, 0, self.app_id))
+            screen = self.screen
+            parts = [(self._action_bar(screen), None)]
+            parts += [(node, None) for node in screen.fixed()]
+            parts += [(node, screen.viewport()) for node in screen.content()]
+            parts.append((self._tab_bar(), None))
+            index = 0
+            for node, clip in parts:
+                if self._emit(node, clip, index, out):
+                    index += 1
+            out.append("</node>")
+        out.append("</hierarchy>")
+        return "\n".join(out)
+
+    # what _FakeUiObject needs from a device facade
+
+    @property
+    def deviceV2(self):
+        return self
+
+    def ui_snapshot(self) -> UiSnapshot:
+        if self._snapshot is None or self._snapshot.epoch != self.version:
+            self._snapshot = UiSnapshot(self.dump_hierarchy(), self.version)
+        return self._snapshot
+
+    def screen_changed(self):
+        """the actions bump the version of the screen themselves"""
+
+    def _target(self, x, y) -> Optional[_Node]:
+        self.ui_snapshot()
+        for node in reversed(self._drawn):
+            left, top, right, bottom = node.visible
+            if node.actionable() and left <= x < right and top <= y < bottom:
+                return node
+        return None
+
+    # the uiautomator2 device
+
+    def __call__(self, **kwargs) -> _FakeUiObject:
+        return _FakeUiObject(self, [(None, kwargs)])
+
+    def app_current(self) -> dict:
+        if self.in_app:
+            return {"package": self.app_id, "activity": ".activity.MainTabActivity"}
+        return {"package": LAUNCHER, "activity": ".Launcher"}
+
+    def app_start(self, package_name, activity=None, wait=False, stop=False, **kwargs):
+        if package_name == self.app_id:
+            if stop or not self.in_app:
+                self._start()
+            self.in_app = True
+            self._changed()
+
+    def app_stop(self, package_name):
+        if package_name == self.app_id:
+            self.in_app = False
+            self._changed()
+
+    def window_size(self):
+        return WIDTH, HEIGHT
+
+    def _is_alive(self) -> bool:
+        return True
+
+    def screenshot(self, filename=None, format="pillow"):
+        return None
+
+    def screen_on(self):
+        pass
+
+    def screen_off(self):
+        pass
+
+    def _back(self):
+        if self.focused is not None:
+            self.focused = None
+        elif len(self.stack) > 1:
+            self.stack.pop()
+        elif self.tab != HOME:
+            self.tab = HOME
+        else:
+            self.in_app = False
+
+    def press(self, key, meta=None) -> bool:
+        if key == "back" and self.in_app:
+            self._back()
+            self._changed()
+        return True
+
+    def click(self, x, y):
+        node = self._target(x, y)
+        if node is None:
+            return
+        if node.field is not None:
+            self.focused = node.field
+        elif node.on_click is not None:
+            node.on_click()
+        self._changed()
+
+    def double_click(self, x, y, duration=0.1):
+        node = self._target(x, y)
+        if node is not None and node.on_double_click is not None:
+            node.on_double_click()
+            self._changed()
+        else:
+            self.click(x, y)
+
+    def _drag(self, start_y, end_y):
+        top, bottom = self.screen.viewport()
+        if self.in_app and top <= start_y < bottom:
+            self.scroll_screen(start_y - end_y)
+
+    def swipe(self, fx, fy, tx, ty, duration=None, steps=None):
+        self._drag(fy, ty)
+
+    def swipe_points(self, points, duration=0.5):
+        self._drag(points[0][1], points[-1][1])
+
+    def swipe_ext(self, direction, scale=0.9, box=None, **kwargs):
+        top, bottom = self.screen.viewport()
+        distance = (bottom - top) * scale
+        if direction == "up":
+            self.scroll_screen(distance)
+        elif direction == "down":
+            self.scroll_screen(-distance)
+
+    def clear_text(self):
+        if self.focused is not None:
+            self.focused.set("")
+            self._changed()
+
+    def send_keys(self, text, clear=False):
+        if self.focused is not None:
+            self.focused.set(("" if clear else self.focused.text) + text)
+            self._changed()
@@ -1,12 +1,12 @@
+import hashlib
 import json
 import logging
 import os
 import re
 import sys
 import unicodedata
-from datetime import datetime
+from datetime import timedelta
 from enum import Enum, auto
-from time import sleep
 from typing import Optional, Tuple
 
 import emoji
@@ -14,9 +14,11 @@ import yaml
 from colorama import Fore, Style
 from langdetect import detect
 
+from GramAddict.core.clock import now, sleep
 from GramAddict.core.config import get_time_last_save
 from GramAddict.core.device_facade import Timeout
 from GramAddict.core.resources import ResourceID as resources
+from GramAddict.core.storage import parse_time
 from GramAddict.core.utils import random_sleep
 from GramAddict.core.views import FollowStatus, ProfileView
 
@@ -51,6 +53,9 @@ FIELD_MAX_LIKERS = "max_likers"
 FIELD_MUTUAL_FRIENDS = "mutual_friends"
 
 IGNORE_CHARSETS = ["MATHEMATICAL"]
+# the fields of Profile read after the cheap checks, only when a filter needs
+# them, in that order
+LAZY_FIELDS = ("mutual_friends", "biography", "fullname")
 
 
 def load_config(config):
@@ -88,6 +93,10 @@ class SkipReason(Enum):
     BIOGRAPHY_IS_EMPTY = auto()
 
 
+# the profile may be fine next time, those verdicts aren't reused
+TRANSIENT_SKIP_REASONS = {SkipReason.NOT_LOADED.name, SkipReason.UNKNOWN_PRIVACY.name}
+
+
 class Profile(object):
     def __init__(
         self,
@@ -101,7 +110,7 @@ class Profile(object):
         link_in_bio,
         fullname,
     ):
-        self.datetime = str(datetime.now())
+        self.datetime = str(now())
         self.followers = 0
         self.followings = 0
         self.mutual_friends = mutual_friends
@@ -157,6 +166,13 @@ class Filter:
                     )
                     sys.exit(2)
         self.storage = storage
+        self.lazy_fields = self._lazy_fields()
+        self.conditions_hash = self._conditions_hash()
+        self.verdicts_ttl = (
+            None
+            if args.filter_verdicts_ttl is None
+            else timedelta(hours=float(args.filter_verdicts_ttl))
+        )
         if self.conditions is not None:
             logger.info("-" * 70, extra={"color": f"{Fore.YELLOW}{Style.BRIGHT}"})
             logger.info(
@@ -178,6 +194,48 @@ class Filter:
                     f"The filters file doesn't exists in your account folder (can't find {filter_path}). Download it from https://github.com/GramAddict/bot/blob/08e1d7aff39ec47543fa78aadd7a2f034b9ae34d/config-examples/filters.yml and place it in your account folder!"
                 )
 
+    def _lazy_fields(self) -> Tuple[str, ...]:
+        """the fields of LAZY_FIELDS the filters need"""
+        if self.conditions is None:
+            return ()
+        needed = {
+            "mutual_friends": self.conditions.get(FIELD_MUTUAL_FRIENDS, -1) != -1,
+            "biography": len(self.conditions.get(FIELD_BLACKLIST_WORDS, [])) > 0
+            or len(self.conditions.get(FIELD_MANDATORY_WORDS, [])) > 0
+            or self.conditions.get(FIELD_SPECIFIC_ALPHABET) is not None
+            or self.conditions.get(FIELD_BIO_LANGUAGE) is not None
+            or self.conditions.get(FIELD_BIO_BANNED_LANGUAGE) is not None,
+            "fullname": self.conditions.get(FIELD_SPECIFIC_ALPHABET) is not None,
+        }
+        return tuple(field for field in LAZY_FIELDS if needed[field])
+
+    def _conditions_hash(self) -> Optional[str]:
+        if self.conditions is None:
+            return None
+        conditions = json.dumps(self.conditions, sort_keys=True, default=str)
+        return hashlib.blake2b(conditions.encode("utf-8"), digest_size=8).hexdigest()
+
+    def cached_skip_reason(self, username) -> Optional[str]:
+        """
+        why the same filters skipped that user less than filter-verdicts-ttl
+        ago: the profile doesn't need to be opened again
+        """
+        if (
+            self.storage is None
+            or self.verdicts_ttl is None
+            or self.conditions_hash is None
+        ):
+            return None
+        user = self.storage.get_filter_user(username)
+        if user is None or user.get("filters_hash") != self.conditions_hash:
+            return None
+        skip_reason = user.get("skip_reason")
+        if skip_reason is None or skip_reason in TRANSIENT_SKIP_REASONS:
+            return None
+        if now() - parse_time(user["datetime"]) >= self.verdicts_ttl:
+            return None
+        return skip_reason
+
     def is_num_likers_in_range(self, likes_on_post: str) -> bool:
         if self.conditions is not None and likes_on_post is not None:
             if likes_on_post == -1:
@@ -202,7 +260,9 @@ class Filter:
 
     def return_check_profile(self, username, profile_data, skip_reason=None) -> bool:
         if self.storage is not None:
-            self.storage.add_filter_user(username, profile_data, skip_reason)
+            self.storage.add_filter_user(
+                username, profile_data, skip_reason, self.conditions_hash
+            )
 
         return skip_reason is not None
 
@@ -236,7 +296,8 @@ class Filter:
             field_skip_if_private = self.conditions.get(FIELD_SKIP_PRIVATE, False)
             field_skip_if_public = self.conditions.get(FIELD_SKIP_PUBLIC, False)
 
-        profile_data = self.get_all_data(device)
+        # the costly fields are read once the cheap checks have passed
+        profile_data = self.get_all_data(device, fields=())
         if profile_data.is_restricted:
             logger.info(
                 "This is a restricted profile, skip.",
@@ -371,19 +432,6 @@ class Filter:
                 username, profile_data, SkipReason.POTENCY_RATIO
             )
 
-        if field_mutual_friends != -1:
-            logger.debug(
-                f"Checking if that user has at least {field_mutual_friends} mutual friends."
-            )
-            if profile_data.mutual_friends < field_mutual_friends:
-                logger.info(
-                    f"@{username} has less then {field_mutual_friends} mutual friends, skip.",
-                    extra={"color": f"{Fore.CYAN}"},
-                )
-                return profile_data, self.return_check_profile(
-                    username, profile_data, SkipReason.LT_MUTUAL
-                )
-
         if field_skip_if_link_in_bio:
             logger.debug("Checking if account has link in bio...")
             if profile_data.link_in_bio is not None:
@@ -423,9 +471,23 @@ class Filter:
                 username, profile_data, SkipReason.NOT_ENOUGH_POSTS
             )
 
+        self._read_lazy_fields(device, profile_data, self.lazy_fields)
+        if field_mutual_friends != -1:
+            logger.debug(
+                f"Checking if that user has at least {field_mutual_friends} mutual friends."
+            )
+            if profile_data.mutual_friends < field_mutual_friends:
+                logger.info(
+                    f"@{username} has less then {field_mutual_friends} mutual friends, skip.",
+                    extra={"color": f"{Fore.CYAN}"},
+                )
+                return profile_data, self.return_check_profile(
+                    username, profile_data, SkipReason.LT_MUTUAL
+                )
+
         cleaned_biography = " ".join(
             emoji.get_emoji_regexp()
-            .sub("", profile_data.biography.replace("\n", ""))
+            .sub("", (profile_data.biography or "").replace("\n", ""))
             .lower()
             .split()
         )
@@ -581,47 +643,36 @@ class Filter:
             logger.debug("filters.yml (or legacy filter.json) is not loaded!")
         return False, False, False, False
 
-    def get_all_data(self, device):
-        profile_picture = device.find(
+    def get_all_data(self, device, fields=LAZY_FIELDS):
+        """fields: the ones of LAZY_FIELDS to read, the others are None"""
+        profile_picture = dict(
             resourceIdMatches=ResourceID.PROFILE_HEADER_AVATAR_CONTAINER_TOP_LEFT_STUB
         )
-        restricted_profile = device.find(
-            resourceIdMatches=ResourceID.RESTRICTED_ACCOUNT_TITLE
+        restricted_profile = dict(resourceIdMatches=ResourceID.RESTRICTED_ACCOUNT_TITLE)
+        # a restricted profile has no avatar, no need to wait for it
+        loaded = device.wait_any(
+            profile_picture, restricted_profile, ui_timeout=Timeout.LONG
         )
-        is_restricted = False
-        if not profile_picture.exists(Timeout.LONG):
-            if restricted_profile.exists():
-                is_restricted = True
+        is_restricted = loaded == 1
+        if loaded is None:
+            logger.warning(
+                "Looks like this profile hasn't loaded yet! Wait a little bit more.."
+            )
+            if device.find(**profile_picture).exists(Timeout.LONG):
+                logger.info("Profile loaded!")
             else:
                 logger.warning(
-                    "Looks like this profile hasn't loaded yet! Wait a little bit more.."
+                    "Profile not fully loaded after 16s. Is your connection ok? Let's sleep for 1-2 minutes."
                 )
-                if profile_picture.exists(Timeout.LONG):
-                    logger.info("Profile loaded!")
-                else:
+                random_sleep(60, 120, modulable=False)
+                if device.find(**profile_picture).exists():
                     logger.warning(
-                        "Profile not fully loaded after 16s. Is your connection ok? Let's sleep for 1-2 minutes."
+                        "Profile won't load! Maybe you're soft-banned or you've lost your connection!"
                     )
-                    random_sleep(60, 120, modulable=False)
-                    if profile_picture.exists():
-                        logger.warning(
-                            "Profile won't load! Maybe you're soft-banned or you've lost your connection!"
-                        )
         profileView = ProfileView(device)
         if not is_restricted:
-            profile = Profile(
-                mutual_friends=self._get_mutual_friends(device, profileView),
-                follow_button_text=self._get_follow_button_text(device, profileView),
-                is_restricted=is_restricted,
-                is_private=self._is_private_account(device, profileView),
-                has_business_category=self._has_business_category(device, profileView),
-                posts_count=self._get_posts_count(device, profileView),
-                biography=self._get_profile_biography(device, profileView),
-                link_in_bio=self._get_link_in_bio(device, profileView),
-                fullname=self._get_fullname(device, profileView),
-            )
-            followers, following = self._get_followers_and_followings(device)
-            profile.set_followers_and_following(followers, following)
+            profile = self._read_profile(device, profileView)
+            self._read_lazy_fields(device, profile, fields)
         else:
             profile = Profile(
                 mutual_friends=None,
@@ -637,6 +688,82 @@ class Filter:
             profile.set_followers_and_following(None, None)
         return profile
 
+    def _read_profile(self, device, profileView: ProfileView) -> Profile:
+        """
+        the fields but LAZY_FIELDS from one dump of the screen: the getters
+        only run for the fields which aren't on it yet
+        """
+        texts = profileView.getHeaderTexts()
+        follow_button = texts["follow_button"]
+        if texts["private"] is not None:
+            is_private = True
+        elif texts["tabs"] is not None:
+            is_private = False
+        else:
+            # not laid out yet or below the fold, None if the getter can't tell
+            is_private = self._is_private_account(device, profileView)
+        posts_count = self._parse_counter(profileView, texts["posts"])
+        if posts_count is None:
+            posts_count = self._get_posts_count(device, profileView)
+        profile = Profile(
+            mutual_friends=None,
+            follow_button_text=(
+                self._get_follow_button_text(device, profileView)
+                if follow_button is None
+                else profileView.parseFollowStatus(follow_button)
+            ),
+            is_restricted=False,
+            is_private=is_private,
+            has_business_category=texts["business_category"] is not None,
+            posts_count=posts_count,
+            biography=None,
+            link_in_bio=texts["website"] or None,
+            fullname=None,
+        )
+        followers = self._parse_counter(profileView, texts["followers"])
+        followings = self._parse_counter(profileView, texts["following"])
+        if followers is None or followings is None:
+            followers, followings = self._get_followers_and_followings(
+                device, profileView
+            )
+        profile.set_followers_and_following(followers, followings)
+        return profile
+
+    @staticmethod
+    def _parse_counter(profileView: ProfileView, text: Optional[str]) -> Optional[int]:
+        """None when the text is missing or isn't a counter: the getter decides"""
+        if not text:
+            return None
+        try:
+            return profileView._parseCounter(text)
+        except ValueError as e:
+            logger.debug(f"Cannot parse the counter {repr(text)}: {e}")
+            return None
+
+    def _read_lazy_fields(self, device, profile: Profile, fields):
+        """
+        the fields of LAZY_FIELDS asked, from the same dump when it's still
+        current; a shortened biography is expanded with a tap
+        """
+        if not fields:
+            return
+        profileView = ProfileView(device)
+        texts = profileView.getHeaderTexts()
+        for field in fields:
+            text = texts[field]
+            if field == "mutual_friends":
+                profile.mutual_friends = (
+                    0 if text is None else profileView.parseMutualFriends(text)
+                )
+            elif field == "biography":
+                if text is not None and profileView.isBiographyShortened(text):
+                    text = self._get_profile_biography(device, profileView)
+                profile.biography = text or ""
+            elif field == "fullname":
+                profile.fullname = (
+                    self._get_fullname(device, profileView) if text is None else text
+                )
+
     @staticmethod
     def _get_followers_and_followings(
         device, profileView: ProfileView = None
@@ -48,6 +48,7 @@ def interact(
     target,
     on_interaction,
 ):
+    storage.claim_user(username)
     can_follow = False
     if is_follow_limit_reached is not None:
         can_follow = not is_follow_limit_reached() and storage.get_following_status(
@@ -89,6 +90,17 @@ def interact(
     )
 
 
+def skipped_by_filters(profile_filter, username) -> bool:
+    """the filters rejected that user recently, no need to open the profile"""
+    if profile_filter is None:
+        return False
+    skip_reason = profile_filter.cached_skip_reason(username)
+    if skip_reason is None:
+        return False
+    logger.info(f"@{username}: recently rejected by the filters ({skip_reason}). Skip.")
+    return True
+
+
 def handle_blogger(
     self,
     device,
@@ -186,6 +198,7 @@ def handle_blogger_from_file(
                             username, self.session_state.id, unfollowed=True
                         )
                         self.session_state.totalUnfollowed += 1
+                        self.session_state.changed()
                         limit_reached = self.session_state.check_limit(
                             limit_type=self.session_state.Limit.UNFOLLOWS
                         )
@@ -334,6 +347,7 @@ def handle_likers(
             PostsViewList(device).swipe_to_fit_posts(SwipeTo.NEXT_POST)
             continue
 
+        posts_end_detector.notify_new_list()
         posts_end_detector.notify_new_page()
 
         likes_list_view = OpenedPostView(device)._getListViewLikers()
@@ -370,7 +384,7 @@ def handle_likers(
                     can_interact = False
                     if storage.is_user_in_blacklist(username):
                         logger.info(f"@{username} is in blacklist. Skip.")
-                    else:
+                    elif not skipped_by_filters(profile_filter, username):
                         (
                             interacted,
                             interacted_when,
@@ -549,7 +563,9 @@ def handle_posts(
                 can_interact = False
                 if storage.is_user_in_blacklist(username):
                     logger.info(f"@{username} is in blacklist. Skip.")
-                else:
+                elif current_job == "feed" or not skipped_by_filters(
+                    profile_filter, username
+                ):
                     likes_in_range = profile_filter.is_num_likers_in_range(
                         number_of_likers
                     )
@@ -669,6 +685,7 @@ def handle_followers(
     interaction,
     is_follow_limit_reached,
     scroll_end_detector,
+    profile_filter=None,
 ):
     is_myself = username == session_state.my_username
     if not nav_to_blogger(device, username, current_job):
@@ -686,6 +703,7 @@ def handle_followers(
         session_state,
         current_job,
         username,
+        profile_filter,
     )
 
 
@@ -701,11 +719,13 @@ def iterate_over_followers(
     session_state,
     current_job,
     target,
+    profile_filter=None,
 ):
     device.find(
         resourceId=self.ResourceID.FOLLOW_LIST_CONTAINER,
         className=ClassName.LINEAR_LAYOUT,
     ).wait(Timeout.LONG)
+    scroll_end_detector.notify_new_list()
 
     def scrolled_to_top():
         row_search = device.find(
@@ -742,8 +762,16 @@ def iterate_over_followers(
                 scroll_end_detector.notify_username_iterated(username)
 
                 can_interact = False
+                other_account = storage.get_other_account_interaction(username)
                 if storage.is_user_in_blacklist(username):
                     logger.info(f"@{username} is in blacklist. Skip.")
+                elif other_account is not None:
+                    logger.info(
+                        f"@{username}: already interacted by @{other_account}. Skip."
+                    )
+                    screen_skipped_followers_count += 1
+                elif skipped_by_filters(profile_filter, username):
+                    screen_skipped_followers_count += 1
                 else:
                     interacted, interacted_when = storage.check_user_was_interacted(
                         username
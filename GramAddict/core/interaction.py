@@ -4,7 +4,7 @@ from argparse import Namespace
 from datetime import datetime
 from os import path
 from random import choice, randint, shuffle, uniform
-from time import sleep, time
+from time import time
 from typing import Optional, Tuple, List
 
 import emoji
@@ -12,6 +12,7 @@ import spintax
 from colorama import Fore, Style
 
 from GramAddict.core import storage
+from GramAddict.core.clock import sleep
 from GramAddict.core.device_facade import (
     DeviceFacade,
     Location,
@@ -6,51 +6,128 @@ import sys
 from atomicwrites import atomic_write
 
 from GramAddict.core.storage import ACCOUNTS
+from GramAddict.core.storage_sync import FILENAME_LOCK, FileLock
 
 logger = logging.getLogger(__name__)
 
+# records in the log before they're folded into the json file
+COMPACT_EVERY = 100
+
+
+def _paths(filename, directory):
+    path = f"{ACCOUNTS}/{directory}/{filename}"
+    return f"{path}.json", f"{path}.jsonl"
+
+
+def _count_lines(path) -> int:
+    with open(path, "rb") as log:
+        return sum(chunk.count(b"\n") for chunk in iter(lambda: log.read(65536), b""))
+
+
+def load_persistent_list(filename, directory) -> list:
+    """
+    Items of <filename>.json updated with the ones of <filename>.jsonl, the
+    last record of an id wins. Raises FileNotFoundError if there's neither.
+    """
+    json_path, log_path = _paths(filename, directory)
+    items = {}
+    try:
+        with open(json_path) as json_file:
+            try:
+                json_array = json.load(json_file)
+            except Exception as e:
+                logger.error(
+                    f"Please check {json_file.name}, it contains this error: {e}"
+                )
+                sys.exit(0)
+        for item in json_array:
+            items[item.get("id")] = item
+    except FileNotFoundError:
+        if not os.path.isfile(log_path):
+            raise
+    if os.path.isfile(log_path):
+        with open(log_path, encoding="utf-8") as log:
+            for line in log:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    # interrupted while appending
+                    logger.warning(f"Ignoring a corrupted record of {log_path}.")
+                    continue
+                items[item.get("id")] = item
+    return list(items.values())
+
 
 class PersistentList(list):
+    """
+    Items are upserted by appending them to <filename>.jsonl, which is folded
+    into <filename>.json every `compact_every` records.
+    """
+
     filename = None
     encoder = None
 
-    def __init__(self, filename, encoder):
+    def __init__(self, filename, encoder, compact_every=COMPACT_EVERY):
         self.filename = filename
         self.encoder = encoder
+        self.compact_every = compact_every
+        self._locks = {}
         super().__init__()
 
+    def _lock(self, directory) -> FileLock:
+        # one per directory: flock doesn't nest across file descriptors
+        lock = self._locks.get(directory)
+        if lock is None:
+            lock = self._locks[directory] = FileLock(
+                f"{ACCOUNTS}/{directory}/{FILENAME_LOCK}"
+            )
+        return lock
+
     def persist(self, directory):
+        self._append(self, directory)
+
+    def checkpoint(self, item, directory):
+        """saves only `item`, the other ones keep their last record"""
+        self._append([item], directory)
+
+    def _append(self, items, directory):
         if directory is None:
             return
 
         if not os.path.exists(f"{ACCOUNTS}/{directory}"):
             os.makedirs(f"{ACCOUNTS}/{directory}")
 
-        path = f"{ACCOUNTS}/{directory}/{self.filename}.json"
-
-        if os.path.exists(path):
-            with open(path) as json_file:
-                try:
-                    json_array = json.load(json_file)
-                except Exception as e:
-                    logger.error(
-                        f"Please check {json_file.name}, it contains this error: {e}"
-                    )
-                    sys.exit(0)
-            os.remove(path)
-        else:
-            json_array = []
-
-        json_array += (self.encoder.default(self.encoder, item) for item in self)
-
-        # Remove duplicates
-        json_object = {}
-        for item in json_array:
-            item_id = item.get("id")
-            if item_id is None:
+        lines = []
+        for item in items:
+            record = self.encoder.default(self.encoder, item)
+            if record.get("id") is None:
                 raise Exception("Items in PersistentList must have id property!")
-            json_object[item_id] = item
-        json_array = list(json_object.values())
+            lines.append(json.dumps(record) + "\n")
+
+        _, log_path = _paths(self.filename, directory)
+        with self._lock(directory):
+            with open(log_path, "a+b") as log:
+                log.seek(0, os.SEEK_END)
+                if log.tell() > 0:
+                    log.seek(-1, os.SEEK_END)
+                    if log.read(1) != b"\n":
+                        # the last record was interrupted, don't append to it
+                        log.write(b"\n")
+                log.write("".join(lines).encode("utf-8"))
+                log.flush()
+                os.fsync(log.fileno())
+            if _count_lines(log_path) >= self.compact_every:
+                self.compact(directory)
 
-        with atomic_write(path, overwrite=True, encoding="utf-8") as outfile:
-            json.dump(json_array, outfile, indent=4, sort_keys=False)
+    def compact(self, directory):
+        """rewrites <filename>.json with every item and empties the log"""
+        json_path, log_path = _paths(self.filename, directory)
+        with self._lock(directory):
+            try:
+                json_array = load_persistent_list(self.filename, directory)
+            except FileNotFoundError:
+                return
+            with atomic_write(json_path, overwrite=True, encoding="utf-8") as outfile:
+                json.dump(json_array, outfile, indent=4, sort_keys=False)
+            # replaying it again would be harmless if we stopped before this
+            open(log_path, "w").close()
@@ -1,15 +1,17 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from colorama import Fore, Style
 
+from GramAddict.core import clock
+
 logger = logging.getLogger(__name__)
 
 
 def print_full_report(sessions, scrape_mode):
     if len(sessions) > 1:
         for index, session in enumerate(sessions):
-            finish_time = session.finishTime or datetime.now()
+            finish_time = session.finishTime or clock.now()
             logger.info(
                 "",
                 extra={"color": f"{Style.BRIGHT}{Fore.YELLOW}"},
@@ -87,7 +89,7 @@ def print_full_report(sessions, scrape_mode):
 
     duration = timedelta(0)
     for session in sessions:
-        finish_time = session.finishTime or datetime.now()
+        finish_time = session.finishTime or clock.now()
         duration += finish_time - session.startTime
     logger.info(
         f"Total duration: {str(duration).split('.')[0]}",
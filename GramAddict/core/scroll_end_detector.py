@@ -1,16 +1,36 @@
 import logging
+from collections import deque
 
 from colorama import Fore
 
 logger = logging.getLogger(__name__)
 
 
+class _Page:
+    """fingerprint of the ordered usernames of a page and their hashes"""
+
+    __slots__ = ("fingerprint", "usernames", "new_users", "scrolled")
+
+    def __init__(self, scrolled):
+        self.fingerprint = 0
+        self.usernames = set()
+        # users that weren't on the previous page
+        self.new_users = 0
+        # the previous page is the same list, before a scroll
+        self.scrolled = scrolled
+
+    def repeats(self, previous) -> bool:
+        if self.usernames == previous.usernames:
+            return True
+        # shifted by a row without new users: the list ended or the scroll is stuck
+        return self.scrolled and self.new_users == 0
+
+
 class ScrollEndDetector:
     # Specify how many times we'll have to iterate over same users to decide that it's the end of the list
     repeats_to_end = 0
     skipped_all = 0
     skipped_all_fling = 0
-    pages = []
 
     def __init__(
         self, repeats_to_end=5, skipped_list_limit=999, skipped_fling_limit=999
@@ -18,13 +38,29 @@ class ScrollEndDetector:
         self.repeats_to_end = repeats_to_end
         self.skipped_list_limit = skipped_list_limit
         self.skipped_fling_limit = skipped_fling_limit
+        # older pages don't matter to is_the_end
+        self.pages = deque(maxlen=max(repeats_to_end, 2))
+        self.new_list = True
+
+    def notify_new_list(self):
+        """the next page opens another list, it can only repeat it exactly"""
+        self.new_list = True
 
     def notify_new_page(self):
-        self.pages.append([])
+        self.pages.append(_Page(scrolled=not self.new_list and len(self.pages) > 0))
+        self.new_list = False
 
     def notify_username_iterated(self, username):
-        last_page = self.pages[-1]
-        last_page.append(username)
+        if not self.pages:
+            self.notify_new_page()
+        page = self.pages[-1]
+        key = hash(username)
+        page.fingerprint = hash((page.fingerprint, key))
+        if key in page.usernames:
+            return
+        page.usernames.add(key)
+        if page.scrolled and key not in self.pages[-2].usernames:
+            page.new_users += 1
 
     def reset_skipped_all(self):
         self.skipped_all = 0
@@ -53,24 +89,24 @@ class ScrollEndDetector:
         if len(self.pages) < 2:
             return False
 
-        is_the_end = True
-        last_page = self.pages[-1]
         repeats = 1
-        for i in range(2, min(self.repeats_to_end + 1, len(self.pages) + 1)):
-            page = self.pages[-i]
-            if page != last_page:
-                is_the_end = False
+        same_users = True
+        for index in range(len(self.pages) - 1, 0, -1):
+            page, previous = self.pages[index], self.pages[index - 1]
+            if not page.repeats(previous):
                 break
             repeats += 1
+            same_users &= page.fingerprint == previous.fingerprint
+        is_the_end = repeats == len(self.pages)
 
-        if is_the_end:
-            logger.info(
-                f"Same users iterated {repeats} times. End of the list.",
-                extra={"color": f"{Fore.BLUE}"},
+        if repeats > 1:
+            message = (
+                f"Same users iterated {repeats} times."
+                if same_users
+                else f"No new users in the last {repeats} pages."
             )
-        elif repeats > 1:
             logger.info(
-                f"Same users iterated {repeats} times. Continue.",
+                f"{message} {'End of the list' if is_the_end else 'Continue'}.",
                 extra={"color": f"{Fore.BLUE}"},
             )
 
@@ -1,9 +1,12 @@
+import copy
 import logging
 import uuid
 from datetime import datetime, timedelta
 from enum import Enum, auto
 from json import JSONEncoder
 
+from GramAddict.core import clock
+from GramAddict.core.storage import WriteBehindWriter
 from GramAddict.core.utils import get_value
 
 logger = logging.getLogger(__name__)
@@ -29,6 +32,8 @@ class SessionState:
     totalCrashes = 0
     startTime = None
     finishTime = None
+    checkpoints = None
+    checkpoint_snapshot = None
 
     def __init__(self, configs):
         self.id = str(uuid.uuid4())
@@ -48,8 +53,51 @@ class SessionState:
         self.removedMassFollowers = []
         self.totalScraped = {}
         self.totalCrashes = 0
-        self.startTime = datetime.now()
+        self.startTime = clock.now()
         self.finishTime = None
+        self.checkpoints = None
+        self.checkpoint_snapshot = None
+
+    def start_checkpoints(self, sessions, every: int, interval: float):
+        """
+        saves this session in the sessions log from a background thread every
+        `every` changes and every `interval` seconds, so that a killed bot
+        doesn't lose its counters
+        """
+        self.checkpoint_snapshot = self.snapshot()
+        self.checkpoints = WriteBehindWriter(
+            lambda: sessions.checkpoint(
+                self.checkpoint_snapshot, self.checkpoint_snapshot.my_username
+            ),
+            name="sessions",
+            flush_every=every,
+            flush_interval=interval,
+        )
+
+    def stop_checkpoints(self):
+        if self.checkpoints is not None:
+            self.checkpoints.close()
+            self.checkpoints = None
+
+    def changed(self):
+        if self.checkpoints is not None:
+            # the writer thread encodes this copy while we keep counting
+            self.checkpoint_snapshot = self.snapshot()
+            self.checkpoints.mark_dirty()
+
+    def snapshot(self) -> "SessionState":
+        """a copy of the counters that the changes of this one don't touch"""
+        snapshot = copy.copy(self)
+        snapshot.args = copy.copy(self.args)
+        for name in (
+            "totalInteractions",
+            "successfulInteractions",
+            "totalFollowed",
+            "totalScraped",
+            "removedMassFollowers",
+        ):
+            setattr(snapshot, name, copy.copy(getattr(self, name)))
+        return snapshot
 
     def add_interaction(self, source, succeed, followed, scraped):
         if self.totalInteractions.get(source) is None:
@@ -75,6 +123,7 @@ class SessionState:
             if scraped:
                 self.totalScraped[source] += 1
                 self.successfulInteractions[source] += 1
+        self.changed()
 
     def set_limits_session(
         self,
@@ -252,7 +301,7 @@ class SessionState:
 
         in_range = False
         time_left_list = []
-        current_time = datetime.now()
+        current_time = clock.now()
         delta = timedelta(seconds=delta_sec)
         for n in working_hours:
             today = current_time.strftime("%Y-%m-%d")
@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import mmap
+import os
+import sqlite3
+import time
+from typing import Optional
+
+from GramAddict.core.storage import ACCOUNTS
+from GramAddict.core.storage_sync import FileLock
+
+logger = logging.getLogger(__name__)
+
+FILENAME_SHARED_REGISTRY = "shared_registry.db"
+FILENAME_SHARED_BLOOM = "shared_registry.bloom"
+FILENAME_SHARED_LOCK = "shared_registry.lock"
+# 2 MB: about 1% of false positives with 1.5M users
+BLOOM_BITS = 1 << 24
+BLOOM_HASHES = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    username TEXT NOT NULL,
+    account TEXT NOT NULL,
+    interacted_at REAL NOT NULL,
+    PRIMARY KEY (username, account)
+);
+"""
+
+
+class BloomFilter:
+    """
+    Memory-mapped bloom filter shared by the processes of this machine.
+    Bits are only ever set: a user not in there has never been interacted.
+    It has to be opened under the registry lock, another account may be
+    creating it right now.
+    """
+
+    def __init__(self, path, bits=BLOOM_BITS, hashes=BLOOM_HASHES):
+        self.hashes = hashes
+        with open(path, "ab"):
+            pass
+        self.file = open(path, "r+b")
+        # empty when we created it, or when its creator stopped before sizing it
+        self.created = os.path.getsize(path) == 0
+        if self.created:
+            self.file.truncate(bits // 8)
+        size = os.path.getsize(path)
+        self.bits = size * 8
+        self.map = mmap.mmap(self.file.fileno(), size)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.bits for i in range(self.hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.map[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.map[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+class SharedRegistry:
+    """
+    Users interacted by all the accounts running on this machine, in
+    accounts/shared_registry.db, so that accounts working the same niche
+    don't spend time on the same people. The bloom filter answers most of
+    the lookups without touching the database.
+    """
+
+    def __init__(self, account, hours: float, directory=ACCOUNTS):
+        self.account = account
+        # 0: no matter how long ago
+        self.window = hours * 3600
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(
+            os.path.join(directory, FILENAME_SHARED_REGISTRY), timeout=30
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        # the other accounts wait until the bloom filter is sized and filled
+        with FileLock(os.path.join(directory, FILENAME_SHARED_LOCK)):
+            self.bloom = BloomFilter(os.path.join(directory, FILENAME_SHARED_BLOOM))
+            if self.bloom.created:
+                self._fill_bloom()
+
+    def _fill_bloom(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        for (username,) in self.connection.execute(
+            "SELECT DISTINCT username FROM interactions"
+        ):
+            self.bloom.add(username)
+        self.connection.commit()
+
+    def claim(self, username):
+        """records that this account is interacting with username"""
+        # the write lock of the database also serializes the bloom updates
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO interactions (username, account, interacted_at) VALUES (?, ?, ?)",
+                (username, self.account, time.time()),
+            )
+            self.bloom.add(username)
+        except Exception:
+            self.connection.rollback()
+            raise
+        self.connection.commit()
+
+    def interacted_by_other_account(self, username) -> Optional[str]:
+        """the last other account which interacted with username in the window"""
+        if username not in self.bloom:
+            return None
+        since = time.time() - self.window if self.window else 0
+        row = self.connection.execute(
+            "SELECT account FROM interactions WHERE username = ? AND account != ? AND interacted_at >= ? ORDER BY interacted_at DESC LIMIT 1",
+            (username, self.account, since),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def close(self):
+        self.connection.close()
+        self.bloom.close()
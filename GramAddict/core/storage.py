@@ -1,32 +1,141 @@
+import atexit
 import json
 import logging
 import os
 import sys
+import threading
+import time
+import weakref
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableMapping
 from datetime import datetime, timedelta
 from enum import Enum, unique
 from typing import Optional, Union
 
 from atomicwrites import atomic_write
 
+from GramAddict.core import clock
+from GramAddict.core.storage_archive import InteractionArchive
+from GramAddict.core.storage_sync import (
+    FILENAME_CHANGES,
+    FILENAME_LOCK,
+    ChangeFeed,
+    FileLock,
+    file_signature,
+)
+
 logger = logging.getLogger(__name__)
 
 ACCOUNTS = "accounts"
 REPORTS = "reports"
 FILENAME_HISTORY_FILTER_USERS = "history_filters_users.json"
 FILENAME_INTERACTED_USERS = "interacted_users.json"
+FILENAME_INTERACTED_USERS_JOURNAL = "interacted_users.journal"
 OLD_FILTER = "filter.json"
 FILTER = "filters.yml"
 USER_LAST_INTERACTION = "last_interaction"
 USER_FOLLOWING_STATUS = "following_status"
+CHANGE_INTERACTED = "interacted"
+CHANGE_ARCHIVED = "archived"
+# seconds between two reads of the changes made by the other processes
+CHANGES_POLL_INTERVAL = 5
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
 
 FILENAME_WHITELIST = "whitelist.txt"
 FILENAME_BLACKLIST = "blacklist.txt"
 FILENAME_COMMENTS = "comments_list.txt"
 FILENAME_MESSAGES = "pm_list.txt"
 
+STORAGE_BACKEND_JSON = "json"
+STORAGE_BACKEND_JOURNAL = "journal"
+STORAGE_BACKEND_SQLITE = "sqlite"
+STORAGE_BACKEND_LAZY = "lazy"
+
+
+# storages with writes that may still be buffered, flushed on crash and at exit
+_open_storages = weakref.WeakSet()
+
+
+def flush_storages():
+    """write everything still buffered by the storages of this process"""
+    for storage in list(_open_storages):
+        try:
+            storage.flush()
+        except Exception as e:
+            logger.error(f"Can't flush the storage: {e}")
+
+
+atexit.register(flush_storages)
+
+
+def create_storage(my_username, args=None):
+    if args is None:
+        return Storage(my_username)
+    storage = _open_storage(my_username, args)
+    if my_username is not None and args.shared_registry is not None:
+        from GramAddict.core.shared_registry import SharedRegistry
+
+        storage.shared_registry = SharedRegistry(
+            my_username, float(args.shared_registry)
+        )
+    archive_after = get_archive_age(args)
+    if my_username is not None and archive_after is not None:
+        storage.archive_inactive_users(archive_after)
+    return storage
+
+
+def _open_storage(my_username, args):
+    backend = args.storage_backend
+    write_behind = {
+        "filter_flush_every": int(args.filter_history_flush_every),
+        "filter_flush_interval": float(args.filter_history_flush_interval),
+    }
+    if backend == STORAGE_BACKEND_LAZY:
+        from GramAddict.core.storage_lazy import LazyStorage
+
+        return LazyStorage(
+            my_username,
+            compact_every=int(args.journal_compact_every),
+            **write_behind,
+        )
+    if backend == STORAGE_BACKEND_JOURNAL:
+        return JournaledStorage(
+            my_username,
+            compact_every=int(args.journal_compact_every),
+            **write_behind,
+        )
+    if backend == STORAGE_BACKEND_SQLITE:
+        from GramAddict.core.storage_sqlite import SQLiteStorage
+
+        return SQLiteStorage(my_username)
+    if backend != STORAGE_BACKEND_JSON:
+        logger.warning(
+            f"Unknown storage backend '{backend}', using '{STORAGE_BACKEND_JSON}'."
+        )
+    return Storage(my_username, **write_behind)
+
+
+def get_archive_age(args) -> Optional[timedelta]:
+    """
+    how old resolved users have to be to get archived, never less than
+    can-reinteract-after so that users we may interact again soon stay hot
+    """
+    if args.archive_interacted_after is None:
+        return None
+    age = timedelta(days=float(args.archive_interacted_after))
+    if args.can_reinteract_after is not None:
+        hours = float(str(args.can_reinteract_after).split("-")[-1])
+        age = max(age, timedelta(hours=hours))
+    return age
+
 
 class Storage:
-    def __init__(self, my_username):
+    def __init__(self, my_username, filter_flush_every=1, filter_flush_interval=30):
+        self.filter_users_writer = None
+        self.archive = None
+        self.shared_registry = None
+        self.interacted_users_path = None
+        self.history_filter_users_path = None
         if my_username is None:
             logger.error(
                 "No username, thus the script won't get access to interacted users and sessions data."
@@ -35,34 +144,31 @@ class Storage:
         self.account_path = os.path.join(ACCOUNTS, my_username)
         if not os.path.exists(self.account_path):
             os.makedirs(self.account_path)
-        self.interacted_users = {}
-        self.history_filter_users = {}
-
         self.interacted_users_path = os.path.join(
             self.account_path, FILENAME_INTERACTED_USERS
         )
-        if os.path.isfile(self.interacted_users_path):
-            with open(self.interacted_users_path, encoding="utf-8") as json_file:
-                try:
-                    self.interacted_users = json.load(json_file)
-                except Exception as e:
-                    logger.error(
-                        f"Please check {json_file.name}, it contains this error: {e}"
-                    )
-                    sys.exit(0)
         self.history_filter_users_path = os.path.join(
             self.account_path, FILENAME_HISTORY_FILTER_USERS
         )
-
-        if os.path.isfile(self.history_filter_users_path):
-            with open(self.history_filter_users_path, encoding="utf-8") as json_file:
-                try:
-                    self.history_filter_users = json.load(json_file)
-                except Exception as e:
-                    logger.error(
-                        f"Please check {json_file.name}, it contains this error: {e}"
-                    )
-                    sys.exit(0)
+        self.lock = FileLock(os.path.join(self.account_path, FILENAME_LOCK))
+        self.changes = self._open_change_feed()
+        self.changes_polled_at = time.monotonic()
+        with self.lock:
+            self.interacted_users = self._load_interacted_users()
+            self.history_filter_users = self._load_history_filter_users()
+            self.filter_users_signature = file_signature(self.history_filter_users_path)
+            if self.changes is not None:
+                self.changes.skip_to_end()
+        self.interaction_times = self._build_time_index()
+        self.archive = self._open_archive()
+        if filter_flush_every > 1:
+            self.filter_users_writer = WriteBehindWriter(
+                self._save_filter_users,
+                name=FILENAME_HISTORY_FILTER_USERS,
+                flush_every=filter_flush_every,
+                flush_interval=filter_flush_interval,
+            )
+        _open_storages.add(self)
         self.filter_path = os.path.join(self.account_path, FILTER)
         if not os.path.exists(self.filter_path):
             self.filter_path = os.path.join(self.account_path, OLD_FILTER)
@@ -83,6 +189,96 @@ class Storage:
 
         self.report_path = os.path.join(self.account_path, REPORTS)
 
+    def _load_interacted_users(self):
+        # records are made compact while parsing, the dicts never pile up
+        return self._load_json(
+            self.interacted_users_path, object_hook=InteractedUser.from_json
+        )
+
+    def _load_history_filter_users(self):
+        return self._load_json(self.history_filter_users_path)
+
+    def _build_time_index(self):
+        return InteractionTimeIndex.from_users(self.interacted_users)
+
+    def _open_archive(self):
+        return InteractionArchive(self.account_path)
+
+    def _open_change_feed(self):
+        return ChangeFeed(os.path.join(self.account_path, FILENAME_CHANGES))
+
+    def poll_changes(self) -> int:
+        """applies what the other processes changed since the last call"""
+        self.changes_polled_at = time.monotonic()
+        if self.changes is None:
+            return 0
+        records = self.changes.read_new()
+        if records is None:
+            logger.debug("The changes started over, merging the whole snapshot.")
+            snapshot = self._load_json(
+                self.interacted_users_path, object_hook=InteractedUser.from_json
+            )
+            records = [
+                {"kind": CHANGE_INTERACTED, "username": username, "user": user}
+                for username, user in snapshot.items()
+            ]
+        applied = 0
+        archived = False
+        for record in records:
+            if self._apply_change(record["kind"], record["username"], record["user"]):
+                applied += 1
+                archived |= record["kind"] == CHANGE_ARCHIVED
+        if archived:
+            # the other process also updated the sketch on disk
+            self.archive = self._open_archive()
+        if applied:
+            logger.debug(f"Applied {applied} change(s) made by another process.")
+        return applied
+
+    def _poll_changes_if_due(self):
+        if time.monotonic() - self.changes_polled_at >= CHANGES_POLL_INTERVAL:
+            self.poll_changes()
+
+    def _apply_change(self, kind, username, user) -> bool:
+        """merges a change of another process, the most recent interaction wins"""
+        timestamp = self.interaction_times.get(username)
+        if kind == CHANGE_ARCHIVED:
+            if timestamp is None or timestamp > user:
+                return False
+            del self.interacted_users[username]
+            self.interaction_times.discard(username)
+            return True
+        incoming = parse_time(user[USER_LAST_INTERACTION]).timestamp()
+        if timestamp is not None and timestamp >= incoming:
+            return False
+        self.interacted_users[username] = InteractedUser(user)
+        self.interaction_times.set(username, incoming)
+        return True
+
+    def _publish_change(self, kind, username, user):
+        """the lock must be held"""
+        if self.changes is not None:
+            self.changes.append(kind, username, user, default=to_json)
+
+    def _write_snapshot(self):
+        """the lock must be held"""
+        self._update_file()
+        if self.changes is not None:
+            self.changes.start_over_if_big()
+
+    @staticmethod
+    def _load_json(path, object_hook=None) -> dict:
+        if not os.path.isfile(path):
+            return {}
+        with open(path, encoding="utf-8") as json_file:
+            try:
+                return json.load(json_file, object_hook=object_hook)
+            except Exception as e:
+                logger.error(
+                    f"Please check {json_file.name}, it contains this error: {e}"
+                )
+                sys.exit(0)
+
     def can_be_reinteract(
         self,
         last_interaction: datetime,
@@ -110,27 +306,98 @@ class Storage:
     ) -> bool:
         if stored_time is None or limit_time == timedelta(hours=0):
             return True
-        return datetime.now() - stored_time >= limit_time
+        return clock.now() - stored_time >= limit_time
 
     def check_user_was_interacted(self, username):
         """returns when a username has been interacted, False if not already interacted"""
-        user = self.interacted_users.get(username)
-        if user is None:
-            return False, None
+        self._poll_changes_if_due()
+        timestamp = self.interaction_times.get(username)
+        if timestamp is None:
+            archived = self.archive.lookup(username)
+            if archived is None:
+                return False, None
+            timestamp = archived[0] * 60
+        return True, datetime.fromtimestamp(timestamp)
 
-        last_interaction = datetime.strptime(
-            user[USER_LAST_INTERACTION], "%Y-%m-%d %H:%M:%S.%f"
+    def count_interacted_since(self, since: datetime) -> int:
+        timestamp = since.timestamp()
+        minute = int(timestamp // 60)
+        # users interacted again once archived are in both tiers, count them once
+        back_from_archive = 0
+        for username in self.interaction_times.usernames_since(timestamp):
+            archived = self.archive.lookup(username)
+            if archived is not None and archived[0] >= minute:
+                back_from_archive += 1
+        return (
+            self.interaction_times.count_since(timestamp)
+            + self.archive.sketch.count_since(minute)
+            - back_from_archive
         )
-        return True, last_interaction
+
+    def get_interacted_before(self, before: datetime) -> list:
+        """usernames whose last interaction is older than `before`, oldest first"""
+        return self.interaction_times.usernames_before(before.timestamp())
 
     def get_following_status(self, username):
+        self._poll_changes_if_due()
         user = self.interacted_users.get(username)
         if user is None:
-            return FollowingStatus.NOT_IN_LIST
+            archived = self.archive.lookup(username)
+            if archived is None:
+                return FollowingStatus.NOT_IN_LIST
+            return FollowingStatus(archived[1])
         else:
             return FollowingStatus[user[USER_FOLLOWING_STATUS].upper()]
 
-    def add_filter_user(self, username, profile_data, skip_reason=None):
+    def claim_user(self, username):
+        """tells the other accounts of this machine we're interacting with username"""
+        if self.shared_registry is not None:
+            self.shared_registry.claim(username)
+
+    def get_other_account_interaction(self, username) -> Optional[str]:
+        """another account of this machine which recently interacted with username"""
+        if self.shared_registry is None:
+            return None
+        return self.shared_registry.interacted_by_other_account(username)
+
+    def archive_inactive_users(self, older_than: timedelta) -> int:
+        """
+        moves the users not interacted for `older_than` and not followed
+        anymore (or never) to the archive, returns how many
+        """
+        if self.archive is None:
+            return 0
+        with self.lock:
+            self.poll_changes()
+            records = {}
+            for username in self.get_interacted_before(clock.now() - older_than):
+                status = self.get_following_status(username)
+                if status not in ARCHIVED_STATUSES:
+                    continue
+                records[username] = (
+                    int(self.interaction_times.get(username) // 60),
+                    status.value,
+                    to_json(self.interacted_users[username]),
+                )
+            if not records:
+                return 0
+            # archive first: if we stop in between, the hot record just shadows it
+            self.archive.add(records)
+            for username in records:
+                self._publish_change(
+                    CHANGE_ARCHIVED, username, self.interaction_times.get(username)
+                )
+                del self.interacted_users[username]
+                self.interaction_times.discard(username)
+            self._write_snapshot()
+        logger.info(
+            f"Archived {len(records)} user(s) not interacted since {older_than.days} day(s), {len(self.interacted_users)} left in {FILENAME_INTERACTED_USERS}."
+        )
+        return len(records)
+
+    def add_filter_user(
+        self, username, profile_data, skip_reason=None, filters_hash=None
+    ):
         user = profile_data.__dict__
         user["follow_button_text"] = (
             profile_data.follow_button_text.name
@@ -138,12 +405,36 @@ class Storage:
             else None
         )
         user["skip_reason"] = None if skip_reason is None else skip_reason.name
+        # the verdict only holds for the same filters
+        user["filters_hash"] = filters_hash
         self.history_filter_users[username] = user
-        if self.history_filter_users_path is not None:
-            with atomic_write(
-                self.history_filter_users_path, overwrite=True, encoding="utf-8"
-            ) as outfile:
-                json.dump(self.history_filter_users, outfile, indent=4, sort_keys=False)
+        self._persist_filter_user(username)
+
+    def get_filter_user(self, username) -> Optional[dict]:
+        """what the filters found on that profile the last time it was checked"""
+        if self.history_filter_users_path is None:
+            return None
+        return self.history_filter_users.get(username)
+
+    def _persist_filter_user(self, username):
+        if self.filter_users_writer is not None:
+            self.filter_users_writer.mark_dirty()
+        elif self.history_filter_users_path is not None:
+            self._save_filter_users()
+
+    def _save_filter_users(self):
+        with self.lock:
+            if file_signature(self.history_filter_users_path) != (
+                self.filter_users_signature
+            ):
+                # another process saved it since: merge instead of overwriting
+                on_disk = self._load_json(self.history_filter_users_path)
+                for username, user in on_disk.items():
+                    self.history_filter_users.setdefault(username, user)
+            # dict.copy() runs under the GIL: the snapshot is consistent even
+            # when it's taken by the write-behind thread
+            write_json(self.history_filter_users_path, self.history_filter_users.copy())
+            self.filter_users_signature = file_signature(self.history_filter_users_path)
 
     def add_interacted_user(
         self,
@@ -160,8 +451,16 @@ class Storage:
         job_name=None,
         target=None,
     ):
-        user = self.interacted_users.get(username, {})
-        user[USER_LAST_INTERACTION] = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+        user = self.interacted_users.get(username)
+        if user is None:
+            # back from the archive: keep counting from the archived record
+            user = InteractedUser(
+                None if self.archive is None else self.archive.read(username)
+            )
+        now = clock.now()
+        user[USER_LAST_INTERACTION] = now.strftime(TIME_FORMAT)
+        if self.interaction_times is not None:
+            self.interaction_times.set(username, now.timestamp())
 
         if followed:
             if is_requested:
@@ -216,7 +515,7 @@ class Storage:
             else user["pm_sent"]
         )
         self.interacted_users[username] = user
-        self._update_file()
+        self._persist_interacted_user(username)
 
     def is_user_in_whitelist(self, username):
         return username in self.whitelist
@@ -225,23 +524,389 @@ class Storage:
         return username in self.blacklist
 
     def _get_last_day_interactions_count(self):
-        count = 0
-        users_list = list(self.interacted_users.values())
-        for user in users_list:
-            last_interaction = datetime.strptime(
-                user[USER_LAST_INTERACTION], "%Y-%m-%d %H:%M:%S.%f"
+        return self.count_interacted_since(clock.now() - timedelta(days=1))
+
+    def _persist_interacted_user(self, username):
+        with self.lock:
+            # merge what the other processes did, or we'd overwrite it
+            self.poll_changes()
+            self._write_snapshot()
+            self._publish_change(
+                CHANGE_INTERACTED, username, self.interacted_users[username]
             )
-            is_last_day = datetime.now() - last_interaction <= timedelta(days=1)
-            if is_last_day:
-                count += 1
-        return count
 
     def _update_file(self):
         if self.interacted_users_path is not None:
-            with atomic_write(
-                self.interacted_users_path, overwrite=True, encoding="utf-8"
-            ) as outfile:
-                json.dump(self.interacted_users, outfile, indent=4, sort_keys=False)
+            write_json(self.interacted_users_path, self.interacted_users)
+
+    def flush(self):
+        """write what is buffered, safe to call from a crash handler"""
+        if self.filter_users_writer is not None:
+            self.filter_users_writer.flush()
+
+    def close(self):
+        """persist anything still pending, called at the end of each session"""
+        if self.filter_users_writer is not None:
+            self.filter_users_writer.close()
+            self.filter_users_writer = None
+        if self.shared_registry is not None:
+            self.shared_registry.close()
+            self.shared_registry = None
+        _open_storages.discard(self)
+
+
+def write_json(path, data):
+    with atomic_write(path, overwrite=True, encoding="utf-8") as outfile:
+        json.dump(data, outfile, indent=4, sort_keys=False, default=to_json)
+
+
+def to_json(value):
+    """`default` for json.dump, turns records back into plain dicts"""
+    if isinstance(value, InteractedUser):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class WriteBehindWriter:
+    """
+    Calls `save` from a background thread, so the interaction path only
+    updates memory. It's called every `flush_every` changes, every
+    `flush_interval` seconds if something changed, and on flush() / close().
+    """
+
+    def __init__(self, save, name, flush_every, flush_interval):
+        self.save = save
+        self.name = name
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.pending = 0
+        self.pending_lock = threading.Lock()
+        # only one thread saves at a time
+        self.write_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.thread = threading.Thread(target=self._run, name=f"write-behind {name}")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def mark_dirty(self):
+        with self.pending_lock:
+            self.pending += 1
+            if self.pending >= self.flush_every:
+                self.wakeup.set()
+
+    def flush(self):
+        with self.write_lock:
+            with self.pending_lock:
+                if self.pending == 0:
+                    return
+                flushed = self.pending
+            self.save()
+            with self.pending_lock:
+                self.pending -= flushed
+        logger.debug(f"Saved {flushed} change(s) to {self.name}.")
+
+    def _run(self):
+        while not self.stopped:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # the changes stay pending, next flush will retry
+                logger.error(f"Can't save {self.name}: {e}")
+
+    def close(self):
+        self.stopped = True
+        self.wakeup.set()
+        self.thread.join()
+        self.flush()
+
+
+def parse_time(value: str) -> datetime:
+    try:
+        # a lot faster than strptime, matters when loading big files
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, TIME_FORMAT)
+
+
+class InteractionTimeIndex:
+    """
+    Last interaction of each user as epoch, parsed once at load.
+    The same timestamps are also kept sorted, so that time range queries
+    are bisections instead of scans over all the users.
+    """
+
+    def __init__(self):
+        self.times = {}
+        self._sorted_times = []
+        self._sorted_usernames = []
+
+    @classmethod
+    def from_users(cls, users):
+        return cls.from_times(
+            {
+                username: (
+                    user.last_interaction_time()
+                    if isinstance(user, InteractedUser)
+                    else parse_time(user[USER_LAST_INTERACTION])
+                ).timestamp()
+                for username, user in users.items()
+            }
+        )
+
+    @classmethod
+    def from_times(cls, times: dict):
+        index = cls()
+        index.times = times
+        ordered = sorted(times.items(), key=lambda item: item[1])
+        index._sorted_usernames = [username for username, _ in ordered]
+        index._sorted_times = [timestamp for _, timestamp in ordered]
+        return index
+
+    def __len__(self):
+        return len(self.times)
+
+    def get(self, username) -> Optional[float]:
+        return self.times.get(username)
+
+    def set(self, username, timestamp: float):
+        self.discard(username)
+        self.times[username] = timestamp
+        # new interactions are the most recent ones: it's almost always an append
+        position = bisect_right(self._sorted_times, timestamp)
+        self._sorted_times.insert(position, timestamp)
+        self._sorted_usernames.insert(position, username)
+
+    def discard(self, username):
+        timestamp = self.times.pop(username, None)
+        if timestamp is None:
+            return
+        position = bisect_left(self._sorted_times, timestamp)
+        while self._sorted_usernames[position] != username:
+            position += 1
+        del self._sorted_times[position]
+        del self._sorted_usernames[position]
+
+    def count_since(self, timestamp: float) -> int:
+        return len(self._sorted_times) - bisect_left(self._sorted_times, timestamp)
+
+    def usernames_before(self, timestamp: float) -> list:
+        return self._sorted_usernames[: bisect_left(self._sorted_times, timestamp)]
+
+    def usernames_since(self, timestamp: float) -> list:
+        return self._sorted_usernames[bisect_left(self._sorted_times, timestamp) :]
+
+
+EPOCH = datetime(1970, 1, 1)
+INTERACTED_USER_FIELDS = (
+    USER_LAST_INTERACTION,
+    USER_FOLLOWING_STATUS,
+    "session_id",
+    "job_name",
+    "target",
+    "liked",
+    "watched",
+    "commented",
+    "followed",
+    "unfollowed",
+    "scraped",
+    "pm_sent",
+)
+SHARED_FIELDS = frozenset(("session_id", "job_name", "target"))
+PLAIN_FIELDS = frozenset(INTERACTED_USER_FIELDS[5:])
+MICROSECOND = timedelta(microseconds=1)
+
+# one copy of each session id, job name and target for all the records
+_shared_strings = {}
+
+
+class InteractedUser(MutableMapping):
+    """
+    Record of an interacted user, a lot smaller than the dict it replaces.
+    The last interaction is kept as microseconds, the following status as a
+    FollowingStatus member and session ids, job names and targets are shared
+    between records. Reading and writing it like the dict still works.
+    """
+
+    __slots__ = INTERACTED_USER_FIELDS + ("extra",)
+
+    def __init__(self, fields=None):
+        # keys we don't know about, kept as they are
+        self.extra = None
+        if fields is not None:
+            for key, value in fields.items():
+                if key in PLAIN_FIELDS:
+                    # counters and flags, nothing to convert
+                    setattr(self, key, value)
+                else:
+                    self[key] = value
+
+    @classmethod
+    def from_json(cls, fields: dict):
+        """object_hook for json.load, leaves the dicts which aren't users alone"""
+        if isinstance(fields.get(USER_LAST_INTERACTION), str):
+            return cls(fields)
+        return fields
+
+    def last_interaction_time(self) -> datetime:
+        return EPOCH + self.last_interaction * MICROSECOND
+
+    def __getitem__(self, key):
+        if key not in INTERACTED_USER_FIELDS:
+            if self.extra is None:
+                raise KeyError(key)
+            return self.extra[key]
+        try:
+            value = getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+        if key == USER_LAST_INTERACTION:
+            return self.last_interaction_time().strftime(TIME_FORMAT)
+        if key == USER_FOLLOWING_STATUS:
+            return value.name.casefold()
+        return value
+
+    def __setitem__(self, key, value):
+        if key not in INTERACTED_USER_FIELDS:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+            return
+        if key == USER_LAST_INTERACTION:
+            value = (parse_time(value) - EPOCH) // MICROSECOND
+        elif key == USER_FOLLOWING_STATUS:
+            value = FollowingStatus[value.upper()]
+        elif key in SHARED_FIELDS and isinstance(value, str):
+            value = _shared_strings.setdefault(value, value)
+        setattr(self, key, value)
+
+    def __delitem__(self, key):
+        if key not in INTERACTED_USER_FIELDS:
+            if self.extra is None:
+                raise KeyError(key)
+            del self.extra[key]
+            return
+        try:
+            delattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        if key in INTERACTED_USER_FIELDS:
+            return hasattr(self, key)
+        return self.extra is not None and key in self.extra
+
+    def __iter__(self):
+        for key in INTERACTED_USER_FIELDS:
+            if hasattr(self, key):
+                yield key
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"InteractedUser({self.to_dict()})"
+
+
+class JournaledStorage(Storage):
+    """
+    Appends every interaction to interacted_users.journal instead of rewriting
+    the whole interacted_users.json. The json file is still the snapshot (and
+    export format): it's rebuilt from the journal every `compact_every` records,
+    at startup and when the storage is closed.
+    """
+
+    def __init__(self, my_username, compact_every=500, **kwargs):
+        self.journal_path = None
+        self.journal_records = 0
+        self.compact_every = compact_every
+        super().__init__(my_username, **kwargs)
+        if my_username is None:
+            return
+        self.journal_path = os.path.join(
+            self.account_path, FILENAME_INTERACTED_USERS_JOURNAL
+        )
+        with self.lock:
+            if self._replay_journal() > 0:
+                self.compact()
+
+    def _replay_journal(self) -> int:
+        """apply the records left in the journal by the last run, returns how many"""
+        if not os.path.isfile(self.journal_path):
+            return 0
+        replayed = 0
+        with open(self.journal_path, encoding="utf-8") as journal:
+            for line_number, line in enumerate(journal, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a torn write can only happen on the last line
+                    logger.warning(
+                        f"Ignoring corrupted record at line {line_number} of {self.journal_path}."
+                    )
+                    continue
+                self.interacted_users[record["username"]] = InteractedUser(
+                    record["user"]
+                )
+                self.interaction_times.set(
+                    record["username"],
+                    parse_time(record["user"][USER_LAST_INTERACTION]).timestamp(),
+                )
+                replayed += 1
+        if replayed:
+            logger.debug(f"Replayed {replayed} record(s) from {self.journal_path}.")
+        return replayed
+
+    def _persist_interacted_user(self, username):
+        user = self.interacted_users[username]
+        record = {"username": username, "user": user}
+        with self.lock:
+            self.poll_changes()
+            with open(self.journal_path, "a", encoding="utf-8") as journal:
+                journal.write(json.dumps(record, default=to_json) + "\n")
+                journal.flush()
+                os.fsync(journal.fileno())
+            self._publish_change(CHANGE_INTERACTED, username, user)
+            self.journal_records += 1
+            if self.journal_records >= self.compact_every:
+                self.compact()
+
+    def compact(self):
+        """write the snapshot and truncate the journal"""
+        with self.lock:
+            self.poll_changes()
+            self._write_snapshot()
+            self._truncate_journal()
+
+    def _truncate_journal(self):
+        # the snapshot is already on disk: replaying the journal again is harmless
+        with open(self.journal_path, "w", encoding="utf-8"):
+            pass
+        self.journal_records = 0
+
+    def archive_inactive_users(self, older_than: timedelta) -> int:
+        with self.lock:
+            archived = super().archive_inactive_users(older_than)
+            if archived:
+                # the snapshot was just written, the journal would bring them back
+                self._truncate_journal()
+        return archived
+
+    def close(self):
+        if self.journal_path is not None and self.journal_records > 0:
+            self.compact()
+        super().close()
 
 
 @unique
@@ -252,3 +917,11 @@ class FollowingStatus(Enum):
     UNFOLLOWED = 3
     NOT_IN_LIST = 4
     SCRAPED = 5
+
+
+# users in these states need nothing more from us
+ARCHIVED_STATUSES = (
+    FollowingStatus.NONE,
+    FollowingStatus.UNFOLLOWED,
+    FollowingStatus.SCRAPED,
+)
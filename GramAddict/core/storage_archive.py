@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import os
+from array import array
+from bisect import bisect_left
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FILENAME_ARCHIVE = "interacted_users.archive.jsonl"
+FILENAME_ARCHIVE_SKETCH = "interacted_users.archive.sketch"
+SKETCH_MAGIC = b"GAS1"
+
+
+def username_hash(username: str) -> int:
+    digest = hashlib.blake2b(username.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class ArchiveSketch:
+    """
+    What stays in memory of the archived users: a 64-bit hash of the username,
+    the minute of the last interaction and the following status, in arrays
+    sorted by hash. The minutes are also kept sorted on their own, for the
+    time range queries. That's 17 bytes per user.
+    """
+
+    def __init__(self):
+        self.hashes = array("q")
+        self.minutes = array("i")
+        self.statuses = array("B")
+        self.sorted_minutes = array("i")
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def lookup(self, username) -> Optional[Tuple[int, int]]:
+        """(minute, status) of an archived user, None if not archived"""
+        key = username_hash(username)
+        position = bisect_left(self.hashes, key)
+        if position == len(self.hashes) or self.hashes[position] != key:
+            return None
+        return self.minutes[position], self.statuses[position]
+
+    def merge(self, entries: dict):
+        """entries: username -> (minute, status), they replace the existing ones"""
+        merged = dict(zip(self.hashes, zip(self.minutes, self.statuses)))
+        for username, entry in entries.items():
+            merged[username_hash(username)] = entry
+        self.hashes = array("q", sorted(merged))
+        self.minutes = array("i", (merged[key][0] for key in self.hashes))
+        self.statuses = array("B", (merged[key][1] for key in self.hashes))
+        self.sorted_minutes = array("i", sorted(self.minutes))
+
+    def count_since(self, minute: int) -> int:
+        return len(self.sorted_minutes) - bisect_left(self.sorted_minutes, minute)
+
+    def save(self, path, archive_size: int):
+        with open(path, "wb") as sketch_file:
+            sketch_file.write(SKETCH_MAGIC)
+            array("q", [archive_size, len(self.hashes)]).tofile(sketch_file)
+            self.hashes.tofile(sketch_file)
+            self.minutes.tofile(sketch_file)
+            self.statuses.tofile(sketch_file)
+
+    @classmethod
+    def load(cls, path, archive_size: int):
+        """None if the sketch is missing or doesn't match the archive"""
+        if not os.path.isfile(path):
+            return None
+        sketch = cls()
+        try:
+            with open(path, "rb") as sketch_file:
+                if sketch_file.read(len(SKETCH_MAGIC)) != SKETCH_MAGIC:
+                    return None
+                header = array("q")
+                header.fromfile(sketch_file, 2)
+                if header[0] != archive_size:
+                    return None
+                sketch.hashes.fromfile(sketch_file, header[1])
+                sketch.minutes.fromfile(sketch_file, header[1])
+                sketch.statuses.fromfile(sketch_file, header[1])
+        except EOFError:
+            return None
+        sketch.sorted_minutes = array("i", sorted(sketch.minutes))
+        return sketch
+
+
+class InteractionArchive:
+    """
+    Cold tier of the interacted users: records are appended to
+    interacted_users.archive.jsonl and only the sketch is kept in memory.
+    Full records are read back from the file when a user comes back.
+    """
+
+    def __init__(self, account_path):
+        self.path = os.path.join(account_path, FILENAME_ARCHIVE)
+        self.sketch_path = os.path.join(account_path, FILENAME_ARCHIVE_SKETCH)
+        self.sketch = ArchiveSketch.load(self.sketch_path, self._size())
+        if self.sketch is None:
+            self.sketch = self._rebuild_sketch()
+
+    def _size(self) -> int:
+        return os.path.getsize(self.path) if os.path.isfile(self.path) else 0
+
+    def _rebuild_sketch(self) -> ArchiveSketch:
+        sketch = ArchiveSketch()
+        if not os.path.isfile(self.path):
+            return sketch
+        entries = {}
+        with open(self.path, encoding="utf-8") as archive:
+            for line in archive:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                entries[record["username"]] = (record["minute"], record["status"])
+        sketch.merge(entries)
+        sketch.save(self.sketch_path, self._size())
+        logger.debug(f"Rebuilt the sketch of {len(sketch)} archived user(s).")
+        return sketch
+
+    def __len__(self):
+        return len(self.sketch)
+
+    def lookup(self, username) -> Optional[Tuple[int, int]]:
+        return self.sketch.lookup(username)
+
+    def add(self, records: dict):
+        """records: username -> (minute, status, user as a json-able dict)"""
+        with open(self.path, "a", encoding="utf-8") as archive:
+            for username, (minute, status, user) in records.items():
+                record = {
+                    "username": username,
+                    "minute": minute,
+                    "status": status,
+                    "user": user,
+                }
+                archive.write(json.dumps(record) + "\n")
+            archive.flush()
+            os.fsync(archive.fileno())
+        self.sketch.merge(
+            {username: record[:2] for username, record in records.items()}
+        )
+        self.sketch.save(self.sketch_path, self._size())
+
+    def read(self, username) -> Optional[dict]:
+        """full record of an archived user, scans the whole archive"""
+        if self.lookup(username) is None or not os.path.isfile(self.path):
+            return None
+        prefix = json.dumps({"username": username})[:-1] + ","
+        user = None
+        with open(self.path, encoding="utf-8") as archive:
+            for line in archive:
+                # the last one is the most recent
+                if line.startswith(prefix):
+                    user = json.loads(line)["user"]
+        return user
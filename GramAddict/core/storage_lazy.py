@@ -0,0 +1,324 @@
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from collections.abc import MutableMapping
+
+from atomicwrites import atomic_write
+
+from GramAddict.core.storage import (
+    USER_LAST_INTERACTION,
+    InteractionTimeIndex,
+    JournaledStorage,
+    parse_time,
+    to_json,
+)
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+OBJECT_START = re.compile(r"[ \t\n\r]*\{[ \t\n\r]*(\}?)")
+MEMBER_KEY = re.compile(r'[ \t\n\r]*"((?:[^"\\]|\\.)*)"[ \t\n\r]*:[ \t\n\r]*', re.S)
+AFTER_VALUE = re.compile(r"[ \t\n\r]*([,}])")
+
+_decoder = json.JSONDecoder()
+_DELETED = object()
+
+
+class _ChunkedText:
+    """
+    The file decoded as latin-1, read chunk by chunk: every byte is one
+    character, so positions in the text are offsets in the file.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.text = ""
+        self.start = 0  # file offset of text[0]
+        self.eof = False
+
+    def read_more(self) -> bool:
+        chunk = self.file.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.text += chunk.decode("latin-1")
+        return True
+
+    def discard_before(self, position) -> int:
+        self.start += position
+        self.text = self.text[position:]
+        return 0
+
+    def match(self, pattern, position):
+        while True:
+            match = pattern.match(self.text, position)
+            # don't stop at the end of a chunk, the match could go on
+            if match is not None and match.end() < len(self.text):
+                return match
+            if not self.read_more():
+                if match is None:
+                    raise ValueError(
+                        f"unexpected content at byte {self.start + position}"
+                    )
+                return match
+
+    def decode(self, position):
+        while True:
+            try:
+                value, end = _decoder.scan_once(self.text, position)
+            except (StopIteration, json.JSONDecodeError):
+                if not self.read_more():
+                    raise ValueError(f"invalid value at byte {self.start + position}")
+                continue
+            if end < len(self.text) or not self.read_more():
+                return value, end
+
+
+def _decode_key(key: str) -> str:
+    if not key.isascii():
+        key = key.encode("latin-1").decode("utf-8")
+    if "\\" in key:
+        key = json.loads(f'"{key}"')
+    return key
+
+
+def scan_json_object(file):
+    """
+    Yields (key, value, offset, length) for each member of the json object
+    stored in `file` (opened in binary mode), without reading the whole file.
+    offset and length delimit the whole `"key": value` member. Values are
+    decoded as latin-1: only their ascii fields are reliable.
+    """
+    text = _ChunkedText(file)
+    start = text.match(OBJECT_START, 0)
+    if start.group(1):
+        return
+    position = start.end()
+    while True:
+        member = text.match(MEMBER_KEY, position)
+        key_start = member.start(1) - 1
+        value, end = text.decode(member.end())
+        yield _decode_key(
+            member.group(1)
+        ), value, text.start + key_start, end - key_start
+        after = text.match(AFTER_VALUE, end)
+        if after.group(1) == "}":
+            return
+        position = after.end()
+        if position > CHUNK_SIZE:
+            position = text.discard_before(position)
+
+
+class JsonObjectFile(MutableMapping):
+    """
+    Dict-like view over a json file written by json.dump(indent=4). Only the
+    position of each record is kept in memory, records are read from the file
+    when accessed. Changes are kept in memory until save(), which copies the
+    untouched records as they are instead of serializing them again.
+    """
+
+    def __init__(self, path, on_record=None):
+        self.path = path
+        # key -> offset << 32 | length of the member in the file, in file order
+        self.spans = {}
+        # key -> (version, value or _DELETED) not saved yet
+        self.changed = {}
+        self.versions = itertools.count()
+        self.file = None
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        if not os.path.isfile(path):
+            return
+        self.file = open(path, "rb")
+        for key, value, offset, length in scan_json_object(self.file):
+            self.spans[key] = offset << 32 | length
+            if on_record is not None:
+                on_record(key, value)
+
+    @staticmethod
+    def _read(file, span) -> str:
+        file.seek(span >> 32)
+        return file.read(span & 0xFFFFFFFF).decode("utf-8")
+
+    def __getitem__(self, key):
+        with self.lock:
+            entry = self.changed.get(key)
+            if entry is None:
+                member = self._read(self.file, self.spans[key])
+        if entry is not None:
+            if entry[1] is _DELETED:
+                raise KeyError(key)
+            return entry[1]
+        return json.loads(member[MEMBER_KEY.match(member).end() :])
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            self.changed[key] = (next(self.versions), value)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        with self.lock:
+            self.changed[key] = (next(self.versions), _DELETED)
+
+    def __contains__(self, key):
+        entry = self.changed.get(key)
+        if entry is not None:
+            return entry[1] is not _DELETED
+        return key in self.spans
+
+    def __iter__(self):
+        with self.lock:
+            keys = [
+                key
+                for key in self.spans
+                if self.changed.get(key, (None, None))[1] is not _DELETED
+            ]
+            keys.extend(
+                key
+                for key, (_, value) in self.changed.items()
+                if value is not _DELETED and key not in self.spans
+            )
+        return iter(keys)
+
+    def __len__(self):
+        with self.lock:
+            length = len(self.spans)
+            for key, (_, value) in self.changed.items():
+                if key in self.spans:
+                    length -= value is _DELETED
+                elif value is not _DELETED:
+                    length += 1
+            return length
+
+    def save(self):
+        """rewrite the file, can be called from another thread"""
+        with self.save_lock:
+            with self.lock:
+                spans = self.spans.copy()
+                changed = self.changed.copy()
+            new_spans = {}
+            # consecutive untouched members are copied in one go
+            run_keys = []
+            separator = b"\n    "
+            with atomic_write(self.path, mode="wb", overwrite=True) as outfile:
+                outfile.write(b"{")
+
+                def copy_run():
+                    first, last = spans[run_keys[0]], spans[run_keys[-1]]
+                    start = first >> 32
+                    end = (last >> 32) + (last & 0xFFFFFFFF)
+                    shift = outfile.tell() - start
+                    self._copy_range(outfile, start, end - start)
+                    for key in run_keys:
+                        new_spans[key] = spans[key] + (shift << 32)
+                    run_keys.clear()
+
+                for key in itertools.chain(
+                    spans, (key for key in changed if key not in spans)
+                ):
+                    entry = changed.get(key)
+                    if entry is None:
+                        if not run_keys:
+                            outfile.write(separator)
+                            separator = b",\n    "
+                        run_keys.append(key)
+                        continue
+                    if run_keys:
+                        copy_run()
+                    if entry[1] is _DELETED:
+                        continue
+                    outfile.write(separator)
+                    separator = b",\n    "
+                    member = (
+                        json.dumps(key)
+                        + ": "
+                        + json.dumps(entry[1], indent=4, default=to_json).replace(
+                            "\n", "\n    "
+                        )
+                    ).encode("utf-8")
+                    new_spans[key] = outfile.tell() << 32 | len(member)
+                    outfile.write(member)
+                if run_keys:
+                    copy_run()
+                outfile.write(b"\n}" if new_spans else b"}")
+            with self.lock:
+                for key, (version, _) in changed.items():
+                    if self.changed[key][0] == version:
+                        del self.changed[key]
+                if self.file is not None:
+                    self.file.close()
+                self.file = open(self.path, "rb")
+                self.spans = new_spans
+
+    def _copy_range(self, destination, offset, length):
+        # from the file the spans point to: another process may have replaced
+        # the one at self.path since
+        while length > 0:
+            with self.lock:
+                self.file.seek(offset)
+                chunk = self.file.read(min(length, CHUNK_SIZE))
+            if not chunk:
+                raise ValueError(f"{self.path} is shorter than expected")
+            destination.write(chunk)
+            offset += len(chunk)
+            length -= len(chunk)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class LazyStorage(JournaledStorage):
+    """
+    Doesn't load the history files in memory: they're scanned once at startup
+    to know which users are in there and when they were interacted, the full
+    records are read from disk when they're needed. Interactions go to the
+    journal, rewriting interacted_users.json is left to the compactions.
+    """
+
+    def _load_interacted_users(self):
+        times = {}
+
+        def index_time(username, user):
+            times[username] = parse_time(user[USER_LAST_INTERACTION]).timestamp()
+
+        users = self._open(self.interacted_users_path, index_time)
+        self._loaded_times = times
+        return users
+
+    def _load_history_filter_users(self):
+        return self._open(self.history_filter_users_path)
+
+    @staticmethod
+    def _open(path, on_record=None) -> JsonObjectFile:
+        try:
+            return JsonObjectFile(path, on_record)
+        except Exception as e:
+            logger.error(f"Please check {path}, it contains this error: {e}")
+            sys.exit(0)
+
+    def _build_time_index(self):
+        index = InteractionTimeIndex.from_times(self._loaded_times)
+        del self._loaded_times
+        return index
+
+    def _save_filter_users(self):
+        with self.lock:
+            self.history_filter_users.save()
+
+    def _update_file(self):
+        if self.interacted_users_path is not None:
+            self.interacted_users.save()
+
+    def close(self):
+        super().close()
+        if self.interacted_users_path is not None:
+            self.interacted_users.close()
+            self.history_filter_users.close()
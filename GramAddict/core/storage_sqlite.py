@@ -0,0 +1,357 @@
+import json
+import logging
+import os
+import sqlite3
+from collections.abc import MutableMapping
+from datetime import datetime
+
+from GramAddict.core.storage import (
+    ACCOUNTS,
+    TIME_FORMAT,
+    USER_FOLLOWING_STATUS,
+    USER_LAST_INTERACTION,
+    FollowingStatus,
+    Storage,
+)
+
+logger = logging.getLogger(__name__)
+
+FILENAME_STORAGE_DB = "storage.db"
+
+INTERACTED_USER_COLUMNS = (
+    USER_LAST_INTERACTION,
+    USER_FOLLOWING_STATUS,
+    "session_id",
+    "job_name",
+    "target",
+    "liked",
+    "watched",
+    "commented",
+    "followed",
+    "unfollowed",
+    "scraped",
+    "pm_sent",
+)
+BOOLEAN_COLUMNS = ("followed", "unfollowed", "scraped", "pm_sent")
+# the other keys of a record, as a json object
+EXTRA_COLUMN = "extra"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interacted_users (
+    username TEXT PRIMARY KEY,
+    last_interaction TEXT NOT NULL,
+    following_status TEXT NOT NULL,
+    session_id TEXT,
+    job_name TEXT,
+    target TEXT,
+    liked INTEGER DEFAULT 0,
+    watched INTEGER DEFAULT 0,
+    commented INTEGER DEFAULT 0,
+    followed INTEGER DEFAULT 0,
+    unfollowed INTEGER DEFAULT 0,
+    scraped INTEGER DEFAULT 0,
+    pm_sent INTEGER DEFAULT 0,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_interacted_last_interaction
+    ON interacted_users (last_interaction);
+CREATE INDEX IF NOT EXISTS idx_interacted_following_status
+    ON interacted_users (following_status);
+CREATE INDEX IF NOT EXISTS idx_interacted_job_name ON interacted_users (job_name);
+CREATE INDEX IF NOT EXISTS idx_interacted_target ON interacted_users (target);
+CREATE TABLE IF NOT EXISTS history_filters_users (
+    username TEXT PRIMARY KEY,
+    datetime TEXT,
+    skip_reason TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+INSERT_INTERACTED_USER = f"INSERT OR REPLACE INTO interacted_users (username, {', '.join(INTERACTED_USER_COLUMNS)}, {EXTRA_COLUMN}) VALUES (?{', ?' * (len(INTERACTED_USER_COLUMNS) + 1)})"
+
+
+class InteractedUsersTable(MutableMapping):
+    """dict-like view over the interacted_users table, values are plain dicts"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __getitem__(self, username):
+        row = self.connection.execute(
+            f"SELECT {', '.join(INTERACTED_USER_COLUMNS)}, {EXTRA_COLUMN} FROM interacted_users WHERE username = ?",
+            (username,),
+        ).fetchone()
+        if row is None:
+            raise KeyError(username)
+        return self._row_to_user(row)
+
+    def __setitem__(self, username, user):
+        with self.connection:
+            self.connection.execute(
+                INSERT_INTERACTED_USER, self._user_to_row(username, user)
+            )
+
+    def __delitem__(self, username):
+        with self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM interacted_users WHERE username = ?", (username,)
+            )
+        if cursor.rowcount == 0:
+            raise KeyError(username)
+
+    def __contains__(self, username):
+        return (
+            self.connection.execute(
+                "SELECT 1 FROM interacted_users WHERE username = ?", (username,)
+            ).fetchone()
+            is not None
+        )
+
+    def __iter__(self):
+        for (username,) in self.connection.execute(
+            "SELECT username FROM interacted_users"
+        ):
+            yield username
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM interacted_users"
+        ).fetchone()[0]
+
+    def items(self):
+        for row in self.connection.execute(
+            f"SELECT username, {', '.join(INTERACTED_USER_COLUMNS)}, {EXTRA_COLUMN} FROM interacted_users"
+        ):
+            yield row[0], self._row_to_user(row[1:])
+
+    @staticmethod
+    def _row_to_user(row) -> dict:
+        user = dict(zip(INTERACTED_USER_COLUMNS, row))
+        for column in BOOLEAN_COLUMNS:
+            user[column] = bool(user[column])
+        extra = row[len(INTERACTED_USER_COLUMNS)]
+        if extra is not None:
+            user.update(json.loads(extra))
+        return user
+
+    @staticmethod
+    def _user_to_row(username, user) -> list:
+        extra = {
+            key: value
+            for key, value in user.items()
+            if key not in INTERACTED_USER_COLUMNS
+        }
+        return [
+            username,
+            *(user.get(column) for column in INTERACTED_USER_COLUMNS),
+            json.dumps(extra) if extra else None,
+        ]
+
+
+class FilterUsersTable(MutableMapping):
+    """dict-like view over the history_filters_users table"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __getitem__(self, username):
+        row = self.connection.execute(
+            "SELECT data FROM history_filters_users WHERE username = ?", (username,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(username)
+        return json.loads(row[0])
+
+    def __setitem__(self, username, user):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO history_filters_users (username, datetime, skip_reason, data) VALUES (?, ?, ?, ?)",
+                (
+                    username,
+                    user.get("datetime"),
+                    user.get("skip_reason"),
+                    json.dumps(user),
+                ),
+            )
+
+    def __delitem__(self, username):
+        with self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM history_filters_users WHERE username = ?", (username,)
+            )
+        if cursor.rowcount == 0:
+            raise KeyError(username)
+
+    def __contains__(self, username):
+        return (
+            self.connection.execute(
+                "SELECT 1 FROM history_filters_users WHERE username = ?", (username,)
+            ).fetchone()
+            is not None
+        )
+
+    def __iter__(self):
+        for (username,) in self.connection.execute(
+            "SELECT username FROM history_filters_users"
+        ):
+            yield username
+
+    def __len__(self):
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM history_filters_users"
+        ).fetchone()[0]
+
+    def items(self):
+        for username, data in self.connection.execute(
+            "SELECT username, data FROM history_filters_users"
+        ):
+            yield username, json.loads(data)
+
+
+class SQLiteStorage(Storage):
+    """
+    Keeps interacted users and filtered users in accounts/<username>/storage.db.
+    Lookups are indexed queries instead of scans over the json dicts; the json
+    files are imported once, the first time the database is created.
+    """
+
+    def __init__(self, my_username):
+        self.connection = None
+        if my_username is not None:
+            db_path = os.path.join(ACCOUNTS, my_username, FILENAME_STORAGE_DB)
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            self.connection = sqlite3.connect(db_path)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+            self._add_missing_columns()
+        super().__init__(my_username)
+        if self.connection is not None and not self._is_migrated():
+            self.migrate_from_json()
+
+    def _add_missing_columns(self):
+        """databases created before the extra column"""
+        columns = {
+            row[1]
+            for row in self.connection.execute("PRAGMA table_info(interacted_users)")
+        }
+        if EXTRA_COLUMN not in columns:
+            with self.connection:
+                self.connection.execute(
+                    f"ALTER TABLE interacted_users ADD COLUMN {EXTRA_COLUMN} TEXT"
+                )
+
+    def _load_interacted_users(self):
+        return InteractedUsersTable(self.connection)
+
+    def _load_history_filter_users(self):
+        return FilterUsersTable(self.connection)
+
+    def _build_time_index(self):
+        # last_interaction is already indexed in the database
+        return None
+
+    def _open_change_feed(self):
+        # sqlite already locks, and other processes see the rows right away
+        return None
+
+    def _open_archive(self):
+        # rows are only read when queried, old ones cost nothing to keep
+        return None
+
+    def _is_migrated(self) -> bool:
+        return (
+            self.connection.execute(
+                "SELECT value FROM meta WHERE key = 'migrated_from_json'"
+            ).fetchone()
+            is not None
+        )
+
+    def migrate_from_json(self):
+        """one-shot import of interacted_users.json and history_filters_users.json"""
+        interacted_users = self._load_json(self.interacted_users_path)
+        history_filter_users = self._load_json(self.history_filter_users_path)
+        if interacted_users or history_filter_users:
+            logger.info(
+                f"Importing {len(interacted_users)} interacted user(s) and {len(history_filter_users)} filtered user(s) in the database, it happens only once."
+            )
+        with self.connection:
+            self.connection.executemany(
+                INSERT_INTERACTED_USER,
+                (
+                    InteractedUsersTable._user_to_row(username, user)
+                    for username, user in interacted_users.items()
+                ),
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO history_filters_users (username, datetime, skip_reason, data) VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        username,
+                        user.get("datetime"),
+                        user.get("skip_reason"),
+                        json.dumps(user),
+                    )
+                    for username, user in history_filter_users.items()
+                ),
+            )
+            self.connection.execute(
+                "INSERT INTO meta (key, value) VALUES ('migrated_from_json', ?)",
+                (str(datetime.now()),),
+            )
+        if os.path.isfile(self.interacted_users_path):
+            logger.warning(
+                f"{self.interacted_users_path} and {self.history_filter_users_path} won't be updated anymore, the data is now in {FILENAME_STORAGE_DB}."
+            )
+
+    def check_user_was_interacted(self, username):
+        row = self.connection.execute(
+            "SELECT last_interaction FROM interacted_users WHERE username = ?",
+            (username,),
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, datetime.strptime(row[0], TIME_FORMAT)
+
+    def get_following_status(self, username):
+        row = self.connection.execute(
+            "SELECT following_status FROM interacted_users WHERE username = ?",
+            (username,),
+        ).fetchone()
+        if row is None:
+            return FollowingStatus.NOT_IN_LIST
+        return FollowingStatus[row[0].upper()]
+
+    def count_interacted_since(self, since: datetime) -> int:
+        # the time format sorts lexicographically, no need to parse each row
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM interacted_users WHERE last_interaction >= ?",
+            (since.strftime(TIME_FORMAT),),
+        ).fetchone()[0]
+
+    def get_interacted_before(self, before: datetime) -> list:
+        return [
+            username
+            for (username,) in self.connection.execute(
+                "SELECT username FROM interacted_users WHERE last_interaction < ? ORDER BY last_interaction",
+                (before.strftime(TIME_FORMAT),),
+            )
+        ]
+
+    def _persist_interacted_user(self, username):
+        # already committed by InteractedUsersTable.__setitem__
+        pass
+
+    def _persist_filter_user(self, username):
+        pass
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+        super().close()
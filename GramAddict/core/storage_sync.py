@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    import msvcrt
+
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FILENAME_LOCK = "storage.lock"
+FILENAME_CHANGES = "storage.changes"
+CHANGES_MAX_SIZE = 4 * 1024 * 1024
+
+
+def _lock_file(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        return
+    file.seek(0)
+    while True:
+        try:
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            # LK_LOCK gives up after 10 seconds
+            continue
+
+
+def _unlock_file(file):
+    if fcntl is not None:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+        return
+    file.seek(0)
+    msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """
+    Advisory lock shared by all the processes using an account folder (a
+    second bot on a cloned app, an analytics script...). It's reentrant and
+    also excludes the other threads of this process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.depth = 0
+        self.thread_lock = threading.RLock()
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        if self.depth == 0:
+            self.file = open(self.path, "a+b")
+            try:
+                _lock_file(self.file)
+            except BaseException:
+                self.file.close()
+                self.thread_lock.release()
+                raise
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.depth -= 1
+        if self.depth == 0:
+            _unlock_file(self.file)
+            self.file.close()
+            self.file = None
+        self.thread_lock.release()
+
+
+def file_signature(path) -> Optional[tuple]:
+    """changes when the file is rewritten"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class ChangeFeed:
+    """
+    Changes made by every process, appended to storage.changes while holding
+    the lock. Each process reads only what was appended since its last read.
+    The feed starts over when it gets big, after the snapshot has been
+    written: readers notice the new generation and merge the snapshot.
+    """
+
+    def __init__(self, path, max_size=CHANGES_MAX_SIZE):
+        self.path = path
+        self.max_size = max_size
+        # tells our own records apart
+        self.source = uuid.uuid4().hex
+        self.generation = None
+        self.offset = 0
+
+    def _start(self):
+        self.generation = uuid.uuid4().hex
+        header = json.dumps({"generation": self.generation}) + "\n"
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as feed:
+            feed.write(header)
+        os.replace(temporary_path, self.path)
+        self.offset = len(header.encode("utf-8"))
+
+    def skip_to_end(self):
+        """everything already in the feed is in the snapshot we just loaded"""
+        try:
+            with open(self.path, "rb") as feed:
+                self.generation = json.loads(feed.readline())["generation"]
+                feed.seek(0, os.SEEK_END)
+                self.offset = feed.tell()
+        except (FileNotFoundError, ValueError, KeyError):
+            self._start()
+
+    def append(self, kind, username, user, default=None):
+        """the lock must be held and the feed read up to the end"""
+        record = {
+            "source": self.source,
+            "kind": kind,
+            "username": username,
+            "user": user,
+        }
+        line = (json.dumps(record, default=default) + "\n").encode("utf-8")
+        with open(self.path, "ab") as feed:
+            feed.write(line)
+        self.offset += len(line)
+
+    def read_new(self) -> Optional[list]:
+        """
+        records appended by the other processes since the last read, None if
+        the feed started over (the snapshot has to be merged)
+        """
+        try:
+            with open(self.path, "rb") as feed:
+                try:
+                    generation = json.loads(feed.readline())["generation"]
+                except (ValueError, KeyError):
+                    # being created
+                    return []
+                if generation != self.generation:
+                    self.generation = generation
+                    feed.seek(0, os.SEEK_END)
+                    self.offset = feed.tell()
+                    return None
+                feed.seek(self.offset)
+                data = feed.read()
+        except FileNotFoundError:
+            return []
+        # the last line may be still being written
+        complete = data[: data.rfind(b"\n") + 1]
+        self.offset += len(complete)
+        records = []
+        for line in complete.splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning(f"Ignoring a corrupted record of {self.path}.")
+                continue
+            if record["source"] != self.source:
+                records.append(record)
+        return records
+
+    def start_over_if_big(self):
+        """the lock must be held and the snapshot written"""
+        if self.offset > self.max_size:
+            self._start()
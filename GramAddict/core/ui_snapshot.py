@@ -0,0 +1,389 @@
+import json
+import logging
+import re
+import xml.etree.ElementTree as ElementTree
+from typing import List, Optional, Tuple
+
+from uiautomator2.exceptions import UiObjectNotFoundError
+from uiautomator2.utils import intersect
+
+from GramAddict.core.clock import monotonic
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+BOUNDS = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+# actions of UiObject which change the screen
+ACTIONS = {
+    "clear_text",
+    "click_exists",
+    "click_gone",
+    "drag_to",
+    "fling",
+    "gesture",
+    "long_click",
+    "pinch_in",
+    "pinch_out",
+    "scroll",
+    "set_text",
+    "swipe",
+}
+
+
+def _regex(pattern, value) -> bool:
+    # UiSelector uses java's String.matches(): the whole value must match
+    return value is not None and re.fullmatch(pattern, value) is not None
+
+
+def _flag(attribute):
+    return lambda attributes, expected: (attributes.get(attribute) == "true") == bool(
+        expected
+    )
+
+
+SELECTOR_TESTS = {
+    "text": lambda a, v: a.get("text") == v,
+    "textContains": lambda a, v: v in a.get("text", ""),
+    "textMatches": lambda a, v: _regex(v, a.get("text")),
+    "textStartsWith": lambda a, v: a.get("text", "").startswith(v),
+    "className": lambda a, v: a.get("class") == v,
+    "classNameMatches": lambda a, v: _regex(v, a.get("class")),
+    "description": lambda a, v: a.get("content-desc") == v,
+    "descriptionContains": lambda a, v: v in a.get("content-desc", ""),
+    "descriptionMatches": lambda a, v: _regex(v, a.get("content-desc")),
+    "descriptionStartsWith": lambda a, v: a.get("content-desc", "").startswith(v),
+    "checkable": _flag("checkable"),
+    "checked": _flag("checked"),
+    "clickable": _flag("clickable"),
+    "longClickable": _flag("long-clickable"),
+    "scrollable": _flag("scrollable"),
+    "enabled": _flag("enabled"),
+    "focusable": _flag("focusable"),
+    "focused": _flag("focused"),
+    "selected": _flag("selected"),
+    "packageName": lambda a, v: a.get("package") == v,
+    "packageNameMatches": lambda a, v: _regex(v, a.get("package")),
+    "resourceId": lambda a, v: a.get("resource-id") == v,
+    "resourceIdMatches": lambda a, v: _regex(v, a.get("resource-id")),
+    "index": lambda a, v: a.get("index") == str(v),
+}
+
+
+class SnapshotNode:
+    __slots__ = ("attributes", "bounds", "parent", "children", "position", "end")
+
+    def __init__(self, attributes, parent, position):
+        self.attributes = attributes
+        match = BOUNDS.fullmatch(attributes.get("bounds", ""))
+        left, top, right, bottom = map(int, match.groups()) if match else (0,) * 4
+        self.bounds = {"left": left, "top": top, "right": right, "bottom": bottom}
+        self.parent = parent
+        self.children = []
+        # the descendants are the nodes between position and end
+        self.position = position
+        self.end = position + 1
+
+    @property
+    def info(self) -> dict:
+        """same keys as the objInfo of uiautomator2"""
+        attributes = self.attributes
+        return {
+            "bounds": dict(self.bounds),
+            "checkable": attributes.get("checkable") == "true",
+            "checked": attributes.get("checked") == "true",
+            "childCount": len(self.children),
+            "className": attributes.get("class"),
+            "clickable": attributes.get("clickable") == "true",
+            "contentDescription": attributes.get("content-desc"),
+            "enabled": attributes.get("enabled") == "true",
+            "focusable": attributes.get("focusable") == "true",
+            "focused": attributes.get("focused") == "true",
+            "longClickable": attributes.get("long-clickable") == "true",
+            "packageName": attributes.get("package"),
+            "resourceName": attributes.get("resource-id"),
+            "scrollable": attributes.get("scrollable") == "true",
+            "selected": attributes.get("selected") == "true",
+            "text": attributes.get("text"),
+            "visibleBounds": dict(self.bounds),
+        }
+
+    def matches(self, selector: dict) -> bool:
+        for key, expected in selector.items():
+            if key == "instance":
+                continue
+            test = SELECTOR_TESTS.get(key)
+            if test is None:
+                raise ReferenceError(f"{key} is not allowed.")
+            if not test(self.attributes, expected):
+                return False
+        return True
+
+
+class UiSnapshot:
+    """
+    The hierarchy of the screen dumped once, selectors are evaluated on it
+    instead of asking atx-agent for each of them. Nodes are in document
+    order, so the descendants of a node are a slice of them.
+    """
+
+    def __init__(self, xml: str, epoch: int):
+        self.epoch = epoch
+        self.taken_at = monotonic()
+        self.nodes: List[SnapshotNode] = []
+        root = ElementTree.fromstring(xml)
+        stack = [(element, None) for element in reversed(root)]
+        opened = []
+        while stack:
+            element, parent = stack.pop()
+            # close the nodes whose subtree is over
+            while opened and opened[-1] is not parent:
+                opened.pop().end = len(self.nodes)
+            node = SnapshotNode(element.attrib, parent, len(self.nodes))
+            self.nodes.append(node)
+            if parent is not None:
+                parent.children.append(node)
+            opened.append(node)
+            stack.extend((child, node) for child in reversed(element))
+        for node in opened:
+            node.end = len(self.nodes)
+
+    def age(self) -> float:
+        return monotonic() - self.taken_at
+
+    def select(self, chain: List[Tuple[Optional[str], dict]]) -> List[SnapshotNode]:
+        """
+        chain: (relation, selector) like the childOrSibling selectors of
+        uiautomator2, relation is None for the first one then "child" or
+        "sibling". An instance applies to the matches of its own level.
+        """
+        matches = []
+        for relation, selector in chain:
+            if relation is None:
+                scopes = [(0, len(self.nodes))]
+            elif relation == "child":
+                scopes = [(node.position + 1, node.end) for node in matches]
+            else:
+                scopes = [
+                    (node.parent.position + 1, node.parent.end)
+                    for node in matches
+                    if node.parent is not None
+                ]
+            if len(scopes) == 1:
+                candidates = self.nodes[scopes[0][0] : scopes[0][1]]
+            else:
+                # scopes overlap when matches are nested
+                positions = set()
+                for start, end in scopes:
+                    positions.update(range(start, end))
+                candidates = [self.nodes[position] for position in sorted(positions)]
+            matches = [node for node in candidates if node.matches(selector)]
+            instance = selector.get("instance")
+            if instance is not None:
+                matches = matches[instance : instance + 1]
+            if not matches:
+                break
+        return matches
+
+
+class SnapshotObject:
+    """
+    Stands for a uiautomator2 UiObject: lookups are answered from the
+    snapshot of the device facade, actions go to the device.
+    """
+
+    def __init__(self, facade, chain: List[Tuple[Optional[str], dict]]):
+        self.facade = facade
+        self.chain = chain
+
+    def _nodes(self) -> List[SnapshotNode]:
+        return self.facade.ui_snapshot().select(self.chain)
+
+    def _extend(self, relation, selector) -> "SnapshotObject":
+        return type(self)(self.facade, self.chain + [(relation, selector)])
+
+    def _live(self):
+        """the real UiObject, for the actions"""
+        view = None
+        for relation, selector in self.chain:
+            kwargs = {
+                key: value for key, value in selector.items() if key != "instance"
+            }
+            if relation is None:
+                view = self.facade.deviceV2(**kwargs)
+            elif relation == "child":
+                view = view.child(**kwargs)
+            else:
+                view = view.sibling(**kwargs)
+            if "instance" in selector:
+                view = view[selector["instance"]]
+        return view
+
+    def screen_changed(self):
+        self.facade.screen_changed()
+
+    def exists(self, timeout=0) -> bool:
+        if self._nodes():
+            return True
+        return bool(timeout) and self.wait(True, timeout)
+
+    def wait(self, exists=True, timeout=None) -> bool:
+        if bool(self._nodes()) == exists:
+            return True
+        # waiting on the device takes one call, dumps would take one per try
+        result = self._live().wait(exists, timeout)
+        self.screen_changed()
+        return result
+
+    def wait_gone(self, timeout=None) -> bool:
+        return self.wait(False, timeout)
+
+    @property
+    def count(self) -> int:
+        return len(self._nodes())
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def info(self) -> dict:
+        nodes = self._nodes()
+        if not nodes:
+            raise UiObjectNotFoundError(
+                {"code": -32002, "message": "UiObjectNotFoundException"}, "objInfo"
+            )
+        return nodes[0].info
+
+    def __getitem__(self, instance: int) -> "SnapshotObject":
+        if instance < 0:
+            instance += self.count
+            if instance < 0:
+                raise IndexError(instance)
+        relation, selector = self.chain[-1]
+        return type(self)(
+            self.facade,
+            self.chain[:-1] + [(relation, dict(selector, instance=instance))],
+        )
+
+    def __iter__(self):
+        return iter([self[instance] for instance in range(self.count)])
+
+    def child(self, **kwargs) -> "SnapshotObject":
+        return self._extend("child", kwargs)
+
+    def sibling(self, **kwargs) -> "SnapshotObject":
+        return self._extend("sibling", kwargs)
+
+    def _beside(self, distance, **kwargs) -> Optional["SnapshotObject"]:
+        bounds = self.info["bounds"]
+        found, min_distance = None, -1
+        for instance, node in enumerate(
+            self.facade.ui_snapshot().select([(None, kwargs)])
+        ):
+            node_distance = distance(bounds, node.bounds)
+            if node_distance >= 0 and (
+                min_distance < 0 or node_distance < min_distance
+            ):
+                found, min_distance = instance, node_distance
+        if found is None:
+            return None
+        return type(self)(self.facade, [(None, dict(kwargs, instance=found))])
+
+    def right(self, **kwargs):
+        def on_right_of(rect1, rect2):
+            left, top, right, bottom = intersect(rect1, rect2)
+            return rect2["left"] - rect1["right"] if top < bottom else -1
+
+        return self._beside(on_right_of, **kwargs)
+
+    def left(self, **kwargs):
+        def on_left_of(rect1, rect2):
+            left, top, right, bottom = intersect(rect1, rect2)
+            return rect1["left"] - rect2["right"] if top < bottom else -1
+
+        return self._beside(on_left_of, **kwargs)
+
+    def up(self, **kwargs):
+        def above(rect1, rect2):
+            left, top, right, bottom = intersect(rect1, rect2)
+            return rect1["top"] - rect2["bottom"] if left < right else -1
+
+        return self._beside(above, **kwargs)
+
+    def down(self, **kwargs):
+        def under(rect1, rect2):
+            left, top, right, bottom = intersect(rect1, rect2)
+            return rect2["top"] - rect1["bottom"] if left < right else -1
+
+        return self._beside(under, **kwargs)
+
+    def click(self, timeout=None, offset=None):
+        nodes = self._nodes()
+        if not nodes:
+            self._live().click(timeout, offset)
+        else:
+            x_offset, y_offset = offset or (0.5, 0.5)
+            bounds = nodes[0].bounds
+            self.facade.deviceV2.click(
+                int(bounds["left"] + (bounds["right"] - bounds["left"]) * x_offset),
+                int(bounds["top"] + (bounds["bottom"] - bounds["top"]) * y_offset),
+            )
+        self.screen_changed()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in ACTIONS:
+            self.screen_changed()
+        return getattr(self._live(), name)
+
+
+def selector_key(view) -> Optional[str]:
+    """identifies what a UiObject or SnapshotObject selects, None if unknown"""
+    if isinstance(view, SnapshotObject):
+        return repr(view.chain)
+    selector = getattr(view, "selector", None)
+    if isinstance(selector, dict):
+        return json.dumps(selector, sort_keys=True, default=str)
+    return None
+
+
+class QueryCache:
+    """
+    Results of the queries made on the views (exists, count, info) since
+    the last action, so that asking twice about an element costs one call.
+    They're dropped when the screen epoch of the device facade changes and
+    after `max_age` seconds.
+    """
+
+    def __init__(self, facade, max_age: float):
+        self.facade = facade
+        self.max_age = max_age
+        self.results = {}
+        self.epoch = None
+        self.started_at = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _expire(self):
+        now = monotonic()
+        if self.epoch != self.facade.epoch or now - self.started_at > self.max_age:
+            self.results.clear()
+            self.epoch = self.facade.epoch
+            self.started_at = now
+
+    def get(self, key, compute, usable=None):
+        self._expire()
+        value = self.results.get(key, _MISSING)
+        if value is not _MISSING and (usable is None or usable(value)):
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        if key[0] is None:
+            return
+        self._expire()
+        self.results[key] = value
@@ -5,7 +5,6 @@ import re
 import shutil
 import subprocess
 import sys
-import time
 from collections import Counter
 from datetime import datetime
 from math import nan
@@ -13,7 +12,6 @@ from os import getcwd, rename, walk
 from pathlib import Path
 from random import randint, shuffle, uniform
 from subprocess import PIPE
-from time import sleep
 from typing import Optional, Tuple, Union
 from urllib.parse import urlparse
 
@@ -25,11 +23,16 @@ from colorama import Fore, Style
 from packaging.version import parse as parse_version
 
 from GramAddict import __file__, __version__
+from GramAddict.core import clock
+from GramAddict.core.adb_shell import adb_shell
+from GramAddict.core.clock import sleep
 from GramAddict.core.config import Config
+from GramAddict.core.device_metrics import timed
+from GramAddict.core.device_replay import recording_path
 from GramAddict.core.log import get_log_file_config
 from GramAddict.core.report import print_full_report
 from GramAddict.core.resources import ResourceID as resources
-from GramAddict.core.storage import ACCOUNTS
+from GramAddict.core.storage import ACCOUNTS, flush_storages
 
 http = urllib3.PoolManager()
 logger = logging.getLogger(__name__)
@@ -174,20 +177,17 @@ def check_adb_connection():
 
 
 def get_instagram_version():
-    stream = os.popen(
-        f"adb{'' if configs.device_id is None else ' -s ' + configs.device_id} shell dumpsys package {app_id}"
-    )
-    output = stream.read()
+    output = adb_shell(configs.device_id).run(f"dumpsys package {app_id}", cache=True)
     version_match = re.findall("versionName=(\\S+)", output)
     version = version_match[0] if len(version_match) == 1 else "not found"
-    stream.close()
     return version
 
 
-def open_instagram_with_url(url) -> bool:
+def open_instagram_with_url(device, url) -> bool:
     logger.info(f"Open Instagram app with url: {url}")
     cmd = f"adb{'' if configs.device_id is None else ' -s ' + configs.device_id} shell am start -a android.intent.action.VIEW -d {url}"
     cmd_res = subprocess.run(cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8")
+    device.screen_changed()
     err = cmd_res.stderr.strip()
     random_sleep()
     if err:
@@ -198,39 +198,33 @@ def open_instagram_with_url(url) -> bool:
 
 def kill_app(device, app_id):
     device.deviceV2.app_stop(app_id)
+    device.screen_changed()
 
 
 def head_up_notifications(enabled: bool = False):
     """
     Enable or disable head-up-notifications
     """
-    cmd: str = (
-        f"adb{'' if configs.device_id is None else ' -s ' + configs.device_id} shell settings put global heads_up_notifications_enabled {0 if not enabled else 1}"
+    return adb_shell(configs.device_id).run(
+        f"settings put global heads_up_notifications_enabled {0 if not enabled else 1}"
     )
-    return subprocess.run(cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8")
 
 
 def check_screen_timeout():
     MIN_TIMEOUT = 5 * 6_000
-    cmd: str = (
-        f"adb{'' if configs.device_id is None else f' -s {configs.device_id}'} shell settings get system screen_off_timeout"
-    )
-    resp = subprocess.run(cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8")
+    shell = adb_shell(configs.device_id)
+    resp = shell.run("settings get system screen_off_timeout", cache=True)
     try:
-        if int(resp.stdout.lstrip()) < MIN_TIMEOUT:
+        if int(resp.strip()) < MIN_TIMEOUT:
             logger.info(
                 f"Setting timeout of the screen to {MIN_TIMEOUT/6_000:.0f} minutes."
             )
-            cmd: str = (
-                f"adb{'' if configs.device_id is None else f' -s {configs.device_id}'} shell settings put system screen_off_timeout {MIN_TIMEOUT}"
-            )
-
-            subprocess.run(cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8")
+            shell.run(f"settings put system screen_off_timeout {MIN_TIMEOUT}")
         else:
             logger.info("Screen timeout is fine!")
     except ValueError:
         logger.info("Unable to get screen timeout!")
-        logger.debug(resp.stdout)
+        logger.debug(resp)
 
 
 def open_instagram(device):
@@ -245,6 +239,7 @@ def open_instagram(device):
             return exc
 
     err = call_ig()
+    device.screen_changed()
     if err:
         logger.error(err)
         return False
@@ -273,26 +268,20 @@ def open_instagram(device):
     if configs.args.close_apps:
         logger.info("Close all the other apps, to avoid interferences...")
         device.deviceV2.app_stop_all(excludes=[app_id])
+        device.screen_changed()
         random_sleep()
     logger.debug("Setting FastInputIME as default keyboard.")
     device.deviceV2.set_fastinput_ime(True)
-    cmd: str = (
-        f"adb{'' if configs.device_id is None else ' -s ' + configs.device_id} shell settings get secure default_input_method"
-    )
-    cmd_res = subprocess.run(cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8")
-    if cmd_res.stdout.replace(nl, "") != FastInputIME:
+    shell = adb_shell(configs.device_id)
+    default_ime = shell.run("settings get secure default_input_method").strip()
+    if default_ime != FastInputIME:
         logger.warning(
-            f"FastInputIME is not the default keyboard! Default is: {cmd_res.stdout.replace(nl, '')}. Changing it via adb.."
-        )
-        cmd: str = (
-            f"adb{'' if configs.device_id is None else ' -s ' + configs.device_id} shell ime set {FastInputIME}"
+            f"FastInputIME is not the default keyboard! Default is: {default_ime}. Changing it via adb.."
         )
-        cmd_res = subprocess.run(
-            cmd, stdout=PIPE, stderr=PIPE, shell=True, encoding="utf8"
-        )
-        if cmd_res.stdout.startswith("Error:"):
+        cmd_res = shell.run(f"ime set {FastInputIME}")
+        if cmd_res.startswith("Error:"):
             logger.warning(
-                f"{cmd_res.stdout.replace(nl, '')}. It looks like you don't have FastInputIME installed :S"
+                f"{cmd_res.replace(nl, '')}. It looks like you don't have FastInputIME installed :S"
             )
         else:
             logger.info("FastInputIME is the default keyboard.")
@@ -311,6 +300,7 @@ def open_instagram(device):
 def close_instagram(device):
     logger.info("Close Instagram app.")
     device.deviceV2.app_stop(app_id)
+    device.screen_changed()
     random_sleep(5, 5, modulable=False)
     if configs.args.screen_record:
         try:
@@ -322,10 +312,11 @@ def close_instagram(device):
 
 
 def check_if_crash_popup_is_there(device) -> bool:
-    obj = device.find(resourceId=ResourceID.CRASH_POPUP)
-    if obj.exists():
-        obj.click()
-        return True
+    with device.other_app_allowed():
+        obj = device.find(resourceId=ResourceID.CRASH_POPUP)
+        if obj.exists():
+            obj.click()
+            return True
     return False
 
 
@@ -388,17 +379,20 @@ def show_ending_conditions():
 def countdown(seconds: int = 10, waiting_message: str = "") -> None:
     while seconds:
         print(waiting_message, f"{seconds:02d}", end="\r")
-        time.sleep(1)
+        sleep(1)
         seconds -= 1
 
 
 def choose_cloned_app(device) -> None:
     """if dialog box is displayed choose for original or cloned app"""
     app_number = "2" if configs.args.use_cloned_app else "1"
-    obj = device.find(resourceId=f"{ResourceID.MIUI_APP}{app_number}")
-    if obj.exists(3):
-        logger.debug(f"Cloned app menu exists. Pressing on app number {app_number}.")
-        obj.click()
+    with device.other_app_allowed():
+        obj = device.find(resourceId=f"{ResourceID.MIUI_APP}{app_number}")
+        if obj.exists(3):
+            logger.debug(
+                f"Cloned app menu exists. Pressing on app number {app_number}."
+            )
+            obj.click()
 
 
 def pre_post_script(path: str, pre: bool = True):
@@ -458,6 +452,7 @@ def _restore_keyboard(device):
     device.deviceV2.set_fastinput_ime(False)
 
 
+@timed
 def random_sleep(inf=0.5, sup=3.0, modulable=True, log=True):
     MIN_INF = 0.3
     multiplier = float(args.speed_multiplier)
@@ -488,6 +483,10 @@ def save_crash(device):
         device.dump_hierarchy(os.path.join(crash_path, "hierarchy" + hierarchy_format))
     except RuntimeError:
         logger.error(f"Cannot save 'hierarchy.{hierarchy_format}'.")
+    recording = recording_path(device.deviceV2)
+    if recording is not None:
+        # replayed with --device-replay
+        shutil.copy(recording, os.path.join(crash_path, "recording.jsonl"))
     if args.screen_record:
         try:
             device.stop_screenrecord(crash=True)
@@ -542,6 +541,7 @@ def trim_txt(source: str, target: str) -> None:
 
 
 def stop_bot(device, sessions, session_state, was_sleeping=False):
+    flush_storages()
     close_instagram(device)
     if args.kill_atx_agent:
         kill_atx_agent(device)
@@ -551,6 +551,7 @@ def stop_bot(device, sessions, session_state, was_sleeping=False):
         extra={"color": f"{Style.BRIGHT}{Fore.YELLOW}"},
     )
     if session_state is not None:
+        session_state.stop_checkpoints()
         print_full_report(sessions, configs.args.scrape_to_file)
         if not was_sleeping:
             sessions.persist(directory=session_state.my_username)
@@ -727,7 +728,7 @@ def wait_for_next_session(time_left, session_state, sessions, device):
     if args.kill_atx_agent:
         kill_atx_agent(device)
     logger.info(
-        f'Next session will start at: {(datetime.now()+ time_left).strftime("%H:%M:%S (%Y/%m/%d)")}.',
+        f'Next session will start at: {(clock.now() + time_left).strftime("%H:%M:%S (%Y/%m/%d)")}.',
         extra={"color": f"{Fore.GREEN}"},
     )
     logger.info(
@@ -4,12 +4,12 @@ import re
 import platform
 from enum import Enum, auto
 from random import choice, randint, uniform
-from time import sleep
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 
 import emoji
 from colorama import Fore, Style
 
+from GramAddict.core.clock import sleep
 from GramAddict.core.device_facade import (
     DeviceFacade,
     Direction,
@@ -1558,22 +1558,100 @@ class ProfileView(ActionBarView):
                 break
             self.device.back()
 
+    @staticmethod
+    def _headerSelectors() -> Dict[str, dict]:
+        """the selectors of the fields of the profile header"""
+        return {
+            "follow_button": dict(
+                classNameMatches=f"{ClassName.BUTTON}|{ClassName.TEXT_VIEW}",
+                clickable=True,
+                textMatches=case_insensitive_re(
+                    "^following|^requested|^follow back|^follow"
+                ),
+            ),
+            "mutual_friends": dict(
+                resourceIdMatches=ResourceID.PROFILE_HEADER_FOLLOW_CONTEXT_TEXT
+            ),
+            "private": dict(
+                resourceIdMatches=case_insensitive_re(
+                    [
+                        ResourceID.PRIVATE_PROFILE_EMPTY_STATE,
+                        ResourceID.ROW_PROFILE_HEADER_EMPTY_PROFILE_NOTICE_TITLE,
+                        ResourceID.ROW_PROFILE_HEADER_EMPTY_PROFILE_NOTICE_CONTAINER,
+                    ]
+                )
+            ),
+            # under the header of the public profiles, instead of the notice
+            "tabs": dict(resourceIdMatches=ResourceID.PROFILE_TABS_CONTAINER),
+            "business_category": dict(
+                resourceId=ResourceID.PROFILE_HEADER_BUSINESS_CATEGORY
+            ),
+            "posts": dict(
+                resourceIdMatches=case_insensitive_re(
+                    ResourceID.ROW_PROFILE_HEADER_TEXTVIEW_POST_COUNT
+                )
+            ),
+            "followers": dict(
+                resourceIdMatches=case_insensitive_re(
+                    ResourceID.ROW_PROFILE_HEADER_TEXTVIEW_FOLLOWERS_COUNT
+                ),
+                className=ClassName.TEXT_VIEW,
+            ),
+            "following": dict(
+                resourceIdMatches=case_insensitive_re(
+                    ResourceID.ROW_PROFILE_HEADER_TEXTVIEW_FOLLOWING_COUNT
+                ),
+                className=ClassName.TEXT_VIEW,
+            ),
+            "biography": dict(
+                resourceIdMatches=case_insensitive_re(
+                    ResourceID.PROFILE_HEADER_BIO_TEXT
+                ),
+                className=ClassName.TEXT_VIEW,
+            ),
+            "fullname": dict(
+                resourceIdMatches=case_insensitive_re(
+                    ResourceID.PROFILE_HEADER_FULL_NAME
+                ),
+                className=ClassName.TEXT_VIEW,
+            ),
+            "website": dict(resourceIdMatches=ResourceID.PROFILE_HEADER_WEBSITE),
+        }
+
+    def getHeaderTexts(self) -> Dict[str, Optional[str]]:
+        """
+        the text of each field of the profile header, all read in one pass
+        over one dump of the screen: None for the fields which aren't on it
+        """
+        pending = self._headerSelectors()
+        texts = dict.fromkeys(pending)
+        for node in self.device.ui_snapshot().nodes:
+            for field, selector in list(pending.items()):
+                if node.matches(selector):
+                    # the first match, like find
+                    texts[field] = node.attributes.get("text", "")
+                    del pending[field]
+            if not pending:
+                break
+        return texts
+
+    @staticmethod
+    def parseFollowStatus(button_text: str) -> FollowStatus:
+        button_text = button_text.casefold()
+        if button_text in ["following", "requested"]:
+            return FollowStatus.FOLLOWING
+        elif button_text == "follow back":
+            return FollowStatus.FOLLOW_BACK
+        return FollowStatus.FOLLOW
+
     def getFollowButton(self):
-        button_regex = f"{ClassName.BUTTON}|{ClassName.TEXT_VIEW}"
-        following_regex_all = "^following|^requested|^follow back|^follow"
         following_or_follow_back_button = self.device.find(
-            classNameMatches=button_regex,
-            clickable=True,
-            textMatches=case_insensitive_re(following_regex_all),
+            **self._headerSelectors()["follow_button"]
         )
         if following_or_follow_back_button.exists(Timeout.MEDIUM):
-            button_text = following_or_follow_back_button.get_text().casefold()
-            if button_text in ["following", "requested"]:
-                button_status = FollowStatus.FOLLOWING
-            elif button_text == "follow back":
-                button_status = FollowStatus.FOLLOW_BACK
-            else:
-                button_status = FollowStatus.FOLLOW
+            button_status = self.parseFollowStatus(
+                following_or_follow_back_button.get_text()
+            )
             return following_or_follow_back_button, button_status
         else:
             logger.warning(
@@ -1590,7 +1668,7 @@ class ProfileView(ActionBarView):
         return None
 
     def getLinkInBio(self):
-        obj = self.device.find(resourceIdMatches=ResourceID.PROFILE_HEADER_WEBSITE)
+        obj = self.device.find(**self._headerSelectors()["website"])
         if obj.exists():
             website = obj.get_text()
             return website if website != "" else None
@@ -1598,30 +1676,28 @@ class ProfileView(ActionBarView):
 
     def getMutualFriends(self) -> int:
         logger.debug("Looking for mutual friends tab.")
-        follow_context = self.device.find(
-            resourceIdMatches=ResourceID.PROFILE_HEADER_FOLLOW_CONTEXT_TEXT
-        )
+        follow_context = self.device.find(**self._headerSelectors()["mutual_friends"])
         if follow_context.exists():
-            text = follow_context.get_text()
-            mutual_friends = re.finditer(
-                r"((?P<others>\s\d+\s)|(?P<extra>,))",
-                text,
-                re.IGNORECASE,
-            )
-            n_others = 0
-            n_extra = 0
-            for match in mutual_friends:
-                if match.group("others"):
-                    n_others = int(match.group("others"))
-                if match.group("extra"):
-                    n_extra = 2
-            if n_others != 0:
-                mutual_friends = n_others + n_extra if n_extra != 0 else n_others + 1
-            else:
-                mutual_friends = n_extra if n_extra != 0 else 1
-        else:
-            mutual_friends = 0
-        return mutual_friends
+            return self.parseMutualFriends(follow_context.get_text())
+        return 0
+
+    @staticmethod
+    def parseMutualFriends(text: str) -> int:
+        mutual_friends = re.finditer(
+            r"((?P<others>\s\d+\s)|(?P<extra>,))",
+            text,
+            re.IGNORECASE,
+        )
+        n_others = 0
+        n_extra = 0
+        for match in mutual_friends:
+            if match.group("others"):
+                n_others = int(match.group("others"))
+            if match.group("extra"):
+                n_extra = 2
+        if n_others != 0:
+            return n_others + n_extra if n_extra != 0 else n_others + 1
+        return n_extra if n_extra != 0 else 1
 
     def _parseCounter(self, raw_text: str) -> Optional[int]:
         multiplier = 1
@@ -1643,12 +1719,7 @@ class ProfileView(ActionBarView):
         return int(value * multiplier)
 
     def _getFollowersTextView(self):
-        followers_text_view = self.device.find(
-            resourceIdMatches=case_insensitive_re(
-                ResourceID.ROW_PROFILE_HEADER_TEXTVIEW_FOLLOWERS_COUNT
-            ),
-            className=ClassName.TEXT_VIEW,
-        )
+        followers_text_view = self.device.find(**self._headerSelectors()["followers"])
         followers_text_view.wait(Timeout.MEDIUM)
         return followers_text_view
 
@@ -1667,12 +1738,7 @@ class ProfileView(ActionBarView):
         return followers
 
     def _getFollowingTextView(self):
-        following_text_view = self.device.find(
-            resourceIdMatches=case_insensitive_re(
-                ResourceID.ROW_PROFILE_HEADER_TEXTVIEW_FOLLOWING_COUNT
-            ),
-            className=ClassName.TEXT_VIEW,
-        )
+        following_text_view = self.device.find(**self._headerSelectors()["following"])
         following_text_view.wait(Timeout.MEDIUM)
         return following_text_view
 
@@ -1691,11 +1757,7 @@ class ProfileView(ActionBarView):
         return following
 
     def getPostsCount(self) -> int:
-        post_count_view = self.device.find(
-            resourceIdMatches=case_insensitive_re(
-                ResourceID.ROW_PROFILE_HEADER_TEXTVIEW_POST_COUNT
-            )
-        )
+        post_count_view = self.device.find(**self._headerSelectors()["posts"])
         if post_count_view.exists(Timeout.MEDIUM):
             count = post_count_view.get_text()
             if count is not None:
@@ -1732,17 +1794,11 @@ class ProfileView(ActionBarView):
         return username, posts, followers, following
 
     def getProfileBiography(self) -> str:
-        biography = self.device.find(
-            resourceIdMatches=case_insensitive_re(ResourceID.PROFILE_HEADER_BIO_TEXT),
-            className=ClassName.TEXT_VIEW,
-        )
+        biography = self.device.find(**self._headerSelectors()["biography"])
         if biography.exists():
             biography_text = biography.get_text()
             # If the biography is very long, blabla text and end with "...more" click the bottom of the text and get the new text
-            is_long_bio = re.compile(
-                r"{0}$".format("… more"), flags=re.IGNORECASE
-            ).search(biography_text)
-            if is_long_bio is not None:
+            if self.isBiographyShortened(biography_text):
                 logger.debug('Found "… more" in bio - trying to expand')
                 username = self.getUsername()
                 biography.click(Location.BOTTOMRIGHT)
@@ -1756,11 +1812,17 @@ class ProfileView(ActionBarView):
             return biography_text
         return ""
 
-    def getFullName(self):
-        full_name_view = self.device.find(
-            resourceIdMatches=case_insensitive_re(ResourceID.PROFILE_HEADER_FULL_NAME),
-            className=ClassName.TEXT_VIEW,
+    @staticmethod
+    def isBiographyShortened(biography_text: str) -> bool:
+        return (
+            re.compile(r"{0}$".format("… more"), flags=re.IGNORECASE).search(
+                biography_text
+            )
+            is not None
         )
+
+    def getFullName(self):
+        full_name_view = self.device.find(**self._headerSelectors()["fullname"])
         if full_name_view.exists(Timeout.SHORT):
             fullname_text = full_name_view.get_text()
             if fullname_text is not None:
@@ -1768,15 +1830,7 @@ class ProfileView(ActionBarView):
         return ""
 
     def isPrivateAccount(self):
-        private_profile_view = self.device.find(
-            resourceIdMatches=case_insensitive_re(
-                [
-                    ResourceID.PRIVATE_PROFILE_EMPTY_STATE,
-                    ResourceID.ROW_PROFILE_HEADER_EMPTY_PROFILE_NOTICE_TITLE,
-                    ResourceID.ROW_PROFILE_HEADER_EMPTY_PROFILE_NOTICE_CONTAINER,
-                ]
-            )
-        )
+        private_profile_view = self.device.find(**self._headerSelectors()["private"])
         return private_profile_view.exists()
 
     def StoryRing(self) -> DeviceFacade.View:
@@ -2120,21 +2174,21 @@ class UniversalActions:
         logger.debug("Checking for block...")
         if "blocked" in device.deviceV2.toast.get_message(1.0, 2.0, default=""):
             logger.warning("Toast detected!")
-        serius_block = device.find(
-            className=ClassName.IMAGE,
-            textMatches=case_insensitive_re("Force reset password icon"),
+        serius_block, popup_appears, popup_body_appears = device.find_many(
+            dict(
+                className=ClassName.IMAGE,
+                textMatches=case_insensitive_re("Force reset password icon"),
+            ),
+            dict(resourceIdMatches=ResourceID.BLOCK_POPUP),
+            dict(resourceIdMatches=ResourceID.IGDS_HEADLINE_BODY),
         )
-        if serius_block.exists():
+        if serius_block:
             raise ActionBlockedError("Serius block detected :(")
-        block_dialog = device.find(
-            resourceIdMatches=ResourceID.BLOCK_POPUP,
-        )
-        popup_body = device.find(
-            resourceIdMatches=ResourceID.IGDS_HEADLINE_BODY,
-        )
-        popup_appears = block_dialog.exists()
         if popup_appears:
-            if popup_body.exists():
+            if popup_body_appears:
+                popup_body = device.find(
+                    resourceIdMatches=ResourceID.IGDS_HEADLINE_BODY,
+                )
                 regex = r".+deleted"
                 is_post_deleted = re.match(regex, popup_body.get_text(), re.IGNORECASE)
                 if is_post_deleted:
@@ -2171,7 +2225,7 @@ class UniversalActions:
 
     @staticmethod
     def close_keyboard(device):
-        flag = DeviceFacade(device.device_id, device.app_id)._is_keyboard_show()
+        flag = device._is_keyboard_show()
         if flag:
             logger.debug("The keyboard is currently open. Press back to close.")
             device.back()
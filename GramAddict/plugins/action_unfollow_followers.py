@@ -208,6 +208,7 @@ class ActionUnfollowFollowers(Plugin):
     def on_unfollow(self):
         self.state.unfollowed_count += 1
         self.session_state.totalUnfollowed += 1
+        self.session_state.changed()
 
     def sort_followings_by_date(self, device, newest_to_oldest=False) -> bool:
         sort_button = device.find(
@@ -205,6 +205,35 @@ class CoreArguments(Plugin):
                 "help": "close all apps except IG, to avoid interference",
                 "action": "store_true",
             },
+            {
+                "arg": "--ui-snapshot",
+                "help": "dump the screen once and look for the elements in the dump instead of asking the device for each of them, disabled by default",
+                "action": "store_true",
+            },
+            {
+                "arg": "--device-record",
+                "nargs": None,
+                "help": "save every call made to the device and its answer in that file, to replay the session without the device",
+                "metavar": "device_session.jsonl",
+                "default": None,
+            },
+            {
+                "arg": "--device-replay",
+                "nargs": None,
+                "help": "answer with a session saved by device-record instead of connecting to a device",
+                "metavar": "device_session.jsonl",
+                "default": None,
+            },
+            {
+                "arg": "--virtual-clock",
+                "help": "with device-replay, let the time go by only when the bot waits, and at once: a whole schedule runs in seconds (ignored on a real device)",
+                "action": "store_true",
+            },
+            {
+                "arg": "--device-metrics",
+                "help": "time the device operations, they're summed up at the end of the session and saved in accounts/<username>/device_metrics.json",
+                "action": "store_true",
+            },
             {
                 "arg": "--kill-atx-agent",
                 "help": "kill atx-agent when the script ends",
@@ -339,6 +368,13 @@ class CoreArguments(Plugin):
                 "help": "disable the using of filters without have to remove/rename the json file",
                 "action": "store_true",
             },
+            {
+                "arg": "--filter-verdicts-ttl",
+                "nargs": None,
+                "help": "skip without opening their profile the users your filters rejected in the last N hours, as long as filters.yml hasn't changed, disabled by default",
+                "metavar": "168",
+                "default": None,
+            },
             {
                 "arg": "--total-crashes-limit",
                 "nargs": None,
@@ -403,6 +439,62 @@ class CoreArguments(Plugin):
                 "help": "instead of typing you can paste the text as in old versions",
                 "action": "store_true",
             },
+            {
+                "arg": "--storage-backend",
+                "nargs": None,
+                "help": "how interacted and filtered users are saved: json (rewrite the json files every time), journal (append interactions to a log, compacted periodically), sqlite (indexed database, imported once from the json files) or lazy (json files indexed at startup, users read from disk when needed, for very big histories), json by default",
+                "metavar": "journal",
+                "default": "json",
+            },
+            {
+                "arg": "--journal-compact-every",
+                "nargs": None,
+                "help": "with the journal and lazy storage backends, rebuild interacted_users.json every N interactions, 500 by default",
+                "metavar": "500",
+                "default": "500",
+            },
+            {
+                "arg": "--filter-history-flush-every",
+                "nargs": None,
+                "help": "save history_filters_users.json every N filtered users instead of after each one, from a background thread, 50 by default (1 saves after each one)",
+                "metavar": "50",
+                "default": "50",
+            },
+            {
+                "arg": "--filter-history-flush-interval",
+                "nargs": None,
+                "help": "save the filtered users still pending after that many seconds, 30 by default",
+                "metavar": "30",
+                "default": "30",
+            },
+            {
+                "arg": "--session-checkpoint-every",
+                "nargs": None,
+                "help": "save the running session in sessions.jsonl every N interactions, from a background thread, so that its counters survive a crash, 10 by default",
+                "metavar": "10",
+                "default": "10",
+            },
+            {
+                "arg": "--session-checkpoint-interval",
+                "nargs": None,
+                "help": "also save the running session after that many seconds if it changed, 60 by default",
+                "metavar": "60",
+                "default": "60",
+            },
+            {
+                "arg": "--archive-interacted-after",
+                "nargs": None,
+                "help": "at startup, move users not interacted for that many days (and never less than can-reinteract-after) who aren't followed anymore or never were to interacted_users.archive.jsonl, they're still recognized as interacted, disabled by default",
+                "metavar": "30",
+                "default": None,
+            },
+            {
+                "arg": "--shared-registry",
+                "nargs": None,
+                "help": "share the interacted users with the other accounts running on this machine, and skip the ones another account interacted with in the last N hours (0: no matter when), disabled by default",
+                "metavar": "72",
+                "default": None,
+            },
             {
                 "arg": "--allow-untested-ig-version",
                 "help": "don't ask the user to press enter to continue with an untested IG version",
@@ -81,7 +81,7 @@ class LikeFromURLs(Plugin):
                     if (
                         validate_url(url)
                         and "instagram.com/p/" in url
-                        and open_instagram_with_url(url)
+                        and open_instagram_with_url(self.device, url)
                     ):
                         already_liked, _ = opened_post_view._is_post_liked()
                         if already_liked:
@@ -1,4 +1,3 @@
-import json
 import logging
 from datetime import datetime
 from typing import Optional
@@ -7,15 +6,15 @@ import requests
 import yaml
 from colorama import Fore, Style
 
+from GramAddict.core.persistent_list import load_persistent_list
 from GramAddict.core.plugin_loader import Plugin
 
 logger = logging.getLogger(__name__)
 
 
-def load_sessions(username) -> Optional[dict]:
+def load_sessions(username) -> Optional[list]:
     try:
-        with open(f"accounts/{username}/sessions.json") as json_data:
-            return json.load(json_data)
+        return load_persistent_list("sessions", username)
     except FileNotFoundError:
         logger.error("No session data found. Skipping report generation.")
         return None
@@ -0,0 +1,301 @@
+"""
+Measures how the storage scales with the size of an account history, no
+device needed. Synthetic interacted_users.json, history_filters_users.json
+and sessions.json are generated once per size, then every backend runs in
+its own process (so that peak memory is its own) on a fresh copy of them.
+
+    python storage_benchmark.py --sizes 10000 100000 1000000 --output results.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from json import JSONEncoder
+from types import SimpleNamespace
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+)
+
+from GramAddict.core.filter import Profile, SkipReason  # noqa: E402
+from GramAddict.core.persistent_list import PersistentList  # noqa: E402
+from GramAddict.core.storage import (  # noqa: E402
+    ACCOUNTS,
+    FILENAME_HISTORY_FILTER_USERS,
+    FILENAME_INTERACTED_USERS,
+    TIME_FORMAT,
+    create_storage,
+)
+from GramAddict.core.views import FollowStatus  # noqa: E402
+
+logger = logging.getLogger("storage-benchmark")
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s] %(name)-12s ==> %(message)s",
+    datefmt="%m/%d %H:%M:%S",
+)
+
+USERNAME = "benchmark"
+FILENAME_SESSIONS = "sessions.json"
+BACKENDS = ["json", "journal", "lazy", "sqlite"]
+SIZES = [10_000, 100_000, 1_000_000]
+JOBS = ["blogger-followers", "hashtag-likers", "hashtag-posts-recent", "feed"]
+STATUSES = ["none", "followed", "unfollowed", "requested", "scraped"]
+LOOKUPS = 10_000
+ADDS = 20
+
+
+def generate(directory, size, seed=0):
+    """writes the three history files for `size` users in `directory`"""
+    rand = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    now = datetime.now()
+    session_ids = [f"{rand.getrandbits(128):032x}" for _ in range(max(1, size // 100))]
+    targets = [f"target_{i}" for i in range(200)]
+
+    interacted = {}
+    for i in range(size):
+        followed = rand.random() < 0.3
+        interacted[f"user_{i}"] = {
+            "last_interaction": (
+                now - timedelta(seconds=rand.randrange(365 * 24 * 3600))
+            ).strftime(TIME_FORMAT),
+            "following_status": rand.choice(STATUSES),
+            "session_id": rand.choice(session_ids),
+            "job_name": rand.choice(JOBS),
+            "target": rand.choice(targets),
+            "liked": rand.randrange(4),
+            "watched": rand.randrange(3),
+            "commented": rand.randrange(2),
+            "followed": followed,
+            "unfollowed": followed and rand.random() < 0.5,
+            "scraped": False,
+            "pm_sent": False,
+        }
+    with open(os.path.join(directory, FILENAME_INTERACTED_USERS), "w") as f:
+        json.dump(interacted, f, indent=4)
+    del interacted
+
+    filtered = {
+        f"filtered_{i}": dict(
+            profile(rand).__dict__,
+            follow_button_text=FollowStatus.FOLLOW.name,
+            skip_reason=rand.choice(list(SkipReason)).name,
+        )
+        for i in range(size)
+    }
+    with open(os.path.join(directory, FILENAME_HISTORY_FILTER_USERS), "w") as f:
+        json.dump(filtered, f, indent=4)
+    del filtered
+
+    sessions = [session(rand, session_id) for session_id in session_ids]
+    with open(os.path.join(directory, FILENAME_SESSIONS), "w") as f:
+        json.dump(sessions, f, indent=4)
+
+
+def profile(rand) -> Profile:
+    data = Profile(
+        mutual_friends=rand.randrange(10),
+        follow_button_text=FollowStatus.FOLLOW,
+        is_restricted=False,
+        is_private=rand.random() < 0.2,
+        has_business_category=rand.random() < 0.1,
+        posts_count=rand.randrange(2000),
+        biography="bio " * rand.randrange(1, 30),
+        link_in_bio=None,
+        fullname=f"Full Name {rand.randrange(10**6)}",
+    )
+    data.set_followers_and_following(rand.randrange(10**5), rand.randrange(1, 5000))
+    return data
+
+
+def session(rand, session_id) -> dict:
+    start = datetime.now() - timedelta(minutes=rand.randrange(10**6))
+    return {
+        "id": session_id,
+        "total_interactions": rand.randrange(300),
+        "successful_interactions": rand.randrange(200),
+        "total_followed": rand.randrange(50),
+        "total_likes": rand.randrange(500),
+        "total_comments": 0,
+        "total_pm": 0,
+        "total_watched": rand.randrange(100),
+        "total_unfollowed": rand.randrange(50),
+        "total_scraped": 0,
+        "start_time": str(start),
+        "finish_time": str(start + timedelta(hours=1)),
+        "args": {"config": "accounts/benchmark/config.yml"},
+        "profile": {"posts": 100, "followers": 1000, "following": 500},
+    }
+
+
+class DictEncoder(JSONEncoder):
+    def default(self, item):
+        return item
+
+
+def storage_args(backend):
+    return SimpleNamespace(
+        storage_backend=backend,
+        journal_compact_every="500",
+        filter_history_flush_every="1",
+        filter_history_flush_interval="30",
+        shared_registry=None,
+        archive_interacted_after=None,
+        can_reinteract_after=None,
+    )
+
+
+def timed(results, operation, function, count=1):
+    start = time.perf_counter()
+    for _ in range(count):
+        function()
+    seconds = time.perf_counter() - start
+    results[operation] = {"seconds": seconds, "count": count}
+    logger.info(f"  {operation:<20} {seconds * 1000 / count:10.3f} ms/op")
+
+
+def run_case(backend, size, data_directory) -> dict:
+    """times every operation for one backend, in the current process"""
+    account_path = os.path.join(ACCOUNTS, USERNAME)
+    shutil.rmtree(account_path, ignore_errors=True)
+    shutil.copytree(data_directory, account_path)
+    rand = random.Random(1)
+    results = {}
+    storage = None
+
+    def load():
+        nonlocal storage
+        storage = create_storage(USERNAME, storage_args(backend))
+
+    timed(results, "load", load)
+    existing = [f"user_{rand.randrange(size)}" for _ in range(LOOKUPS // 2)]
+    missing = [f"missing_{i}" for i in range(LOOKUPS // 2)]
+    usernames = iter(existing + missing)
+    timed(
+        results,
+        "lookup",
+        lambda: storage.check_user_was_interacted(next(usernames)),
+        LOOKUPS,
+    )
+    statuses = iter(existing + missing)
+    timed(
+        results,
+        "following_status",
+        lambda: storage.get_following_status(next(statuses)),
+        LOOKUPS,
+    )
+    added = iter(range(ADDS))
+    timed(
+        results,
+        "add_interacted",
+        lambda: storage.add_interacted_user(
+            f"new_{next(added)}", "session", liked=1, job_name="feed"
+        ),
+        ADDS,
+    )
+    filtered = iter(range(ADDS))
+    timed(
+        results,
+        "add_filter",
+        lambda: storage.add_filter_user(
+            f"new_filtered_{next(filtered)}", profile(rand), SkipReason.IS_PRIVATE
+        ),
+        ADDS,
+    )
+    timed(results, "daily_count", storage._get_last_day_interactions_count, 100)
+    if backend != "sqlite":
+        # a full rewrite of interacted_users.json, sqlite never does one
+        timed(results, "persist", getattr(storage, "compact", storage._update_file))
+    timed(results, "close", storage.close)
+
+    sessions = PersistentList("sessions", DictEncoder)
+    sessions.append(session(rand, "new_session"))
+    timed(results, "sessions_persist", lambda: sessions.persist(directory=USERNAME))
+
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        results["peak_memory_mb"] = peak / (
+            2**20 if sys.platform == "darwin" else 2**10
+        )
+    shutil.rmtree(account_path, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument(
+        "--workdir", default="benchmark-data", help="where data is generated"
+    )
+    parser.add_argument("--output", help="json file for the results, stdout if omitted")
+    # internal: runs a single case and prints its results
+    parser.add_argument("--case", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    output = None if args.output is None else os.path.abspath(args.output)
+    workdir = os.path.abspath(args.workdir)
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    logging.getLogger("GramAddict").setLevel(logging.WARNING)
+
+    if args.case is not None:
+        backend, size = args.case[0], int(args.case[1])
+        data_directory = os.path.join(workdir, f"data-{size}")
+        print(json.dumps(run_case(backend, size, data_directory)))
+        return
+
+    results = []
+    for size in args.sizes:
+        data_directory = os.path.join(workdir, f"data-{size}")
+        if not os.path.isdir(data_directory):
+            logger.info(f"Generating {size} users in {data_directory}...")
+            generate(data_directory, size)
+        for backend in args.backends:
+            logger.info(f"{backend} backend, {size} users:")
+            case_output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--workdir", workdir]
+                + ["--case", backend, str(size)],
+                check=True,
+                stdout=subprocess.PIPE,
+                text=True,
+            ).stdout
+            results.append(
+                {
+                    "backend": backend,
+                    "users": size,
+                    "operations": json.loads(case_output.strip().splitlines()[-1]),
+                }
+            )
+
+    report = {
+        "date": str(datetime.now()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if output is None:
+        print(json.dumps(report, indent=4))
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        logger.info(f"Results saved in {output}.")
+
+
+if __name__ == "__main__":
+    main()
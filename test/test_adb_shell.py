@@ -0,0 +1,81 @@
+import os
+import sys
+
+from GramAddict.core.adb_shell import (
+    AdbShell,
+    adb_shell,
+    close_adb_shells,
+)
+
+# stands for `adb [-s serial] shell`: a local shell reading its stdin
+FAKE_ADB = f"""#!{sys.executable}
+import os, sys
+if sys.argv[-1] == "get-serialno":
+    print("emulator-5554")
+    sys.exit(0)
+assert sys.argv[-1] == "shell", sys.argv
+with open(os.path.join(os.path.dirname(__file__), "calls"), "a") as calls:
+    calls.write(" ".join(sys.argv[1:]) + "\\n")
+os.execv("/bin/sh", ["sh"])
+"""
+
+
+def fake_adb(tmp_path):
+    adb = tmp_path / "adb"
+    adb.write_text(FAKE_ADB)
+    adb.chmod(0o755)
+    return str(adb)
+
+
+def adb_calls(tmp_path):
+    return (tmp_path / "calls").read_text().splitlines()
+
+
+def test_commands_share_one_shell(tmp_path):
+    shell = AdbShell("emulator-5554", adb=fake_adb(tmp_path))
+    try:
+        assert shell.run("echo mInputShown=true") == "mInputShown=true\n"
+        assert shell.run("printf 'no new line'") == "no new line"
+        assert shell.run("echo error >&2") == "error\n"
+        assert shell.run("echo $$") == shell.run("echo $$")
+        assert adb_calls(tmp_path) == ["-s emulator-5554 shell"]
+    finally:
+        shell.close()
+
+
+def test_probes_are_cached_until_forgotten(tmp_path):
+    counter = tmp_path / "counter"
+    probe = f"echo x >> {counter}; wc -l < {counter}"
+    shell = AdbShell(adb=fake_adb(tmp_path), cache_ttl=60)
+    try:
+        assert shell.run(probe, cache=True).strip() == "1"
+        assert shell.run(probe, cache=True).strip() == "1"
+        shell.forget()
+        assert shell.run(probe, cache=True).strip() == "2"
+        # any other command may change the device state
+        shell.run("true")
+        assert shell.run(probe, cache=True).strip() == "3"
+    finally:
+        shell.close()
+
+
+def test_dead_shell_is_started_again(tmp_path):
+    shell = AdbShell(adb=fake_adb(tmp_path))
+    try:
+        assert shell.run("echo first") == "first\n"
+        assert shell.run("exit") == ""
+        assert shell.run("echo second") == "second\n"
+        assert adb_calls(tmp_path) == ["shell", "shell"]
+    finally:
+        shell.close()
+
+
+def test_no_serial_and_the_serial_of_the_device_share_a_shell(tmp_path, monkeypatch):
+    fake_adb(tmp_path)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    try:
+        assert adb_shell(None) is adb_shell("emulator-5554")
+        assert adb_shell(None).run("echo ok") == "ok\n"
+        assert adb_calls(tmp_path) == ["-s emulator-5554 shell"]
+    finally:
+        close_adb_shells()
@@ -0,0 +1,36 @@
+from datetime import datetime
+from time import monotonic as real_monotonic
+
+import pytest
+
+from GramAddict.core import clock
+from GramAddict.core.clock import VirtualClock, use_clock
+from GramAddict.core.session_state import SessionState
+
+
+@pytest.fixture
+def virtual_clock():
+    virtual = VirtualClock(start=datetime(2023, 5, 1, 7, 30))
+    previous = use_clock(virtual)
+    yield virtual
+    use_clock(previous)
+
+
+def test_virtual_sleeps_take_no_time(virtual_clock):
+    started = real_monotonic()
+    clock.sleep(3600)
+    clock.sleep(-5)
+
+    assert real_monotonic() - started < 1
+    assert clock.monotonic() == 3600
+    assert clock.now() == datetime(2023, 5, 1, 8, 30)
+
+
+def test_working_hours_follow_the_virtual_time(virtual_clock):
+    inside, time_left = SessionState.inside_working_hours(["10.00-12.00"], 0)
+    assert not inside
+    assert time_left.total_seconds() == 2.5 * 3600
+
+    clock.sleep(time_left.total_seconds())
+    inside, _ = SessionState.inside_working_hours(["10.00-12.00"], 0)
+    assert inside
@@ -0,0 +1,64 @@
+import json
+from time import sleep
+
+import pytest
+
+from GramAddict.core.device_metrics import metrics, timed
+
+
+@timed
+def tap():
+    sleep(0.01)
+
+
+@timed
+def tap_twice():
+    tap()
+    tap()
+
+
+class ProfileView:
+    def open(self):
+        tap_twice()
+
+
+@pytest.fixture
+def enabled_metrics():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.enable(False)
+    metrics.reset()
+
+
+def test_disabled_records_nothing():
+    metrics.reset()
+    tap()
+    assert metrics.stats == {}
+
+
+def test_operations_are_tagged_with_the_caller(enabled_metrics):
+    ProfileView().open()
+
+    assert set(enabled_metrics.stats) == {
+        ("tap_twice", "test_device_metrics.ProfileView.open"),
+        ("tap", "test_device_metrics.tap_twice"),
+    }
+    outer = enabled_metrics.stats[("tap_twice", "test_device_metrics.ProfileView.open")]
+    inner = enabled_metrics.stats[("tap", "test_device_metrics.tap_twice")]
+    assert inner.count == 2
+    # the taps are counted once in the own times
+    assert outer.own < outer.total - inner.total + 0.005
+
+
+def test_saved_report(enabled_metrics, tmp_path):
+    for _ in range(3):
+        tap()
+    path = tmp_path / "device_metrics.json"
+    enabled_metrics.save(str(path))
+
+    report = json.loads(path.read_text())
+    assert report["operations"]["tap"]["count"] == 3
+    assert sum(report["operations"]["tap"]["buckets_ms"].values()) == 3
+    assert report["operations"]["tap"]["p50_ms"] >= 10
+    assert list(report["callers"]["tap"]) == ["test_device_metrics.test_saved_report"]
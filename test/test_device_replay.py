@@ -0,0 +1,108 @@
+import pytest
+from uiautomator2.exceptions import UiObjectNotFoundError
+
+from GramAddict.core.adb_shell import adb_shell, close_adb_shells
+from GramAddict.core.device_facade import DeviceFacade
+from GramAddict.core.device_replay import (
+    ReplayMissError,
+    record_device,
+    recording_path,
+    replay_device,
+)
+
+
+class FakeUiObject:
+    def __init__(self, selector):
+        self.selector = selector
+
+    def exists(self, timeout=0):
+        return self.selector.get("text") == "Follow"
+
+    @property
+    def info(self):
+        if not self.exists():
+            raise UiObjectNotFoundError(
+                {"code": -32002, "message": "UiObjectNotFoundException"}, "objInfo"
+            )
+        return {"text": "Follow", "bounds": {"left": 0, "top": 0}}
+
+    def click(self, timeout=None, offset=None):
+        pass
+
+    def __iter__(self):
+        return iter([FakeUiObject(self.selector), FakeUiObject(self.selector)])
+
+
+class FakeDevice:
+    serial = "emulator-5554"
+
+    def __init__(self):
+        self.dumps = 0
+
+    def __call__(self, **kwargs):
+        return FakeUiObject(kwargs)
+
+    def dump_hierarchy(self):
+        self.dumps += 1
+        return f"<hierarchy dump='{self.dumps}' />"
+
+    def app_current(self):
+        return {"package": "com.instagram.android"}
+
+
+def session(device):
+    """what a few views would ask"""
+    button = device(text="Follow")
+    return [
+        device.serial,
+        device.app_current()["package"],
+        device.dump_hierarchy(),
+        button.exists(3),
+        button.info["text"],
+        len([item.info["text"] for item in button]),
+        device(text="Unfollow").exists(),
+        device.dump_hierarchy(),
+    ]
+
+
+def test_replay_answers_like_the_device(tmp_path):
+    path = str(tmp_path / "session.jsonl")
+    recorded = record_device(FakeDevice(), path)
+    answers = session(recorded)
+    assert recording_path(recorded) == path
+    assert answers[2] != answers[-1]
+
+    replayed = replay_device(path)
+    assert recording_path(replayed) is None
+    assert session(replayed) == answers
+    # polling goes on with the last answer
+    assert replayed.dump_hierarchy() == answers[-1]
+
+
+def test_replayed_errors_and_actions(tmp_path):
+    path = str(tmp_path / "session.jsonl")
+    recorded = record_device(FakeDevice(), path)
+    with pytest.raises(UiObjectNotFoundError):
+        recorded(text="Unfollow").info
+    recorded(text="Follow").click(offset=(0.3, 0.7))
+
+    replayed = replay_device(path)
+    with pytest.raises(UiObjectNotFoundError):
+        replayed(text="Unfollow").info
+    # taps are random, they match whatever the coordinates
+    assert replayed(text="Follow").click(offset=(0.6, 0.4)) is None
+    with pytest.raises(ReplayMissError):
+        replayed(text="Follow").exists(3)
+
+
+def test_replays_dont_start_adb(tmp_path, monkeypatch):
+    path = str(tmp_path / "session.jsonl")
+    session(record_device(FakeDevice(), path))
+    # any adb started would fail
+    monkeypatch.setenv("PATH", str(tmp_path))
+    try:
+        device = DeviceFacade(None, "com.instagram.android", replay=path)
+        assert adb_shell(None) is device.shell
+        assert device.shell.run("dumpsys window") == ""
+    finally:
+        close_adb_shells()
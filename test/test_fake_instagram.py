@@ -0,0 +1,145 @@
+from types import SimpleNamespace
+
+import pytest
+
+from GramAddict.core import utils, views
+from GramAddict.core.clock import VirtualClock, use_clock
+from GramAddict.core.device_facade import DeviceFacade
+from GramAddict.core.fake_instagram import FakeInstagram, SocialGraph
+from GramAddict.core.handle_sources import handle_likers, iterate_over_followers
+from GramAddict.core.navigation import nav_to_blogger
+from GramAddict.core.resources import ResourceID
+from GramAddict.core.scroll_end_detector import ScrollEndDetector
+from GramAddict.core.storage import Storage
+from GramAddict.core.views import ProfileView, SearchView, TabBarView
+
+APP_ID = "com.instagram.android"
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    args = SimpleNamespace(
+        app_id=APP_ID,
+        speed_multiplier=1,
+        dont_type=False,
+        disable_block_detection=False,
+        can_reinteract_after=None,
+        skipped_posts_limit="5",
+        feed=None,
+    )
+    config = SimpleNamespace(args=args)
+    views.load_config(config)
+    utils.load_config(config)
+    previous = use_clock(VirtualClock())
+    yield SimpleNamespace(args=args, ResourceID=ResourceID(APP_ID))
+    use_clock(previous)
+
+
+def fake_device(graph):
+    return DeviceFacade(None, APP_ID, backend=FakeInstagram(graph))
+
+
+def test_search_opens_the_profile(bot):
+    graph = SocialGraph.generate(users=50, bloggers=1)
+    device = fake_device(graph)
+
+    assert nav_to_blogger(device, "blogger0", "blogger-post-likers")
+    profile = ProfileView(device)
+    assert profile.getUsername() == "blogger0"
+    assert profile.getFollowersCount() == len(graph.users["blogger0"].followers)
+    assert isinstance(TabBarView(device).navigateToSearch(), SearchView)
+
+
+def recording_interaction(interacted):
+    def interaction(device, username, can_follow):
+        assert ProfileView(device).getUsername() == username
+        interacted.append(username)
+        return True, False, False, False, False, 0, 0, 0
+
+    return interaction
+
+
+def test_every_follower_is_interacted_once(bot):
+    graph = SocialGraph.generate(users=300, bloggers=1)
+    device = fake_device(graph)
+    storage = Storage("me")
+    interacted = []
+    interaction = recording_interaction(interacted)
+    session_state = SimpleNamespace(id="session", my_username="me")
+    assert nav_to_blogger(device, "blogger0", "blogger-followers")
+    iterate_over_followers(
+        bot,
+        device,
+        interaction,
+        None,
+        storage,
+        lambda **kwargs: True,
+        False,
+        ScrollEndDetector(repeats_to_end=5),
+        session_state,
+        "blogger-followers",
+        "blogger0",
+    )
+
+    followers = graph.users["blogger0"].followers
+    assert sorted(interacted) == sorted(followers)
+
+
+def test_likers_of_the_hashtag_posts_are_interacted(bot):
+    graph = SocialGraph.generate(users=200, bloggers=1, hashtags=("cats",))
+    device = fake_device(graph)
+    storage = Storage("me")
+    interacted = []
+    session_state = SimpleNamespace(id="session", my_username="me")
+    handle_likers(
+        bot,
+        device,
+        session_state,
+        "#cats",
+        "hashtag-likers-top",
+        storage,
+        SimpleNamespace(
+            is_num_likers_in_range=lambda likers: True,
+            cached_skip_reason=lambda username: None,
+        ),
+        ScrollEndDetector(repeats_to_end=5),
+        lambda **kwargs: True,
+        recording_interaction(interacted),
+        None,
+    )
+
+    assert len(interacted) == len(set(interacted))
+    top_post = max(graph.hashtags["cats"], key=lambda post: len(post.likers))
+    assert set(top_post.likers) <= set(interacted)
+
+
+def test_recently_rejected_followers_are_not_opened(bot):
+    graph = SocialGraph.generate(users=100, bloggers=1)
+    device = fake_device(graph)
+    followers = graph.users["blogger0"].followers
+    rejected = set(followers[::2])
+    profile_filter = SimpleNamespace(
+        cached_skip_reason=lambda username: (
+            "LT_FOLLOWERS" if username in rejected else None
+        )
+    )
+    interacted = []
+
+    assert nav_to_blogger(device, "blogger0", "blogger-followers")
+    iterate_over_followers(
+        bot,
+        device,
+        recording_interaction(interacted),
+        None,
+        Storage("me"),
+        lambda **kwargs: True,
+        False,
+        ScrollEndDetector(repeats_to_end=5),
+        SimpleNamespace(id="session", my_username="me"),
+        "blogger-followers",
+        "blogger0",
+        profile_filter,
+    )
+
+    assert sorted(interacted) == sorted(set(followers) - rejected)
@@ -0,0 +1,216 @@
+from types import SimpleNamespace
+
+import pytest
+import yaml
+
+from GramAddict.core import filter, utils, views
+from GramAddict.core import clock
+from GramAddict.core.clock import VirtualClock, use_clock
+from GramAddict.core.device_facade import DeviceFacade
+from GramAddict.core.fake_instagram import FakeInstagram, SocialGraph
+from GramAddict.core.filter import Filter
+from GramAddict.core.navigation import nav_to_blogger
+from GramAddict.core.storage import Storage
+from GramAddict.core.views import FollowStatus
+
+APP_ID = "com.instagram.android"
+
+
+class CountingInstagram(FakeInstagram):
+    dumps = 0
+    # what a UiObject asks the device
+    queries = 0
+
+    def dump_hierarchy(self, *args, **kwargs):
+        self.dumps += 1
+        return super().dump_hierarchy(*args, **kwargs)
+
+    def ui_snapshot(self):
+        self.queries += 1
+        return super().ui_snapshot()
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    args = SimpleNamespace(
+        app_id=APP_ID,
+        speed_multiplier=1,
+        dont_type=False,
+        disable_block_detection=False,
+        disable_filters=True,
+        filter_verdicts_ttl=None,
+    )
+    config = SimpleNamespace(args=args)
+    for module in (views, utils, filter):
+        module.load_config(config)
+    previous = use_clock(VirtualClock())
+    yield config
+    use_clock(previous)
+
+
+def test_profile_is_read_from_one_dump(config):
+    graph = SocialGraph.generate(users=50, bloggers=1)
+    blogger = graph.users["blogger0"]
+    fake = CountingInstagram(graph)
+    device = DeviceFacade(None, APP_ID, backend=fake)
+    assert nav_to_blogger(device, "blogger0", "blogger-post-likers")
+
+    dumps, queries = fake.dumps, fake.queries
+    profile = Filter(SimpleNamespace(filter_path="filters.yml")).get_all_data(device)
+
+    # no lookup per field
+    assert fake.dumps == dumps + 1
+    assert fake.queries == queries
+    assert profile.follow_button_text == FollowStatus.FOLLOW
+    assert profile.posts_count == len(blogger.posts)
+    assert profile.followers == len(blogger.followers)
+    assert profile.followings == len(blogger.following)
+    assert profile.fullname == blogger.full_name
+    assert profile.biography == blogger.biography
+    assert not profile.is_private
+    assert not profile.has_business_category
+    assert profile.mutual_friends == 0
+    assert profile.link_in_bio is None
+
+
+def make_filter(config, tmp_path, conditions) -> Filter:
+    config.args.disable_filters = False
+    filter_path = tmp_path / "filters.yml"
+    filter_path.write_text(yaml.safe_dump(conditions), encoding="utf-8")
+    storage = SimpleNamespace(
+        filter_path=str(filter_path), add_filter_user=lambda *args: None
+    )
+    return Filter(storage)
+
+
+def on_shortened_biography():
+    graph = SocialGraph.generate(users=50, bloggers=1)
+    graph.users["blogger0"].biography = "Travel, food and a long story… more"
+    fake = CountingInstagram(graph)
+    device = DeviceFacade(None, APP_ID, backend=fake)
+    assert nav_to_blogger(device, "blogger0", "blogger-post-likers")
+    return fake, device
+
+
+def test_failing_cheap_filter_reads_nothing_else(config, tmp_path):
+    fake, device = on_shortened_biography()
+    profile_filter = make_filter(
+        config, tmp_path, {"min_followers": 100_000, "mandatory_words": ["travel"]}
+    )
+    assert profile_filter.lazy_fields == ("biography",)
+
+    queries = fake.queries
+    profile, skipped = profile_filter.check_profile(device, "blogger0")
+
+    assert skipped
+    assert fake.queries == queries
+    assert profile.biography is None
+    assert profile.mutual_friends is None
+
+
+def test_biography_is_read_for_the_filters_needing_it(config, tmp_path):
+    fake, device = on_shortened_biography()
+    profile_filter = make_filter(
+        config, tmp_path, {"mandatory_words": ["travel"], "mutual_friends": 0}
+    )
+    assert profile_filter.lazy_fields == ("mutual_friends", "biography")
+
+    queries = fake.queries
+    profile, skipped = profile_filter.check_profile(device, "blogger0")
+
+    assert not skipped
+    # the tap to expand the biography
+    assert fake.queries > queries
+    assert profile.biography.startswith("Travel")
+    assert profile.mutual_friends == 0
+    assert profile.fullname is None
+
+
+def test_rejections_are_remembered_for_the_same_filters(config, tmp_path):
+    config.args.disable_filters = False
+    config.args.filter_verdicts_ttl = "24"
+    fake, device = on_shortened_biography()
+    account = tmp_path / "accounts" / "me"
+    account.mkdir(parents=True)
+    (account / "filters.yml").write_text("min_followers: 100000\n")
+    storage = Storage("me")
+    profile_filter = Filter(storage)
+    assert profile_filter.cached_skip_reason("blogger0") is None
+
+    _, skipped = profile_filter.check_profile(device, "blogger0")
+    assert skipped
+    assert profile_filter.cached_skip_reason("blogger0") == "LT_FOLLOWERS"
+
+    clock.sleep(25 * 3600)
+    assert profile_filter.cached_skip_reason("blogger0") is None
+
+    profile_filter.check_profile(device, "blogger0")
+    (account / "filters.yml").write_text("min_followers: 200000\n")
+    assert Filter(storage).cached_skip_reason("blogger0") is None
+
+
+def header_without_tabs(monkeypatch):
+    read_header = views.ProfileView.getHeaderTexts
+
+    def without_tabs(profile_view):
+        texts = read_header(profile_view)
+        texts["tabs"] = None
+        return texts
+
+    monkeypatch.setattr(views.ProfileView, "getHeaderTexts", without_tabs)
+
+
+def recording_skip_reasons(profile_filter):
+    reasons = []
+    profile_filter.storage.add_filter_user = lambda username, profile, reason, *_: (
+        reasons.append(reason)
+    )
+    return reasons
+
+
+def test_privacy_missing_from_the_dump_is_asked_again(config, tmp_path, monkeypatch):
+    _, device = on_shortened_biography()
+    profile_filter = make_filter(config, tmp_path, {"skip_if_private": True})
+    header_without_tabs(monkeypatch)
+    reasons = recording_skip_reasons(profile_filter)
+    profile, skipped = profile_filter.check_profile(device, "blogger0")
+
+    assert not skipped and profile.is_private is False
+    assert reasons == [None]
+
+
+def test_privacy_is_unknown_when_the_header_did_not_load(config, tmp_path, monkeypatch):
+    _, device = on_shortened_biography()
+    profile_filter = make_filter(config, tmp_path, {"skip_if_private": True})
+    header_without_tabs(monkeypatch)
+
+    def not_loaded(profile_view):
+        raise views.DeviceFacade.JsonRpcError("not loaded")
+
+    monkeypatch.setattr(views.ProfileView, "isPrivateAccount", not_loaded)
+    reasons = recording_skip_reasons(profile_filter)
+    profile, skipped = profile_filter.check_profile(device, "blogger0")
+
+    assert skipped and profile.is_private is None
+    assert reasons == [filter.SkipReason.UNKNOWN_PRIVACY]
+
+
+def test_counters_that_dont_parse_are_read_again(config, monkeypatch):
+    graph = SocialGraph.generate(users=50, bloggers=1)
+    blogger = graph.users["blogger0"]
+    device = DeviceFacade(None, APP_ID, backend=FakeInstagram(graph))
+    assert nav_to_blogger(device, "blogger0", "blogger-post-likers")
+    read_header = views.ProfileView.getHeaderTexts
+
+    def odd_counters(profile_view):
+        texts = read_header(profile_view)
+        texts["posts"] = texts["followers"] = "K"
+        return texts
+
+    monkeypatch.setattr(views.ProfileView, "getHeaderTexts", odd_counters)
+    profile = Filter(SimpleNamespace(filter_path="filters.yml")).get_all_data(device)
+
+    assert profile.posts_count == len(blogger.posts)
+    assert profile.followers == len(blogger.followers)
+    assert profile.followings == len(blogger.following)
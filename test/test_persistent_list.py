@@ -0,0 +1,103 @@
+import json
+import os
+from json import JSONEncoder
+from types import SimpleNamespace
+
+import pytest
+
+from GramAddict.core.persistent_list import PersistentList, load_persistent_list
+from GramAddict.core.session_state import SessionState, SessionStateEncoder
+
+
+class DictEncoder(JSONEncoder):
+    def default(self, item):
+        return item
+
+
+@pytest.fixture
+def account(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return os.path.join("accounts", "test_user")
+
+
+def test_persist_appends_and_last_record_wins(account):
+    sessions = PersistentList("sessions", DictEncoder, compact_every=100)
+    sessions.append({"id": "a", "total_likes": 1})
+    sessions.persist(directory="test_user")
+    sessions[0]["total_likes"] = 5
+    sessions.append({"id": "b", "total_likes": 2})
+    sessions.persist(directory="test_user")
+
+    assert not os.path.exists(os.path.join(account, "sessions.json"))
+    with open(os.path.join(account, "sessions.jsonl")) as f:
+        assert len(f.readlines()) == 3
+    assert load_persistent_list("sessions", "test_user") == [
+        {"id": "a", "total_likes": 5},
+        {"id": "b", "total_likes": 2},
+    ]
+
+
+def test_compaction_keeps_old_sessions(account):
+    os.makedirs(account)
+    with open(os.path.join(account, "sessions.json"), "w") as f:
+        json.dump([{"id": "old", "total_likes": 3}], f)
+    # interrupted while appending
+    with open(os.path.join(account, "sessions.jsonl"), "w") as f:
+        f.write('{"id": "a", "tot')
+
+    sessions = PersistentList("sessions", DictEncoder, compact_every=2)
+    sessions.append({"id": "a", "total_likes": 1})
+    sessions.persist(directory="test_user")
+
+    with open(os.path.join(account, "sessions.json")) as f:
+        assert json.load(f) == [
+            {"id": "old", "total_likes": 3},
+            {"id": "a", "total_likes": 1},
+        ]
+    assert os.path.getsize(os.path.join(account, "sessions.jsonl")) == 0
+
+
+def test_load_without_sessions(account):
+    with pytest.raises(FileNotFoundError):
+        load_persistent_list("sessions", "test_user")
+
+
+def test_checkpoint_saves_the_running_session(account):
+    sessions = PersistentList("sessions", SessionStateEncoder)
+    finished = SessionState(SimpleNamespace(args=SimpleNamespace()))
+    finished.my_username = "test_user"
+    sessions.append(finished)
+    sessions.persist(directory="test_user")
+
+    session_state = SessionState(SimpleNamespace(args=SimpleNamespace()))
+    session_state.my_username = "test_user"
+    sessions.append(session_state)
+    session_state.start_checkpoints(sessions, every=2, interval=60)
+    session_state.add_interaction("blogger-followers", True, False, False)
+    session_state.add_interaction("blogger-followers", False, False, False)
+    # simulate a kill: the session is never persisted
+    session_state.stop_checkpoints()
+
+    saved = load_persistent_list("sessions", "test_user")
+    assert [session["id"] for session in saved] == [finished.id, session_state.id]
+    assert saved[1]["total_interactions"] == 2
+    assert saved[1]["finish_time"] == "None"
+    with open(os.path.join(account, "sessions.jsonl")) as f:
+        assert len(f.readlines()) == 2
+
+
+def test_checkpoints_encode_a_copy_of_the_counters(account):
+    sessions = PersistentList("sessions", SessionStateEncoder)
+    session_state = SessionState(SimpleNamespace(args=SimpleNamespace()))
+    session_state.my_username = "test_user"
+    session_state.start_checkpoints(sessions, every=100, interval=60)
+    session_state.add_interaction("blogger-followers", True, False, False)
+    snapshot = session_state.checkpoint_snapshot
+
+    session_state.add_interaction("hashtag-likers", True, False, False)
+    assert snapshot.totalInteractions == {"blogger-followers": 1}
+    assert session_state.checkpoint_snapshot.totalInteractions == {
+        "blogger-followers": 1,
+        "hashtag-likers": 1,
+    }
+    session_state.stop_checkpoints()
@@ -0,0 +1,59 @@
+from GramAddict.core.scroll_end_detector import ScrollEndDetector
+
+
+def iterate_page(detector, usernames):
+    detector.notify_new_page()
+    for username in usernames:
+        detector.notify_username_iterated(username)
+
+
+def test_detectors_dont_share_pages():
+    first = ScrollEndDetector(repeats_to_end=2)
+    second = ScrollEndDetector(repeats_to_end=2)
+    iterate_page(first, ["a", "b"])
+    iterate_page(first, ["a", "b"])
+
+    assert first.is_the_end()
+    assert len(second.pages) == 0
+
+
+def test_pages_are_bounded():
+    detector = ScrollEndDetector(repeats_to_end=3)
+    for page in range(100):
+        iterate_page(detector, [f"user_{page}_{i}" for i in range(5)])
+
+    assert len(detector.pages) == 3
+    assert not detector.is_the_end()
+
+
+def test_same_users_until_repeats_to_end():
+    detector = ScrollEndDetector(repeats_to_end=3)
+    iterate_page(detector, ["a", "b", "c"])
+    iterate_page(detector, ["c", "d", "e"])
+    iterate_page(detector, ["c", "d", "e"])
+    assert not detector.is_the_end()
+
+    iterate_page(detector, ["c", "d", "e"])
+    assert detector.is_the_end()
+
+
+def test_shifted_page_without_new_users_is_a_repeat():
+    detector = ScrollEndDetector(repeats_to_end=2)
+    iterate_page(detector, ["a", "b", "c", "d"])
+    # the last row was cut and the list moved a bit
+    iterate_page(detector, ["b", "c", "d"])
+
+    assert detector.is_the_end()
+
+
+def test_posts_sharing_likers_dont_end_the_list():
+    detector = ScrollEndDetector(repeats_to_end=2)
+    for likers in (["a", "b", "c", "d"], ["b", "c", "d"]):
+        detector.notify_new_list()
+        iterate_page(detector, likers)
+        assert not detector.is_the_end()
+
+    # the same likers as the previous post: the posts don't change anymore
+    detector.notify_new_list()
+    iterate_page(detector, ["b", "c", "d"])
+    assert detector.is_the_end()
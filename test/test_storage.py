@@ -0,0 +1,365 @@
+import json
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from GramAddict.core.storage import (
+    FILENAME_HISTORY_FILTER_USERS,
+    FILENAME_INTERACTED_USERS,
+    FILENAME_INTERACTED_USERS_JOURNAL,
+    FollowingStatus,
+    InteractedUser,
+    JournaledStorage,
+    Storage,
+    flush_storages,
+)
+from GramAddict.core.shared_registry import SharedRegistry
+from GramAddict.core.storage_lazy import JsonObjectFile, LazyStorage
+
+
+@pytest.fixture
+def account(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return os.path.join("accounts", "test_user")
+
+
+def read_json(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_journal_appends_without_rewriting_snapshot(account):
+    storage = JournaledStorage("test_user", compact_every=100)
+    storage.add_interacted_user("user1", "session", liked=2)
+    storage.add_interacted_user("user2", "session", followed=True)
+
+    assert not os.path.exists(os.path.join(account, FILENAME_INTERACTED_USERS))
+    with open(os.path.join(account, FILENAME_INTERACTED_USERS_JOURNAL)) as f:
+        assert len(f.readlines()) == 2
+
+
+def test_journal_is_replayed_on_startup(account):
+    storage = JournaledStorage("test_user", compact_every=100)
+    storage.add_interacted_user("user1", "session", liked=2)
+    storage.add_interacted_user("user1", "session", liked=1)
+    # simulate a crash: the journal has never been compacted
+    with open(os.path.join(account, FILENAME_INTERACTED_USERS_JOURNAL), "a") as f:
+        f.write('{"username": "user2", "us')
+
+    storage = JournaledStorage("test_user", compact_every=100)
+    assert storage.interacted_users["user1"]["liked"] == 3
+    assert "user2" not in storage.interacted_users
+    snapshot = read_json(os.path.join(account, FILENAME_INTERACTED_USERS))
+    assert snapshot["user1"]["liked"] == 3
+    assert (
+        os.path.getsize(os.path.join(account, FILENAME_INTERACTED_USERS_JOURNAL)) == 0
+    )
+
+
+def test_journal_compaction(account):
+    storage = JournaledStorage("test_user", compact_every=2)
+    storage.add_interacted_user("user1", "session")
+    storage.add_interacted_user("user2", "session")
+    storage.add_interacted_user("user3", "session")
+
+    snapshot = read_json(os.path.join(account, FILENAME_INTERACTED_USERS))
+    assert set(snapshot) == {"user1", "user2"}
+    storage.close()
+    snapshot = read_json(os.path.join(account, FILENAME_INTERACTED_USERS))
+    assert set(snapshot) == {"user1", "user2", "user3"}
+
+
+def test_sqlite_migrates_json_once(account):
+    from GramAddict.core.storage_sqlite import SQLiteStorage
+
+    os.makedirs(account)
+    with open(os.path.join(account, FILENAME_INTERACTED_USERS), "w") as f:
+        json.dump(
+            {
+                "user1": {
+                    "last_interaction": "2024-01-01 10:00:00.000000",
+                    "following_status": "followed",
+                    "session_id": "session",
+                    "job_name": "blogger-followers",
+                    "target": "blogger",
+                    "liked": 1,
+                    "watched": 0,
+                    "commented": 0,
+                    "followed": True,
+                    "unfollowed": False,
+                    "scraped": False,
+                    "pm_sent": False,
+                    "custom": {"note": "vip"},
+                }
+            },
+            f,
+        )
+    storage = SQLiteStorage("test_user")
+    interacted, when = storage.check_user_was_interacted("user1")
+    assert interacted and when.year == 2024
+    assert storage.get_following_status("user1") == FollowingStatus.FOLLOWED
+    assert storage.get_following_status("user2") == FollowingStatus.NOT_IN_LIST
+
+    storage.add_interacted_user("user1", "session2", liked=2)
+    storage.add_interacted_user("user2", "session2", scraped=True)
+    assert storage.interacted_users["user1"]["liked"] == 3
+    assert storage._get_last_day_interactions_count() == 2
+    storage.close()
+
+    # the json file isn't imported again
+    storage = SQLiteStorage("test_user")
+    assert storage.interacted_users["user1"]["liked"] == 3
+    assert len(storage.interacted_users) == 2
+    # keys without a column are kept
+    assert storage.interacted_users["user1"]["custom"] == {"note": "vip"}
+    assert dict(storage.interacted_users.items())["user1"]["custom"] == {
+        "note": "vip"
+    }
+    storage.close()
+
+
+def test_time_index_queries(account):
+    os.makedirs(account)
+    now = datetime.now()
+    with open(os.path.join(account, FILENAME_INTERACTED_USERS), "w") as f:
+        json.dump(
+            {
+                f"user{hours}": {
+                    "last_interaction": (now - timedelta(hours=hours)).strftime(
+                        "%Y-%m-%d %H:%M:%S.%f"
+                    ),
+                    "following_status": "none",
+                }
+                for hours in (100, 1, 30, 5)
+            },
+            f,
+        )
+    storage = Storage("test_user")
+    assert storage._get_last_day_interactions_count() == 2
+    assert storage.get_interacted_before(now - timedelta(hours=24)) == [
+        "user100",
+        "user30",
+    ]
+    interacted, when = storage.check_user_was_interacted("user5")
+    assert interacted and abs(now - timedelta(hours=5) - when) < timedelta(seconds=1)
+
+    storage.add_interacted_user("user100", "session")
+    assert storage._get_last_day_interactions_count() == 3
+    assert storage.get_interacted_before(now - timedelta(hours=24)) == ["user30"]
+
+
+def filtered_profile(**fields):
+    return SimpleNamespace(
+        follow_button_text=FollowingStatus.NONE, is_restricted=False, **fields
+    )
+
+
+def test_filter_users_are_written_behind(account):
+    path = os.path.join(account, FILENAME_HISTORY_FILTER_USERS)
+    storage = Storage("test_user", filter_flush_every=3, filter_flush_interval=60)
+    storage.add_filter_user("user1", filtered_profile(followers=10))
+    storage.add_filter_user("user2", filtered_profile(followers=20))
+    assert not os.path.exists(path)
+
+    storage.add_filter_user("user3", filtered_profile(followers=30))
+    storage.flush()
+    assert set(read_json(path)) == {"user1", "user2", "user3"}
+
+    storage.add_filter_user("user4", filtered_profile(followers=40))
+    flush_storages()
+    assert read_json(path)["user4"]["followers"] == 40
+
+    storage.add_filter_user("user5", filtered_profile(followers=50))
+    storage.close()
+    assert "user5" in read_json(path)
+    assert storage.filter_users_writer is None
+
+
+def test_lazy_storage_reads_records_on_demand(account):
+    storage = Storage("test_user")
+    storage.add_interacted_user("user1", "session", liked=2)
+    storage.add_interacted_user("user2", "session", followed=True)
+    storage.add_filter_user("user3", filtered_profile(biography="caf\u00e9 \u2615"))
+
+    lazy = LazyStorage("test_user")
+    assert not lazy.interacted_users.changed
+    assert "user1" in lazy.interacted_users and "user4" not in lazy.interacted_users
+    assert lazy.check_user_was_interacted("user2")[0]
+    assert lazy.get_following_status("user2") == FollowingStatus.FOLLOWED
+    assert lazy.history_filter_users["user3"]["biography"] == "caf\u00e9 \u2615"
+
+    lazy.add_interacted_user("user1", "session", liked=1)
+    lazy.add_interacted_user("user4", "session", liked=3)
+    lazy.close()
+
+    users = read_json(os.path.join(account, FILENAME_INTERACTED_USERS))
+    assert list(users) == ["user1", "user2", "user4"]
+    assert users["user1"]["liked"] == 3
+    assert Storage("test_user").interacted_users == users
+
+
+def test_json_object_file_keeps_json_dump_format(tmp_path):
+    path = str(tmp_path / "data.json")
+    data = {"a": {"x": [1, 2], "y": None}, "b": {}}
+    with open(path, "w") as f:
+        json.dump(data, f, indent=4)
+
+    mapping = JsonObjectFile(path)
+    mapping["c"] = {"z": "text"}
+    del mapping["b"]
+    mapping.save()
+
+    data["c"] = {"z": "text"}
+    del data["b"]
+    with open(path) as f:
+        assert f.read() == json.dumps(data, indent=4)
+    assert dict(mapping.items()) == data
+
+
+def test_interacted_user_record_behaves_like_dict(account):
+    fields = {
+        "last_interaction": "2024-01-02 03:04:05.123456",
+        "following_status": "followed",
+        "session_id": "session",
+        "job_name": "blogger-followers",
+        "target": "someone",
+        "liked": 2,
+        "followed": True,
+        "custom": [1, 2],
+    }
+    user = InteractedUser(fields)
+    assert user == fields
+    assert user.following_status is FollowingStatus.FOLLOWED
+    assert "watched" not in user and user.get("watched", 0) == 0
+    user["liked"] += 1
+    assert user["liked"] == 3
+
+    storage = Storage("test_user")
+    storage.add_interacted_user("user1", "session", job_name="blogger-followers")
+    storage.add_interacted_user("user2", "session", job_name="blogger-followers")
+    assert isinstance(storage.interacted_users["user1"], InteractedUser)
+    reloaded = Storage("test_user").interacted_users
+    assert reloaded == read_json(os.path.join(account, FILENAME_INTERACTED_USERS))
+    assert reloaded["user1"]["job_name"] is reloaded["user2"]["job_name"]
+
+
+def test_old_resolved_users_are_archived(account):
+    storage = Storage("test_user")
+    storage.add_interacted_user("old_unfollowed", "session", unfollowed=True, liked=2)
+    storage.add_interacted_user("old_followed", "session", followed=True)
+    storage.add_interacted_user("recent", "session")
+    old = datetime.now() - timedelta(days=40)
+    for username in ("old_unfollowed", "old_followed"):
+        storage.interacted_users[username]["last_interaction"] = old.strftime(
+            "%Y-%m-%d %H:%M:%S.%f"
+        )
+        storage.interaction_times.set(username, old.timestamp())
+
+    assert storage.archive_inactive_users(timedelta(days=30)) == 1
+    assert set(read_json(os.path.join(account, FILENAME_INTERACTED_USERS))) == {
+        "old_followed",
+        "recent",
+    }
+
+    storage = Storage("test_user")
+    assert "old_unfollowed" not in storage.interacted_users
+    interacted, when = storage.check_user_was_interacted("old_unfollowed")
+    assert interacted and abs(when - old) < timedelta(minutes=1)
+    assert storage.get_following_status("old_unfollowed") == FollowingStatus.UNFOLLOWED
+    assert storage.check_user_was_interacted("someone_else") == (False, None)
+
+    storage.add_interacted_user("old_unfollowed", "session", liked=1)
+    assert storage.interacted_users["old_unfollowed"]["liked"] == 3
+
+
+def test_users_back_from_the_archive_are_counted_once(account):
+    storage = Storage("test_user")
+    old = datetime.now() - timedelta(days=40)
+    for username in ("first", "second"):
+        storage.add_interacted_user(username, "session", unfollowed=True)
+        storage.interaction_times.set(username, old.timestamp())
+    storage.archive_inactive_users(timedelta(days=30))
+
+    assert storage.count_interacted_since(old - timedelta(days=1)) == 2
+    storage.add_interacted_user("first", "session")
+    assert storage.count_interacted_since(old - timedelta(days=1)) == 2
+    assert storage.count_interacted_since(datetime.now() - timedelta(days=1)) == 1
+
+
+def test_shared_registry_between_accounts(tmp_path):
+    first = SharedRegistry("account1", hours=72, directory=str(tmp_path))
+    second = SharedRegistry("account2", hours=72, directory=str(tmp_path))
+    assert second.bloom.created is False
+
+    first.claim("target")
+    assert "target" in second.bloom and "other" not in second.bloom
+    assert second.interacted_by_other_account("target") == "account1"
+    assert first.interacted_by_other_account("target") is None
+    assert second.interacted_by_other_account("other") is None
+
+    first.close()
+    second.close()
+    os.remove(tmp_path / "shared_registry.bloom")
+    third = SharedRegistry("account3", hours=0, directory=str(tmp_path))
+    assert third.bloom.created
+    assert third.interacted_by_other_account("target") == "account1"
+    third.close()
+
+
+def test_shared_bloom_left_empty_is_sized_and_filled(tmp_path):
+    first = SharedRegistry("account1", hours=0, directory=str(tmp_path))
+    first.claim("target")
+    first.close()
+    # its creator stopped before sizing it
+    open(tmp_path / "shared_registry.bloom", "wb").close()
+
+    second = SharedRegistry("account2", hours=0, directory=str(tmp_path))
+    assert second.bloom.created
+    assert os.path.getsize(tmp_path / "shared_registry.bloom") == second.bloom.bits // 8
+    assert second.interacted_by_other_account("target") == "account1"
+    second.close()
+
+
+def test_two_processes_merge_instead_of_overwriting(account):
+    first, second = Storage("test_user"), Storage("test_user")
+    first.add_interacted_user("user1", "session", liked=1)
+    second.add_interacted_user("user2", "session", liked=2)
+    first.add_filter_user("filtered1", filtered_profile())
+    second.add_filter_user("filtered2", filtered_profile())
+
+    assert set(read_json(os.path.join(account, FILENAME_INTERACTED_USERS))) == {
+        "user1",
+        "user2",
+    }
+    assert set(read_json(os.path.join(account, FILENAME_HISTORY_FILTER_USERS))) == {
+        "filtered1",
+        "filtered2",
+    }
+    # notified through the change feed, without reading the json again
+    assert first.poll_changes() == 1
+    assert first.check_user_was_interacted("user2")[0]
+    assert second.poll_changes() == 0
+
+    second.add_interacted_user("user1", "session", liked=5)
+    first.add_interacted_user("user3", "session")
+    assert (
+        read_json(os.path.join(account, FILENAME_INTERACTED_USERS))["user1"]["liked"]
+        == 6
+    )
+
+
+def test_journaled_processes_share_changes(account):
+    first = JournaledStorage("test_user", compact_every=100)
+    second = JournaledStorage("test_user", compact_every=100)
+    first.add_interacted_user("user1", "session")
+    # merged before second writes
+    second.add_interacted_user("user2", "session")
+    assert second.check_user_was_interacted("user1")[0]
+    assert first.poll_changes() == 1
+
+    first.close()
+    second.close()
+    users = read_json(os.path.join(account, FILENAME_INTERACTED_USERS))
+    assert set(users) == {"user1", "user2"}
@@ -0,0 +1,175 @@
+import pytest
+
+from GramAddict.core.device_facade import DeviceFacade, SleepTime
+from GramAddict.core.ui_snapshot import QueryCache
+
+APP_ID = "com.instagram.android"
+
+PROFILE_XML = """<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>
+<hierarchy rotation="0">
+  <node index="0" text="" resource-id="com.instagram.android:id/row_profile_header" class="android.widget.LinearLayout" package="com.instagram.android" content-desc="" clickable="false" selected="false" bounds="[0,200][1080,600]">
+    <node index="0" text="" resource-id="com.instagram.android:id/row_profile_header_imageview" class="android.widget.ImageView" package="com.instagram.android" content-desc="Profile picture" clickable="true" selected="false" bounds="[40,220][240,420]" />
+    <node index="1" text="" resource-id="com.instagram.android:id/counts" class="android.widget.LinearLayout" package="com.instagram.android" content-desc="" clickable="false" selected="false" bounds="[300,220][1040,420]">
+      <node index="0" text="1,234" resource-id="com.instagram.android:id/row_profile_header_textview_post_count" class="android.widget.TextView" package="com.instagram.android" content-desc="" clickable="false" selected="false" bounds="[300,220][500,320]" />
+      <node index="1" text="56.7K" resource-id="com.instagram.android:id/row_profile_header_textview_followers_count" class="android.widget.TextView" package="com.instagram.android" content-desc="" clickable="true" selected="false" bounds="[550,220][750,320]" />
+      <node index="2" text="89" resource-id="com.instagram.android:id/row_profile_header_textview_following_count" class="android.widget.TextView" package="com.instagram.android" content-desc="" clickable="true" selected="false" bounds="[800,220][1000,320]" />
+    </node>
+  </node>
+  <node index="1" text="Follow" resource-id="com.instagram.android:id/profile_header_follow_button" class="android.widget.Button" package="com.instagram.android" content-desc="" clickable="true" selected="false" bounds="[40,640][1040,720]" />
+</hierarchy>
+"""
+
+
+class FakeUiObject:
+    def __init__(self, device, selector):
+        self.device = device
+        self.selector = selector
+
+    def exists(self, timeout=0):
+        self.device.calls += 1
+        return True
+
+    @property
+    def info(self):
+        self.device.calls += 1
+        return {
+            "text": "Follow",
+            "bounds": {"left": 0, "top": 0, "right": 10, "bottom": 10},
+        }
+
+    def click(self, timeout=None, offset=None):
+        self.device.calls += 1
+
+
+class FakeDevice:
+    """uiautomator2 device answering with a fixed hierarchy"""
+
+    def __init__(self, xml):
+        self.xml = xml
+        self.dumps = 0
+        self.calls = 0
+        self.clicks = []
+        self.current_app = APP_ID
+        self.app_checks = 0
+
+    def __call__(self, **kwargs):
+        return FakeUiObject(self, kwargs)
+
+    def dump_hierarchy(self):
+        self.dumps += 1
+        return self.xml
+
+    def app_current(self):
+        self.app_checks += 1
+        return {"package": self.current_app}
+
+    def click(self, x, y):
+        self.clicks.append((x, y))
+
+
+def snapshot_device(xml=PROFILE_XML, ui_snapshots=True):
+    device = DeviceFacade.__new__(DeviceFacade)
+    device.device_id = None
+    device.app_id = APP_ID
+    device.ui_snapshots = ui_snapshots
+    device.epoch = 0
+    device.snapshot = None
+    device.query_cache = QueryCache(device, max_age=60)
+    device.app_checked = None
+    device.app_check_suspended = 0
+    device.shell = None
+    device.deviceV2 = FakeDevice(xml)
+    return device
+
+
+def test_lookups_share_one_dump():
+    device = snapshot_device()
+    counts = device.find(resourceIdMatches=".*:id/counts")
+
+    assert counts.exists()
+    assert counts.child(index=0).get_text() == "1,234"
+    assert [
+        item.get_text() for item in counts.child(className="android.widget.TextView")
+    ] == [
+        "1,234",
+        "56.7K",
+        "89",
+    ]
+    assert device.find(textMatches="Fol").exists() is False
+    assert device.find(textMatches="(?i)follow").get_text() == "Follow"
+    assert device.find(descriptionContains="picture").get_bounds()["right"] == 240
+    assert device.deviceV2.dumps == 1
+
+
+def test_sibling_and_index():
+    device = snapshot_device()
+    posts = device.find(
+        resourceId="com.instagram.android:id/row_profile_header_textview_post_count"
+    )
+
+    assert posts.sibling(index=2).get_text() == "89"
+    assert (
+        device.find(className="android.widget.TextView", index=1).get_text() == "56.7K"
+    )
+    assert posts.right(clickable=True).get_text() == "56.7K"
+
+
+def test_click_uses_the_snapshot_and_invalidates_it():
+    device = snapshot_device()
+    button = device.find(resourceIdMatches=".*follow_button")
+    button.viewV2.click(offset=(0.5, 0.5))
+
+    assert device.deviceV2.clicks == [(540, 680)]
+    assert button.exists()
+    assert device.deviceV2.dumps == 2
+
+
+def test_queries_are_cached_until_an_action():
+    device = snapshot_device(ui_snapshots=False)
+    button = device.find(resourceIdMatches=".*follow_button")
+
+    assert button.exists()
+    assert device.find(resourceIdMatches=".*follow_button").exists()
+    assert button.get_text() == "Follow"
+    assert button.get_bounds()["right"] == 10
+    assert device.deviceV2.calls == 2
+    assert (device.query_cache.hits, device.query_cache.misses) == (2, 2)
+
+    button.click(sleep=SleepTime.ZERO)
+    assert button.exists()
+    # the click reuses the bounds, the action drops the cache
+    assert device.deviceV2.calls == 4
+
+
+def test_app_is_checked_again_after_actions():
+    device = snapshot_device()
+    for _ in range(5):
+        device.find(resourceIdMatches=".*follow_button")
+    assert device.deviceV2.app_checks == 1
+
+    device.deviceV2.current_app = "com.android.launcher"
+    device.find(resourceIdMatches=".*follow_button").click(sleep=SleepTime.ZERO)
+    with pytest.raises(DeviceFacade.AppHasCrashed):
+        device.find(resourceIdMatches=".*follow_button")
+    with device.other_app_allowed():
+        device.find(resourceIdMatches=".*follow_button")
+
+
+def test_find_many_uses_one_dump():
+    device = snapshot_device(ui_snapshots=False)
+    found = device.find_many(
+        dict(resourceIdMatches=".*:id/restricted_account_title"),
+        dict(resourceIdMatches=".*follow_button"),
+        dict(className="android.widget.TextView", index=2),
+    )
+
+    assert found == [False, True, True]
+    assert device.deviceV2.dumps == 1
+    assert (
+        device.wait_any(
+            dict(resourceIdMatches=".*:id/restricted_account_title"),
+            dict(descriptionContains="picture"),
+        )
+        == 1
+    )
+    assert device.deviceV2.dumps == 1